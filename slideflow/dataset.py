@@ -87,23 +87,20 @@ import csv
 import multiprocessing as mp
 import os
 import shutil
-import threading
-import time
 import types
 import tempfile
 import warnings
+import weakref
 from collections import defaultdict
 from datetime import datetime
 from glob import glob
-from multiprocessing.dummy import Pool as DPool
 from os.path import basename, dirname, exists, isdir, join
-from queue import Queue
 from random import shuffle
 from tabulate import tabulate  # type: ignore[import]
 from pprint import pformat
 from functools import partial
-from typing import (TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple,
-                    Union, Callable)
+from typing import (TYPE_CHECKING, Any, Dict, Iterator, List, Optional,
+                    Sequence, Tuple, Union, Callable)
 import numpy as np
 import pandas as pd
 import shapely.geometry as sg
@@ -112,9 +109,10 @@ from tqdm import tqdm
 
 import slideflow as sf
 from slideflow import errors
-from slideflow.slide import WSI, ExtractionReport, SlideReport
+from slideflow.slide import WSI, ExtractionReport, SlideReport, SlideBuffer
 from slideflow.util import (log, Labels, _shortname, path_to_name,
                             tfrecord2idx, TileExtractionProgress)
+from slideflow.util import catalog as catalog_utils
 
 if TYPE_CHECKING:
     import tensorflow as tf
@@ -187,7 +185,12 @@ def _tile_extractor(
     wsi_kwargs: Dict,
     generator_kwargs: Dict,
     qc_kwargs: Dict,
-    render_thumb: bool = True
+    render_thumb: bool = True,
+    indices: Optional[List[int]] = None,
+    tile_sizes: Optional[List[Tuple[int, Union[int, str]]]] = None,
+    tfrecord_dirs: Optional[List[Optional[str]]] = None,
+    tiles_dirs: Optional[List[Optional[str]]] = None,
+    size_reports: Optional[List[Dict]] = None,
 ) -> None:
     """Extract tiles. Internal function.
 
@@ -202,6 +205,13 @@ def _tile_extractor(
         wsi_kwargs (dict): Keyword arguments for sf.WSI.
         generator_kwargs (dict): Keyword arguments for WSI.extract_tiles()
         qc_kwargs(dict): Keyword arguments for quality control.
+        indices (list(int), optional): Indices of tile sizes in
+            ``tile_sizes`` to extract.
+        tile_sizes (list(tuple(int, int or str)), optional): List of
+            (tile_px, tile_um) tile sizes, the first of which matches
+            ``wsi_kwargs``. Requires ``indices``, ``tfrecord_dirs``,
+            ``tiles_dirs``, and ``size_reports``, with one entry per size.
+            If not provided, extracts tiles at the size in ``wsi_kwargs``.
     """
     try:
         log.debug(f'Extracting tiles for {path_to_name(path)}')
@@ -213,14 +223,23 @@ def _tile_extractor(
             qc=qc,
             qc_kwargs=qc_kwargs)
         if slide is not None:
-            report = slide.extract_tiles(
-                tfrecord_dir=tfrecord_dir,
-                tiles_dir=tiles_dir,
-                **generator_kwargs
+            if tile_sizes is None:
+                indices = [0]
+                tile_sizes = [(slide.tile_px, slide.tile_um)]
+                tfrecord_dirs, tiles_dirs = [tfrecord_dir], [tiles_dir]
+                size_reports = [reports]
+            slide_reports = _extract_slide_tiles(
+                slide,
+                indices,
+                tile_sizes,
+                tfrecord_dirs,
+                tiles_dirs,
+                generator_kwargs=generator_kwargs
             )
-            if render_thumb and isinstance(report, SlideReport):
-                _ = report.thumb
-            reports.update({path: report})
+            for i, report in zip(indices, slide_reports):
+                if render_thumb and isinstance(report, SlideReport):
+                    _ = report.thumb
+                size_reports[i].update({path: report})
     except errors.MissingROIError:
         log.info(f'Missing ROI for slide {path}; skipping')
     except errors.SlideLoadError as e:
@@ -234,62 +253,79 @@ def _tile_extractor(
         raise e
 
 
-def _buffer_slide(path: str, dest: str) -> str:
-    """Buffer a slide to a path."""
-    buffered = join(dest, basename(path))
-    shutil.copy(path, buffered)
+def _slide_buffer(
+    buffer: Optional[Union[str, SlideBuffer]],
+    prefetch: int
+) -> Optional[SlideBuffer]:
+    """Return a slide buffer, creating a temporary buffer from a path."""
+    if buffer is None or isinstance(buffer, SlideBuffer):
+        return buffer
+    return SlideBuffer(buffer, prefetch=prefetch, persistent=False)
 
-    # If this is an MRXS file, copy the associated folder.
-    if path.lower().endswith('mrxs'):
-        folder_path = join(dirname(path), path_to_name(path))
-        if exists(folder_path):
-            shutil.copytree(folder_path, join(dest, path_to_name(path)))
-        else:
-            log.debug("Could not find associated MRXS folder for slide buffer")
-
-    return buffered
 
+def _iter_buffered(
+    slide_list: Sequence[str],
+    slide_buffer: Optional[SlideBuffer]
+) -> Iterator[Tuple[str, str]]:
+    """Iterate over (slide path, path to read), prefetching if buffered."""
+    if slide_buffer is None:
+        return ((s, s) for s in slide_list)
+    return slide_buffer.prefetch(slide_list)
+
+
+def _release_on_close(
+    loader: Any,
+    slide_buffer: SlideBuffer,
+    local_paths: List[str]
+) -> Any:
+    """Release buffered slides when a dataloader is closed or deleted."""
+    release = weakref.finalize(loader, slide_buffer.release_many, local_paths)
+    close = getattr(loader, 'close', None)
+    if close is not None:
+        def _close():
+            close()
+            release()
+        loader.close = _close
+    return loader
+
+
+def _tile_size_label(tile_px: int, tile_um: Union[int, str]) -> str:
+    """Return the TFRecord subdirectory label for a tile size."""
+    if isinstance(tile_um, str):
+        return f"{tile_px}px_{tile_um.lower()}"
+    else:
+        return f"{tile_px}px_{tile_um}um"
 
-def _debuffer_slide(path: str) -> None:
-    """De-buffer a slide."""
-    os.remove(path)
-    # If this is an MRXS file, remove the associated folder.
-    if path.lower().endswith('mrxs'):
-        folder_path = join(dirname(path), path_to_name(path))
-        if exists(folder_path):
-            shutil.rmtree(folder_path)
-        else:
-            log.debug("Could not find MRXS folder for slide debuffer")
 
+def _extract_slide_tiles(
+    slide: sf.slide._BaseLoader,
+    indices: List[int],
+    tile_sizes: List[Tuple[int, Union[int, str]]],
+    tfrecord_dirs: List[Optional[str]],
+    tiles_dirs: List[Optional[str]],
+    generator_kwargs: Dict
+) -> List[Optional[SlideReport]]:
+    """Extract tiles from a prepared slide at the tile sizes with the given
+    indices, returning the slide report for each.
 
-def _fill_queue(
-    slide_list: Sequence[str],
-    q: Queue,
-    q_size: int,
-    buffer: Optional[str] = None
-) -> None:
-    """Fill a queue with slide paths, using an optional buffer."""
-    for path in slide_list:
-        warned = False
-        if buffer:
-            while True:
-                if q.qsize() < q_size:
-                    try:
-                        q.put(_buffer_slide(path, buffer))
-                        break
-                    except OSError:
-                        if not warned:
-                            slide = _shortname(path_to_name(path))
-                            log.debug(f'OSError for {slide}: buffer full?')
-                            log.debug(f'Queue size: {q.qsize()}')
-                            warned = True
-                        time.sleep(1)
-                else:
-                    time.sleep(1)
-        else:
-            q.put(path)
-    q.put(None)
-    q.join()
+    The slide must have been prepared with the first tile size.
+    """
+    if indices == [0]:
+        return [slide.extract_tiles(
+            tfrecord_dir=tfrecord_dirs[0],
+            tiles_dir=tiles_dirs[0],
+            **generator_kwargs
+        )]
+    # Magnification-based tile sizes (e.g. "10x") are stored by the slide
+    # as the equivalent tile_um.
+    sizes = [(slide.tile_px, slide.tile_um) if i == 0 else tile_sizes[i]
+             for i in indices]
+    return slide.extract_tiles_multiscale(
+        sizes,
+        tfrecord_dirs=[tfrecord_dirs[i] for i in indices],
+        tiles_dirs=[tiles_dirs[i] for i in indices],
+        **generator_kwargs
+    )
 
 
 def _count_otsu_tiles(wsi):
@@ -305,6 +341,14 @@ def _create_index(tfrecord, force=False):
     if not tfrecord2idx.find_index(tfrecord) or force:
         tfrecord2idx.create_index(tfrecord, index_name)
 
+
+def _write_tilestore(paths):
+    tfrecord, dest = paths
+    try:
+        sf.io.write_tilestore(tfrecord, dest)
+    except errors.EmptyTFRecordsError:
+        log.debug(f"Skipping empty TFRecord {tfrecord}")
+
 # -----------------------------------------------------------------------------
 
 def split_patients_preserved_site(
@@ -604,10 +648,7 @@ class Dataset:
             )
         # Create labels for each source based on tile size
         if (tile_px is not None) and (tile_um is not None):
-            if isinstance(tile_um, str):
-                label = f"{tile_px}px_{tile_um.lower()}"
-            else:
-                label = f"{tile_px}px_{tile_um}um"
+            label = _tile_size_label(tile_px, tile_um)
         else:
             label = None
         for source in self.sources:
@@ -721,6 +762,29 @@ class Dataset:
         config = self.sources[source]
         return 'tiles' in config and config['tiles']
 
+    def _tilestore_paths(
+        self,
+        tfrecords: List[str],
+        directory: Union[bool, str] = True
+    ) -> Dict[str, str]:
+        """Map TFRecords to their tile stores, checking they are current."""
+        directory = directory if isinstance(directory, str) else None
+        paths = {
+            tfr: sf.io.tilestore.tilestore_path(tfr, directory)
+            for tfr in tfrecords
+        }
+        missing = [
+            tfr for tfr, path in paths.items()
+            if not sf.io.tilestore.is_current(path, tfr)
+        ]
+        if missing:
+            raise errors.DatasetError(
+                f"Tile stores are missing or out of date for {len(missing)} "
+                "TFRecords (e.g. {}). Create them with "
+                "Dataset.tfrecords_to_tilestore().".format(missing[0])
+            )
+        return paths
+
     def _roi_set(self, source: str):
         if source not in self.sources:
             raise ValueError(f"Unrecognized dataset source {source}")
@@ -944,6 +1008,10 @@ class Dataset:
     def build_index(self, force: bool = True) -> None:
         """Build index files for TFRecords.
 
+        TFRecords are indexed in parallel across a process pool. Tile
+        locations are read from the serialized records without decoding
+        images or parsing the full protobuf.
+
         Args:
             force (bool): Force re-build existing indices.
 
@@ -970,7 +1038,8 @@ class Dataset:
             sf.util.num_cpu(),
             initializer=sf.util.set_ignore_sigint
         )
-        for _ in track(pool.imap_unordered(index_fn, index_to_update),
+        chunksize = max(1, min(64, len(index_to_update) // (4 * sf.util.num_cpu())))
+        for _ in track(pool.imap_unordered(index_fn, index_to_update, chunksize=chunksize),
                        description=f'Updating index files...',
                        total=len(index_to_update),
                        transient=True):
@@ -987,7 +1056,7 @@ class Dataset:
         diam_mean: Optional[int] = None,
         qc: Optional[str] = None,
         qc_kwargs: Optional[dict] = None,
-        buffer: Optional[str] = None,
+        buffer: Optional[Union[str, SlideBuffer]] = None,
         q_size: int = 2,
         force: bool = False,
         save_centroid: bool = True,
@@ -1002,6 +1071,9 @@ class Dataset:
 
         Keyword args:
             batch_size (int): Batch size for cell segmentation. Defaults to 8.
+            buffer (str or :class:`slideflow.slide.SlideBuffer`, optional):
+                Copy slides to this directory (or slide buffer) ahead of
+                segmentation. Defaults to None.
             cp_thresh (float): Cell probability threshold. All pixels with
                 value above threshold kept for masks, decrease to find more and
                 larger masks. Defaults to 0.
@@ -1016,6 +1088,8 @@ class Dataset:
             gpus (int, list(int)): GPUs to use for cell segmentation.
                 Defaults to 0 (first GPU).
             interp (bool): Interpolate during 2D dynamics. Defaults to True.
+            q_size (int): Number of slides to copy ahead of the slide being
+                segmented, when ``buffer`` is a path. Defaults to 2.
             qc (str): Slide-level quality control method to use before
                 performing cell segmentation. Defaults to "Otsu".
             model (str, :class:`cellpose.models.Cellpose`): Cellpose model to
@@ -1076,20 +1150,10 @@ class Dataset:
         slide_task = pb.add_task(
             "Slides: ", progress_type="slide_progress", total=len(slide_list)
         )
-        q = Queue()  # type: Queue
-        if buffer:
-            thread = threading.Thread(
-                target=_fill_queue,
-                args=(slide_list, q, q_size, buffer))
-            thread.start()
-
+        slide_buffer = _slide_buffer(buffer, q_size)
         pb.start()
         with sf.util.cleanup_progress(pb):
-            while True:
-                slide_path = q.get()
-                if slide_path is None:
-                    q.task_done()
-                    break
+            for _, slide_path in _iter_buffered(slide_list, slide_buffer):
                 wsi = sf.WSI(
                     slide_path,
                     tile_px=window_size,
@@ -1120,12 +1184,8 @@ class Dataset:
                     centroids=save_centroid)
                 pb.advance(slide_task)
                 pb.remove_task(segment_task)
-
-                if buffer:
-                    _debuffer_slide(slide_path)
-                q.task_done()
-        if buffer:
-            thread.join()
+        if slide_buffer is not None:
+            slide_buffer.log_stats()
 
     def check_duplicates(
         self,
@@ -1399,12 +1459,13 @@ class Dataset:
         skip_extracted: bool = True,
         tma: bool = False,
         randomize_origin: bool = False,
-        buffer: Optional[str] = None,
+        buffer: Optional[Union[str, SlideBuffer]] = None,
         q_size: int = 2,
         qc: Optional[Union[str, Callable, List[Callable]]] = None,
         report: bool = True,
+        tile_sizes: Optional[List[Tuple[int, Union[int, str]]]] = None,
         **kwargs: Any
-    ) -> Dict[str, SlideReport]:
+    ) -> Union[Dict[str, SlideReport], Dict[str, Dict[str, SlideReport]]]:
         r"""Extract tiles from a group of slides.
 
         Extracted tiles are saved either loose image or in TFRecord format.
@@ -1457,17 +1518,32 @@ class Dataset:
                 Experimental function with limited testing.
             randomize_origin (bool): Randomize pixel starting
                 position during extraction. Defaults to False.
-            buffer (str, optional): Slides will be copied to this directory
-                before extraction. Defaults to None. Using an SSD or ramdisk
-                buffer vastly improves tile extraction speed.
-            q_size (int): Size of queue when using a buffer.
-                Defaults to 2.
+            buffer (str or :class:`slideflow.slide.SlideBuffer`, optional):
+                Slides will be copied to this directory before extraction,
+                several slides ahead of the slide being extracted. If a path,
+                slides are removed from the buffer after extraction. Pass a
+                :class:`slideflow.slide.SlideBuffer` for a size-limited cache
+                which persists across runs. Defaults to None. Using an SSD or
+                ramdisk buffer vastly improves tile extraction speed.
+            q_size (int): Number of slides to copy ahead of the slide being
+                extracted, when ``buffer`` is a path. Defaults to 2.
             qc (str, optional): 'otsu', 'blur', 'both', or None. Perform blur
                 detection quality control - discarding tiles with detected
                 out-of-focus regions or artifact - and/or otsu's method.
                 Increases tile extraction time. Defaults to None.
             report (bool): Save a PDF report of tile extraction.
                 Defaults to True.
+            tile_sizes (list(tuple(int, int or str)), optional): Extract tiles
+                at each of these (tile_px, tile_um) sizes, rather than at the
+                dataset tile size. Each slide is opened once, and QC is
+                performed once per slide and shared by all sizes (blur QC
+                uses the first tile size). TFRecords for all sizes are
+                written concurrently, into the source's TFRecord directory
+                under the label for each size (e.g. "299px_302um"). If the
+                tile grids of all sizes are aligned, each region is read
+                once and cropped for every size (see
+                :meth:`slideflow.WSI.extract_tiles_multiscale`).
+                Defaults to None.
             normalizer (str, optional): Normalization strategy.
                 Defaults to None.
             normalizer_source (str, optional): Stain normalization preset or
@@ -1515,20 +1591,59 @@ class Dataset:
                 but do not export any images. Defaults to None.
             max_tiles (int, optional): Only extract this many tiles per slide.
                 Defaults to None.
+            block_size (int or tuple(int, int), optional): Read tiles in
+                blocks of neighboring grid cells (columns, rows), slicing
+                overlapping tiles from a single region read. Only supported
+                by the libvips backend. Defaults to None.
+            prefilter (bool or str): Skip tiles that clearly fail whitespace
+                or grayspace filtering without reading them, using fractions
+                calculated once per slide on a low-resolution pyramid level.
+                If 'exact', results are identical to extraction without
+                prefiltering. Defaults to False.
+            prefilter_margin (float): Tiles within this margin of the
+                whitespace/grayspace fraction are still read and checked.
+                Defaults to 0.1.
+            register_state (bool): Send each slide's extraction arguments
+                (ROIs, grid, normalizer) to each worker process once, rather
+                than with every chunk of tasks. Defaults to False.
+            jpeg_passthrough (bool): Copy stored JPEG tiles of SVS and
+                pyramidal TIFF slides directly into TFRecords when the tile
+                grid aligns with the stored tiles and no resizing or stain
+                normalization is needed, avoiding decoding and re-encoding.
+                Defaults to False.
+            checkpoint_every (int, optional): Flush each slide's TFRecord and
+                save a checkpoint of the tiles written so far every this many
+                tiles. Defaults to None.
+            resume (bool): Resume slides whose extraction was interrupted
+                from their last checkpoint, extracting only missing tiles,
+                rather than re-extracting them from the beginning. Slides
+                without a checkpoint are extracted in full. Defaults to False.
 
         Returns:
             Dictionary mapping slide paths to each slide's SlideReport
-            (:class:`slideflow.slide.report.SlideReport`)
+            (:class:`slideflow.slide.report.SlideReport`). If ``tile_sizes``
+            is provided, a dictionary mapping each tile size label to such
+            a dictionary.
         """
-        if not self.tile_px or not self.tile_um:
+        multiscale = tile_sizes is not None
+        if multiscale:
+            tile_sizes = [(px, um.lower() if isinstance(um, str) else um)
+                          for px, um in tile_sizes]
+            if tma:
+                raise ValueError("Multi-scale extraction is not supported "
+                                 "for TMAs.")
+        elif not self.tile_px or not self.tile_um:
             raise errors.DatasetError(
                 "Dataset tile_px and tile_um must be != 0 to extract tiles"
             )
+        else:
+            tile_sizes = [(self.tile_px, self.tile_um)]
+        labels = [_tile_size_label(px, um) for px, um in tile_sizes]
         if source:
             sources = sf.util.as_list(source)  # type: List[str]
         else:
             sources = list(self.sources.keys())
-        all_reports = []
+        all_reports = [[] for _ in tile_sizes]  # type: List[List]
         self.verify_annotations_slides()
 
         # Log the active slide reading backend
@@ -1539,6 +1654,7 @@ class Dataset:
         qc_kwargs = {k[3:]: v for k, v in kwargs.items() if k[:3] == 'qc_'}
         kwargs = {k: v for k, v in kwargs.items() if k[:3] != 'qc_'}
         sf.slide.log_extraction_params(**kwargs)
+        slide_buffer = _slide_buffer(buffer, q_size)
 
         for source in sources:
             log.info(f'Working on dataset source [bold]{source}[/]...')
@@ -1552,62 +1668,73 @@ class Dataset:
                     log.error(f"tfrecords path not set for source {source}")
                     continue
                 elif save_tfrecords:
-                    tfrecord_dir = join(
-                        src_conf['tfrecords'],
-                        src_conf['label']
-                    )
+                    tfrecord_dirs = [
+                        join(src_conf['tfrecords'], label) for label in labels
+                    ]  # type: List[Optional[str]]
                 else:
-                    tfrecord_dir = None
+                    tfrecord_dirs = [None for _ in labels]
                 if save_tiles and not self._tiles_set(source):
                     log.error(f"tiles path not set for source {source}")
                     continue
                 elif save_tiles:
-                    tiles_dir = join(src_conf['tiles'], src_conf['label'])
+                    tiles_dirs = [
+                        join(src_conf['tiles'], label) for label in labels
+                    ]  # type: List[Optional[str]]
                 else:
-                    tiles_dir = None
-                if save_tfrecords and not exists(tfrecord_dir):
-                    os.makedirs(tfrecord_dir)
-                if save_tiles and not exists(tiles_dir):
-                    os.makedirs(tiles_dir)
+                    tiles_dirs = [None for _ in labels]
+                for _dir in tfrecord_dirs + tiles_dirs:
+                    if _dir and not exists(_dir):
+                        os.makedirs(_dir)
             else:
                 save_tfrecords, save_tiles = False, False
-                tfrecord_dir, tiles_dir = None, None
+                tfrecord_dirs = [None for _ in labels]
+                tiles_dirs = [None for _ in labels]
+            tfrecord_dir, tiles_dir = tfrecord_dirs[0], tiles_dirs[0]
 
             # Prepare list of slides for extraction
             slide_list = self.slide_paths(source=source)
 
+            # Tile sizes (indices) remaining to be extracted for each slide
+            pending = {s: list(range(len(tile_sizes))) for s in slide_list}
+
             # Check for interrupted or already-extracted tfrecords
             if skip_extracted and save_tfrecords:
-                done = [
-                    path_to_name(tfr) for tfr in self.tfrecords(source=source)
-                ]
-                _dir = tfrecord_dir if tfrecord_dir else tiles_dir
-                unfinished = glob(join((_dir), '*.unfinished'))
-                interrupted = [path_to_name(marker) for marker in unfinished]
-                if len(interrupted):
-                    log.info(f'Re-extracting {len(interrupted)} interrupted:')
-                    for interrupted_slide in interrupted:
-                        log.info(interrupted_slide)
-                        if interrupted_slide in done:
-                            del done[done.index(interrupted_slide)]
-
-                slide_list = [
-                    s for s in slide_list if path_to_name(s) not in done
-                ]
-                if len(done):
-                    log.info(f'Skipping {len(done)} slides; already done.')
-            _tail = f"(tile_px={self.tile_px}, tile_um={self.tile_um})"
+                for i, _tfr_dir in enumerate(tfrecord_dirs):
+                    done = [
+                        path_to_name(tfr)
+                        for tfr in glob(join(_tfr_dir, '*.tfrecords'))
+                    ]
+                    _dir = _tfr_dir if _tfr_dir else tiles_dirs[i]
+                    unfinished = glob(join((_dir), '*.unfinished'))
+                    interrupted = [path_to_name(marker) for marker in unfinished]
+                    if len(interrupted):
+                        action = 'Resuming' if kwargs.get('resume') else 'Re-extracting'
+                        log.info(f'{action} {len(interrupted)} interrupted:')
+                        for interrupted_slide in interrupted:
+                            log.info(interrupted_slide)
+                            if interrupted_slide in done:
+                                del done[done.index(interrupted_slide)]
+                    for s in slide_list:
+                        if path_to_name(s) in done:
+                            pending[s].remove(i)
+
+                n_done = len([s for s in slide_list if not pending[s]])
+                slide_list = [s for s in slide_list if pending[s]]
+                if n_done:
+                    log.info(f'Skipping {n_done} slides; already done.')
+            _tail = ', '.join(f"(tile_px={px}, tile_um={um})"
+                              for px, um in tile_sizes)
             log.info(f'Extracting tiles from {len(slide_list)} slides {_tail}')
 
             # Use multithreading if specified, extracting tiles
             # from all slides in the filtered list
             if len(slide_list):
-                q = Queue()  # type: Queue
                 # Forking incompatible with some libvips configurations
                 ptype = 'spawn' if sf.slide_backend() == 'libvips' else 'fork'
                 ctx = mp.get_context(ptype)
                 manager = ctx.Manager()
-                reports = manager.dict()
+                size_reports = [manager.dict() for _ in tile_sizes]
+                reports = size_reports[0]
                 kwargs['report'] = report
 
                 # Use a single shared multiprocessing pool
@@ -1642,8 +1769,8 @@ class Dataset:
                     total=len(slide_list))
 
                 wsi_kwargs = {
-                    'tile_px': self.tile_px,
-                    'tile_um': self.tile_um,
+                    'tile_px': tile_sizes[0][0],
+                    'tile_um': tile_sizes[0][1],
                     'stride_div': stride_div,
                     'enable_downsample': enable_downsample,
                     'roi_dir': roi_dir,
@@ -1661,28 +1788,32 @@ class Dataset:
                     'generator_kwargs': kwargs,
                     'qc_kwargs': qc_kwargs,
                     'wsi_kwargs': wsi_kwargs,
-                    'render_thumb': (buffer is not None)
+                    # Buffered slides may be removed or evicted before
+                    # the report is generated, so render thumbnails now.
+                    'render_thumb': slide_buffer is not None
                 }
+
+                if multiscale:
+                    extraction_kwargs.update({
+                        'tile_sizes': tile_sizes,
+                        'tfrecord_dirs': tfrecord_dirs,
+                        'tiles_dirs': tiles_dirs,
+                        'size_reports': size_reports
+                    })
+
                 pb.start()
                 with sf.util.cleanup_progress(pb):
-                    if buffer:
-                        # Start the worker threads
-                        thread = threading.Thread(
-                            target=_fill_queue,
-                            args=(slide_list, q, q_size, buffer))
-                        thread.start()
-
-                        # Grab slide path from queue and start extraction
-                        while True:
-                            path = q.get()
-                            if path is None:
-                                q.task_done()
-                                break
-                            _tile_extractor(path, **extraction_kwargs)
+                    if slide_buffer is not None:
+                        # Copy upcoming slides while extracting from
+                        # the current slide.
+                        for slide, path in slide_buffer.prefetch(slide_list):
+                            _tile_extractor(
+                                path,
+                                indices=pending[slide],
+                                **extraction_kwargs
+                            )
                             pb.advance(slide_task)
-                            _debuffer_slide(path)
-                            q.task_done()
-                        thread.join()
+                        slide_buffer.log_stats()
                     else:
                         for slide in slide_list:
                             wsi = _prepare_slide(
@@ -1697,69 +1828,92 @@ class Dataset:
                                 continue
                             try:
                                 log.debug(f'Extracting tiles for {wsi.name}')
-                                wsi_report = wsi.extract_tiles(
-                                    tfrecord_dir=tfrecord_dir,
-                                    tiles_dir=tiles_dir,
-                                    **kwargs
+                                wsi_reports = _extract_slide_tiles(
+                                    wsi,
+                                    pending[slide],
+                                    tile_sizes,
+                                    tfrecord_dirs,
+                                    tiles_dirs,
+                                    generator_kwargs=kwargs
                                 )
-                                reports.update({wsi.path: wsi_report})
+                                for i, wsi_report in zip(pending[slide], wsi_reports):
+                                    size_reports[i].update({wsi.path: wsi_report})
                                 del wsi
                             except errors.TileCorruptionError:
                                 log.error(f'{wsi.path} corrupt; skipping')
                             pb.advance(slide_task)
 
-                # Generate PDF report.
+                # Generate PDF report, for each tile size.
                 if report:
-                    log.info('Generating PDF (this may take some time)...', )
-                    rep_vals = list(
-                        reports.copy().values()
-                    )  # type: List[SlideReport]
-                    all_reports += rep_vals
-                    num_slides = len(slide_list)
-                    img_kwargs = defaultdict(lambda: None)  # type: Dict
-                    img_kwargs.update(kwargs)
-                    img_kwargs = sf.slide._update_kw_with_defaults(img_kwargs)
-                    report_meta = types.SimpleNamespace(
-                        tile_px=self.tile_px,
-                        tile_um=self.tile_um,
-                        qc=qc,
-                        total_slides=num_slides,
-                        slides_skipped=len([r for r in rep_vals if r is None]),
-                        roi_method=roi_method,
-                        stride=stride_div,
-                        gs_frac=img_kwargs['grayspace_fraction'],
-                        gs_thresh=img_kwargs['grayspace_threshold'],
-                        ws_frac=img_kwargs['whitespace_fraction'],
-                        ws_thresh=img_kwargs['whitespace_threshold'],
-                        normalizer=img_kwargs['normalizer'],
-                        img_format=img_kwargs['img_format']
-                    )
-                    pdf_report = ExtractionReport(
-                        [r for r in rep_vals if r is not None],
-                        meta=report_meta,
-                        pool=pool
-                    )
-                    _time = datetime.now().strftime('%Y%m%d-%H%M%S')
-                    pdf_dir = tfrecord_dir if tfrecord_dir else ''
-                    pdf_report.save(
-                        join(pdf_dir, f'tile_extraction_report-{_time}.pdf')
-                    )
-                    pdf_report.update_csv(
-                        join(pdf_dir, 'extraction_report.csv')
-                    )
-                    warn_path = join(pdf_dir, f'warn_report-{_time}.txt')
-                    if pdf_report.warn_txt:
-                        with open(warn_path, 'w') as warn_f:
-                            warn_f.write(pdf_report.warn_txt)
+                    for i, (tile_px, tile_um) in enumerate(tile_sizes):
+                        log.info('Generating PDF (this may take some time)...', )
+                        rep_vals = list(
+                            size_reports[i].copy().values()
+                        )  # type: List[SlideReport]
+                        all_reports[i] += rep_vals
+                        num_slides = len([s for s in slide_list if i in pending[s]])
+                        img_kwargs = defaultdict(lambda: None)  # type: Dict
+                        img_kwargs.update(kwargs)
+                        img_kwargs = sf.slide._update_kw_with_defaults(img_kwargs)
+                        report_meta = types.SimpleNamespace(
+                            tile_px=tile_px,
+                            tile_um=tile_um,
+                            qc=qc,
+                            total_slides=num_slides,
+                            slides_skipped=len([r for r in rep_vals if r is None]),
+                            roi_method=roi_method,
+                            stride=stride_div,
+                            gs_frac=img_kwargs['grayspace_fraction'],
+                            gs_thresh=img_kwargs['grayspace_threshold'],
+                            ws_frac=img_kwargs['whitespace_fraction'],
+                            ws_thresh=img_kwargs['whitespace_threshold'],
+                            normalizer=img_kwargs['normalizer'],
+                            img_format=img_kwargs['img_format']
+                        )
+                        pdf_report = ExtractionReport(
+                            [r for r in rep_vals if r is not None],
+                            meta=report_meta,
+                            pool=pool
+                        )
+                        _time = datetime.now().strftime('%Y%m%d-%H%M%S')
+                        pdf_dir = tfrecord_dirs[i] if tfrecord_dirs[i] else ''
+                        pdf_report.save(
+                            join(pdf_dir, f'tile_extraction_report-{_time}.pdf')
+                        )
+                        pdf_report.update_csv(
+                            join(pdf_dir, 'extraction_report.csv')
+                        )
+                        warn_path = join(pdf_dir, f'warn_report-{_time}.txt')
+                        if pdf_report.warn_txt:
+                            with open(warn_path, 'w') as warn_f:
+                                warn_f.write(pdf_report.warn_txt)
 
                 # Close the multiprocessing pool.
                 if pool is not None:
                     pool.close()
 
-        # Update manifest & rebuild indices
-        self.update_manifest(force_update=True)
-        self.build_index(True)
-        all_reports = [r for r in all_reports if r is not None]
+        # Update manifest & rebuild indices. TFRecords which were written
+        # during extraction are re-indexed by the catalog update.
+        self.update_manifest()
+        self.build_index(False)
+        if multiscale:
+            for label in labels:
+                if label == self.sources[sources[0]]['label']:
+                    continue
+                for source in sources:
+                    if not self._tfrecords_set(source):
+                        continue
+                    label_dir = join(self.sources[source]['tfrecords'], label)
+                    if not exists(label_dir):
+                        continue
+                    sf.io.update_manifest_at_dir(directory=label_dir)
+                    for tfr in glob(join(label_dir, '*.tfrecords')):
+                        _create_index(tfr)
+            return {
+                label: {r.path: r for r in label_reports if r is not None}
+                for label, label_reports in zip(labels, all_reports)
+            }
+        all_reports = [r for r in all_reports[0] if r is not None]
         return {report.path: report for report in all_reports}
 
     def extract_tiles_from_tfrecords(self, dest: str) -> None:
@@ -2180,21 +2334,18 @@ class Dataset:
             return results, unique_labels
 
     def load_indices(self, verbose=False) -> Dict[str, np.ndarray]:
-        """Return TFRecord indices."""
-        pool = DPool(8)
-        tfrecords = self.tfrecords()
-        indices = {}
-
-        def load_index(tfr):
-            tfr_name = path_to_name(tfr)
-            index = tfrecord2idx.load_index(tfr)
-            return tfr_name, index
+        """Return TFRecord indices.
 
+        Indices are read from the TFRecord catalog of each tfrecords folder
+        (see :class:`slideflow.util.catalog.TFRecordCatalog`), falling back
+        to per-TFRecord index files for TFRecords not in a catalog.
+        """
+        tfrecords = self.tfrecords()
         log.debug("Loading indices...")
-        for tfr_name, index in pool.imap(load_index, tfrecords):
-            indices[tfr_name] = index
-        pool.close()
-        return indices
+        indices = catalog_utils.load_indices(
+            tfrecords, directories=self.tfrecords_folders()
+        )
+        return {path_to_name(tfr): index for tfr, index in zip(tfrecords, indices)}
 
     def manifest(
         self,
@@ -3146,6 +3297,8 @@ class Dataset:
         labels: Labels = None,
         batch_size: Optional[int] = None,
         from_wsi: bool = False,
+        buffer: Optional[SlideBuffer] = None,
+        from_tilestore: Union[bool, str] = False,
         **kwargs: Any
     ) -> "tf.data.Dataset":
         """Return a Tensorflow Dataset object that interleaves tfrecords.
@@ -3182,6 +3335,15 @@ class Dataset:
                 determinism for performance. Defaults to False.
             drop_last (bool, optional): Drop the last non-full batch.
                 Defaults to False.
+            buffer (:class:`slideflow.slide.SlideBuffer`, optional): If
+                ``from_wsi=True``, read slides from copies in this slide
+                buffer, copying slides which are not yet cached. Slides
+                remain pinned in the buffer until the dataset is deleted.
+                Defaults to None.
+            from_tilestore (bool or str): Read pre-decoded tiles from tile
+                stores created with :meth:`Dataset.tfrecords_to_tilestore`,
+                rather than decoding TFRecords. If a str, the directory
+                containing the tile stores. Defaults to False.
             from_wsi (bool): Generate predictions from tiles dynamically
                 extracted from whole-slide images, rather than TFRecords.
                 Defaults to False (use TFRecords).
@@ -3249,15 +3411,31 @@ class Dataset:
             clip = self._clip
             if not tfrecords:
                 raise errors.TFRecordsNotFoundError
-            self.verify_img_format(progress=False)
-
-        return interleave(paths=tfrecords,
-                          labels=labels,
-                          img_size=self.tile_px,
-                          batch_size=batch_size,
-                          prob_weights=prob_weights,
-                          clip=clip,
-                          **kwargs)
+            if not from_tilestore:
+                self.verify_img_format(progress=False)
+        buffered = None
+        if from_wsi and buffer is not None:
+            tfrecords = buffered = buffer.fetch_many(tfrecords)
+        if from_tilestore and not from_wsi:
+            stores = self._tilestore_paths(tfrecords, from_tilestore)
+            if prob_weights:
+                prob_weights = {stores[t]: w for t, w in prob_weights.items()
+                                if t in stores}
+            if clip:
+                clip = {stores[t]: c for t, c in clip.items() if t in stores}
+            tfrecords = [stores[t] for t in tfrecords]
+            kwargs['from_tilestore'] = True
+
+        dataset = interleave(paths=tfrecords,
+                             labels=labels,
+                             img_size=self.tile_px,
+                             batch_size=batch_size,
+                             prob_weights=prob_weights,
+                             clip=clip,
+                             **kwargs)
+        if buffered is not None:
+            dataset = _release_on_close(dataset, buffer, buffered)
+        return dataset
 
     def tfrecord_report(
         self,
@@ -3520,6 +3698,55 @@ class Dataset:
                 return False
         return True
 
+    def tfrecords_to_tilestore(
+        self,
+        dest: Optional[str] = None,
+        force: bool = False
+    ) -> None:
+        """Decode TFRecords into memory-mapped tile stores.
+
+        Each TFRecord is converted into a tile store
+        (see :mod:`slideflow.io.tilestore`), holding its tiles as a single
+        uint8 array. Dataloaders created with ``from_tilestore`` read tiles
+        from these stores with no image decoding. Tile stores take roughly
+        as much space as the uncompressed images, so are best kept on fast
+        local storage.
+
+        Tile stores which are newer than their TFRecord are not rebuilt.
+
+        Args:
+            dest (str, optional): Directory in which to save tile stores.
+                Defaults to None (save next to each TFRecord).
+            force (bool): Rebuild existing tile stores. Defaults to False.
+
+        """
+        tfrecords = self.tfrecords()
+        if not tfrecords:
+            raise errors.TFRecordsNotFoundError
+        to_write = [
+            (tfr, sf.io.tilestore.tilestore_path(tfr, dest))
+            for tfr in tfrecords
+        ]
+        if not force:
+            to_write = [
+                (tfr, path) for tfr, path in to_write
+                if not sf.io.tilestore.is_current(path, tfr)
+            ]
+        if not to_write:
+            log.info("Tile stores are up to date.")
+            return
+        pool = mp.Pool(
+            sf.util.num_cpu(),
+            initializer=sf.util.set_ignore_sigint
+        )
+        for _ in track(pool.imap_unordered(_write_tilestore, to_write),
+                       description='Writing tile stores...',
+                       total=len(to_write),
+                       transient=True):
+            pass
+        pool.close()
+        log.info(f"Wrote {len(to_write)} tile stores.")
+
     def thumbnails(
         self,
         outdir: str,
@@ -3625,6 +3852,8 @@ class Dataset:
         batch_size: Optional[int] = None,
         rebuild_index: bool = False,
         from_wsi: bool = False,
+        buffer: Optional[SlideBuffer] = None,
+        from_tilestore: Union[bool, str] = False,
         **kwargs: Any
     ) -> "DataLoader":
         """Return a PyTorch DataLoader object that interleaves tfrecords.
@@ -3653,13 +3882,34 @@ class Dataset:
 
                 Combine letters to define augmentations, such as ``'xyrjn'``.
                 A value of True will use ``'xyrjb'``.
+            batch_augment (bool, optional): Apply augmentations, stain
+                normalization, and standardization to whole batches after
+                collation, rather than to each image. Requires
+                ``batch_size``. Defaults to False.
             chunk_size (int, optional): Chunk size for image decoding.
                 Defaults to 1.
+            decode_backend (str, optional): Decode images with ``'threads'``
+                in each DataLoader worker, or with ``'processes'`` returning
+                images through shared memory, in place of DataLoader
+                workers. Defaults to 'threads'.
             drop_last (bool, optional): Drop the last non-full batch.
                 Defaults to False.
+            buffer (:class:`slideflow.slide.SlideBuffer`, optional): If
+                ``from_wsi=True``, read slides from copies in this slide
+                buffer, copying slides which are not yet cached. Slides
+                remain pinned in the buffer until the dataloader is closed
+                or deleted. Defaults to None.
+            from_tilestore (bool or str): Read pre-decoded tiles from tile
+                stores created with :meth:`Dataset.tfrecords_to_tilestore`,
+                rather than decoding TFRecords. If a str, the directory
+                containing the tile stores. Defaults to False.
             from_wsi (bool): Generate predictions from tiles dynamically
                 extracted from whole-slide images, rather than TFRecords.
                 Defaults to False (use TFRecords).
+            global_shuffle (bool, optional): Read tiles in a globally shuffled
+                order drawn from the TFRecord indices each epoch, rather than
+                streaming each TFRecord sequentially. Use ``seed`` to share the
+                shuffle across replicas. Defaults to False.
             incl_loc (bool, optional): Include loc_x and loc_y as additional
                 returned variables. Defaults to False.
             incl_slidenames (bool, optional): Include slidenames as third returned
@@ -3686,6 +3936,9 @@ class Dataset:
                 dataloaders. Defaults to None.
             prefetch_factor (int, optional): Number of batches to prefetch in each
                 SlideflowIterator. Defaults to 1.
+            profiler (:class:`slideflow.io.profiling.LoaderProfiler`, optional):
+                Record per-stage loading latency, queue depths, and stall
+                time. Defaults to None.
             rank (int, optional): Worker ID to identify this worker.
                 Used to interleave results.
                 among workers without duplications. Defaults to 0 (first worker).
@@ -3702,6 +3955,8 @@ class Dataset:
                 before standardization. Defaults to None.
             tfrecord_parser (Callable, optional): Custom parser for TFRecords.
                 Defaults to None.
+            use_mmap (bool, optional): Read TFRecords through memory maps,
+                locating records with the index files. Defaults to False.
 
         """
         from slideflow.io.torch import interleave_dataloader
@@ -3720,6 +3975,12 @@ class Dataset:
             kwargs['tile_um'] = self.tile_um
             indices = None
             clip = None
+        elif from_tilestore:
+            tfrecords = self.tfrecords()
+            if not tfrecords:
+                raise errors.TFRecordsNotFoundError
+            indices = None
+            clip = self._clip
         else:
             self.build_index(rebuild_index)
             tfrecords = self.tfrecords()
@@ -3734,17 +3995,29 @@ class Dataset:
             prob_weights = [self.prob_weights[tfr] for tfr in tfrecords]
         else:
             prob_weights = None
-
-        return interleave_dataloader(tfrecords=tfrecords,
-                                     img_size=self.tile_px,
-                                     batch_size=batch_size,
-                                     labels=labels,
-                                     num_tiles=self.num_tiles,
-                                     prob_weights=prob_weights,
-                                     clip=clip,
-                                     indices=indices,
-                                     from_wsi=from_wsi,
-                                     **kwargs)
+        buffered = None
+        if from_wsi and buffer is not None:
+            tfrecords = buffered = buffer.fetch_many(tfrecords)
+        if from_tilestore and not from_wsi:
+            stores = self._tilestore_paths(tfrecords, from_tilestore)
+            if clip:
+                clip = {stores[t]: c for t, c in clip.items() if t in stores}
+            tfrecords = [stores[t] for t in tfrecords]
+            kwargs['from_tilestore'] = True
+
+        dataloader = interleave_dataloader(tfrecords=tfrecords,
+                                           img_size=self.tile_px,
+                                           batch_size=batch_size,
+                                           labels=labels,
+                                           num_tiles=self.num_tiles,
+                                           prob_weights=prob_weights,
+                                           clip=clip,
+                                           indices=indices,
+                                           from_wsi=from_wsi,
+                                           **kwargs)
+        if buffered is not None:
+            dataloader = _release_on_close(dataloader, buffer, buffered)
+        return dataloader
 
     def unclip(self) -> "Dataset":
         """Return a dataset object with all clips removed.
@@ -3758,11 +4031,15 @@ class Dataset:
         return ret
 
     def update_manifest(self, force_update: bool = False) -> None:
-        """Update tfrecord manifests.
+        """Update tfrecord manifests and catalogs.
+
+        Each tfrecords folder has a catalog of TFRecord indices and record
+        counts (see :class:`slideflow.util.catalog.TFRecordCatalog`), which
+        is updated for TFRecords that are new or have been modified.
 
         Args:
             forced_update (bool, optional): Force regeneration of the
-                manifests from scratch.
+                manifests and catalogs from scratch.
 
         """
         tfrecords_folders = self.tfrecords_folders()
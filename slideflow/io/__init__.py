@@ -1,10 +1,8 @@
 """TFRecord reading/writing utilities for both Tensorflow and PyTorch."""
 
-import copy
 import os
 import struct
 import numpy as np
-from multiprocessing.dummy import Pool as DPool
 from os.path import exists, isdir, isfile, join
 from random import shuffle
 from typing import Any, Dict, Optional, Tuple, Union, List
@@ -12,9 +10,12 @@ from typing import Any, Dict, Optional, Tuple, Union, List
 import slideflow as sf
 from slideflow import errors
 from slideflow.io.io_utils import detect_tfrecord_format, convert_dtype
+from slideflow.io.tilestore import TileStore, write_tilestore
 from slideflow.util import log, tfrecord2idx
-from slideflow.util.tfrecord2idx import get_tfrecord_by_index, get_tfrecord_length
-from rich.progress import Progress
+from slideflow.util import catalog as catalog_utils
+from slideflow.util.tfrecord2idx import (
+    get_tfrecord_by_index, get_tfrecord_length, TFRecordRandomAccessReader
+)
 
 # --- Backend-specific imports and configuration ------------------------------
 
@@ -48,67 +49,69 @@ def update_manifest_at_dir(
     directory and all subdirectories, saving manifest to file within
     the parent directory.
 
+    Record counts are read from the directory's TFRecord catalog
+    (see :class:`slideflow.util.catalog.TFRecordCatalog`), which is
+    updated for TFRecords that are new or have changed.
+
     """
     manifest_path = join(directory, "manifest.json")
     if not exists(manifest_path):
-        manifest = {}
+        prior_manifest = {}
     else:
-        manifest = sf.util.load_json(manifest_path)
-    prior_manifest = copy.deepcopy(manifest)
-    try:
-        rel_paths = sf.util.get_relative_tfrecord_paths(directory)
-    except FileNotFoundError:
+        prior_manifest = sf.util.load_json(manifest_path)
+    if not isdir(directory):
         log.debug(f"Failed to update manifest {directory}; no TFRecords")
         return None
 
-    # Verify all tfrecords in manifest exist
-    for rel_tfr in prior_manifest.keys():
-        tfr = join(directory, rel_tfr)
-        if not exists(tfr):
-            log.warning(f"TFRecord {tfr} in manifest was not found; removing")
-            del(manifest[rel_tfr])
+    catalog, failed = catalog_utils.update_catalog(directory, force=force_update)
+
+    def remove_tfr(tfr):
+        os.remove(tfr)
+        index = tfrecord2idx.find_index(tfr)
+        if index is not None:
+            os.remove(index)
 
-    def process_tfr(rel_tfr):
+    for rel_tfr in failed:
         tfr = join(directory, rel_tfr)
-        if ((not force_update)
-           and (rel_tfr in manifest)
-           and ('total' in manifest[rel_tfr])):
-            return None
-        rel_tfr_manifest = {rel_tfr: {}}
-        try:
-            total = get_tfrecord_length(tfr)
-        except (errors.TFRecordsError, OSError):
-            log.error(f"Corrupt or incomplete TFRecord at {tfr}; removing")
-            os.remove(tfr)
-            return None
-        if not total:
-            log.error(f"Empty TFRecord at {tfr}; removing")
-            os.remove(tfr)
-            return None
-        rel_tfr_manifest[rel_tfr]['total'] = total
-        return rel_tfr_manifest
-
-    pool = DPool(8)
-    if sf.getLoggingLevel() <= 20:
-        pb = Progress(transient=True)
-        task = pb.add_task("Verifying tfrecords...", total=len(rel_paths))
-        pb.start()
-    else:
-        pb = None
-    with sf.util.cleanup_progress(pb):
-        for m in pool.imap(process_tfr, rel_paths):
-            if pb is not None:
-                pb.advance(task)
-            if m is None:
-                continue
-            manifest.update(m)
+        log.error(f"Corrupt or incomplete TFRecord at {tfr}; removing")
+        remove_tfr(tfr)
+    manifest = catalog.manifest()
+    empty = [rel_tfr for rel_tfr, m in manifest.items() if not m['total']]
+    for rel_tfr in empty:
+        tfr = join(directory, rel_tfr)
+        log.error(f"Empty TFRecord at {tfr}; removing")
+        remove_tfr(tfr)
+        catalog.remove(tfr)
+        del manifest[rel_tfr]
+    if empty:
+        catalog.save()
+
     # Write manifest file
     if (manifest != prior_manifest) or (manifest == {}):
         sf.util.write_json(manifest, manifest_path)
-    pool.close()
     return manifest
 
 
+def get_indices_by_location(
+    tfrecord: str,
+    locations: Union[np.ndarray, List[Tuple[int, int]]]
+) -> np.ndarray:
+    """Find the record indices for an array of tile locations.
+
+    Lookups use a sorted table of tile locations, loaded once per TFRecord
+    and reused by later calls.
+
+    Args:
+        tfrecord (str): Path to TFRecord file.
+        locations (np.ndarray): ``(x, y)`` tile locations, of shape (N, 2).
+
+    Returns:
+        np.ndarray: Index of the record for each location, or -1 for
+        locations not found in the TFRecord.
+    """
+    return tfrecord2idx.default_reader().lookup(tfrecord, np.asarray(locations))
+
+
 def get_tfrecord_by_location(
     tfrecord: str,
     location: Tuple[int, int],
@@ -138,18 +141,16 @@ def get_tfrecord_by_location(
        or not isinstance(location[1], (int, np.integer))):
         raise IndexError(f"index must be a tuple of two ints. Got: {location}")
 
-    # Use index files, if available.
-    index = tfrecord2idx.find_index(tfrecord)
-    if decode and index and tfrecord2idx.index_has_locations(index):
-        locations = tfrecord2idx.get_locations_from_index(index)
-        try:
-            idx = locations.index(location)
-        except ValueError:
+    # Use the shared random-access reader, which caches location lookups.
+    if decode:
+        record = tfrecord2idx.default_reader().get_by_location(
+            tfrecord, location
+        )
+        if record is None:
             log.error(
                 f"Unable to find record with location {location} in {tfrecord}"
             )
             return False, False
-        record = tfrecord2idx.get_tfrecord_by_index(tfrecord, idx)
         slide = record['slide']
         image = sf.io._decode_image(record['image_raw'])
         return slide, image
@@ -336,13 +337,11 @@ def get_locations_from_tfrecord(filename: str) -> List[Tuple[int, int]]:
     if index and tfrecord2idx.index_has_locations(index):
         return tfrecord2idx.get_locations_from_index(index)
 
-    # Otherwise, read the TFRecord manually.
+    # Otherwise, scan the TFRecord for location fields.
     out_list = []
-    for i in range(sf.io.get_tfrecord_length(filename)):
-        record = sf.io.get_tfrecord_by_index(filename, i)
-        loc_x = record['loc_x']
-        loc_y = record['loc_y']
-        out_list.append((loc_x, loc_y))
+    for _, _, record in tfrecord2idx.iter_record_spans(filename):
+        locations = tfrecord2idx.scan_int64_features(record)
+        out_list.append((locations['loc_x'], locations['loc_y']))
     return out_list
 
 
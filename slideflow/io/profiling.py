@@ -0,0 +1,185 @@
+"""Per-stage instrumentation of data loading.
+
+A :class:`LoaderProfiler` records latency histograms for each stage of
+:func:`slideflow.io.torch.interleave` - reading records, parsing, image
+decoding, augmentation and stain normalization - along with the depth of
+the interleaving queues and the time consumers spend waiting for data.
+
+Counters are kept in shared memory, so a profiler created before
+DataLoader workers (or decode processes) are started collects results
+from every worker. Recording a measurement costs a lock acquisition and a
+few arithmetic operations, which is small compared with decoding a tile.
+"""
+
+import bisect
+import multiprocessing as mp
+import time
+from typing import Any, Callable, Dict
+
+import numpy as np
+
+# Stages of the loading pipeline.
+#   read:       Reading the next record from the interleaved TFRecords.
+#   parse:      Parsing a record into an image and metadata.
+#   decode:     Decoding the image.
+#   augment:    Augmentations, transforms, and standardization.
+#   normalize:  Stain normalization.
+#   stall:      Time the interleave consumer waits for decoded images.
+#   batch_wait: Time the training loop waits for a batch.
+STAGES = ('read', 'parse', 'decode', 'augment', 'normalize', 'stall', 'batch_wait')
+QUEUES = ('raw_q', 'proc_q')
+
+# Latency histogram bin edges, in seconds (1 us to 10 s, 4 per decade).
+BIN_EDGES = np.logspace(-6, 1, 29)
+MAX_QUEUE_DEPTH = 64
+
+# -----------------------------------------------------------------------------
+
+
+class LoaderProfiler:
+    """Opt-in instrumentation of the data loading pipeline.
+
+    Examples
+        Profile a dataloader.
+
+            .. code-block:: python
+
+                from slideflow.io.profiling import LoaderProfiler
+
+                profiler = LoaderProfiler()
+                dl = dataset.torch(labels, batch_size=32, profiler=profiler)
+                ...
+                print(profiler.summary())
+
+    """
+
+    def __init__(self) -> None:
+        n_bins = len(BIN_EDGES) + 1
+        self._edges = BIN_EDGES.tolist()
+        self._lock = mp.Lock()
+        self._hist = mp.RawArray('q', len(STAGES) * n_bins)
+        self._total = mp.RawArray('d', len(STAGES))
+        self._depth = mp.RawArray('q', len(QUEUES) * (MAX_QUEUE_DEPTH + 1))
+        self._start = mp.RawValue('d', time.perf_counter())
+        self._stage_idx = {s: i for i, s in enumerate(STAGES)}
+        self._queue_idx = {q: i for i, q in enumerate(QUEUES)}
+
+    def __repr__(self) -> str:
+        counts = self.counts()
+        return "LoaderProfiler({})".format(
+            ", ".join(f"{s}={n}" for s, n in counts.items() if n)
+        )
+
+    def record(self, stage: str, seconds: float) -> None:
+        """Record the duration of one call of a stage."""
+        i = self._stage_idx[stage]
+        b = bisect.bisect(self._edges, seconds)
+        with self._lock:
+            self._hist[i * (len(self._edges) + 1) + b] += 1
+            self._total[i] += seconds
+
+    def record_depth(self, queue: str, depth: int) -> None:
+        """Record an observation of the depth of a queue."""
+        i = self._queue_idx[queue]
+        with self._lock:
+            self._depth[i * (MAX_QUEUE_DEPTH + 1) + min(depth, MAX_QUEUE_DEPTH)] += 1
+
+    def wrap(self, stage: str, fn: Callable) -> Callable:
+        """Wrap a function, recording the duration of each call."""
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            result = fn(*args, **kwargs)
+            self.record(stage, time.perf_counter() - start)
+            return result
+        return timed
+
+    def reset(self) -> None:
+        """Clear all measurements."""
+        with self._lock:
+            for arr in (self._hist, self._total, self._depth):
+                for i in range(len(arr)):
+                    arr[i] = 0
+            self._start.value = time.perf_counter()
+
+    def histograms(self) -> Dict[str, np.ndarray]:
+        """Return the latency histogram of each stage.
+
+        Returns:
+            Dict[str, np.ndarray]: Counts for each stage, with one bin below
+            and one above the edges in ``slideflow.io.profiling.BIN_EDGES``.
+        """
+        with self._lock:
+            hist = np.array(self._hist[:], dtype=np.int64)
+        return dict(zip(STAGES, hist.reshape(len(STAGES), -1)))
+
+    def counts(self) -> Dict[str, int]:
+        """Return the number of recorded calls of each stage."""
+        return {s: int(h.sum()) for s, h in self.histograms().items()}
+
+    def summary(self) -> Dict[str, Any]:
+        """Summarize measurements.
+
+        Percentiles are estimated from the histograms, with a resolution of
+        a quarter of a decade.
+
+        Returns:
+            Dict with the keys:
+
+                stages: Dict mapping each stage to its ``count``, ``total_s``,
+                ``mean_ms``, ``p50_ms``, ``p90_ms`` and ``p99_ms``.
+
+                queues: Dict mapping each queue to its ``mean_depth`` and
+                ``max_depth``.
+
+                elapsed_s: Seconds since the profiler was created or reset.
+        """
+        hists = self.histograms()
+        with self._lock:
+            totals = list(self._total[:])
+            depth = np.array(self._depth[:], dtype=np.int64)
+            elapsed = time.perf_counter() - self._start.value
+        # Geometric center of each bin, for estimating percentiles.
+        centers = np.sqrt(BIN_EDGES[:-1] * BIN_EDGES[1:])
+        centers = np.concatenate([[BIN_EDGES[0]], centers, [BIN_EDGES[-1]]])
+        stages = {}
+        for stage, total in zip(STAGES, totals):
+            hist = hists[stage]
+            count = int(hist.sum())
+            if not count:
+                continue
+            cdf = np.cumsum(hist) / count
+            stages[stage] = {
+                'count': count,
+                'total_s': total,
+                'mean_ms': total / count * 1000,
+                **{f'p{q}_ms': float(centers[np.searchsorted(cdf, q / 100)] * 1000)
+                   for q in (50, 90, 99)}
+            }
+        queues = {}
+        levels = np.arange(MAX_QUEUE_DEPTH + 1)
+        for queue, hist in zip(QUEUES, depth.reshape(len(QUEUES), -1)):
+            if hist.sum():
+                queues[queue] = {
+                    'mean_depth': float((hist * levels).sum() / hist.sum()),
+                    'max_depth': int(levels[hist > 0].max())
+                }
+        return {'stages': stages, 'queues': queues, 'elapsed_s': elapsed}
+
+    def scalars(self, prefix: str = 'loader') -> Dict[str, float]:
+        """Flatten the summary into named scalars, for logging.
+
+        Args:
+            prefix (str): Prefix of each name. Defaults to 'loader'.
+
+        Returns:
+            Dict[str, float]: Mapping of names, such as
+            ``'loader/decode/p90_ms'``, to values.
+        """
+        summary = self.summary()
+        scalars = {}
+        for group in ('stages', 'queues'):
+            for name, values in summary[group].items():
+                for key, value in values.items():
+                    scalars[f'{prefix}/{name}/{key}'] = value
+        return scalars
+
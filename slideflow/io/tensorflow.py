@@ -17,6 +17,7 @@ import slideflow as sf
 from slideflow import errors
 from slideflow.io import gaussian
 from slideflow.io.io_utils import detect_tfrecord_format
+from slideflow.io.tilestore import TileStore, TileStoreIterator
 from slideflow.util import Labels
 from slideflow.util import log
 
@@ -434,6 +435,7 @@ def interleave(
     clip: Optional[Dict[str, int]] = None,
     deterministic: bool = False,
     drop_last: bool = False,
+    from_tilestore: bool = False,
     from_wsi: bool = False,
     incl_loc: Optional[str] = None,
     incl_slidenames: bool = False,
@@ -486,6 +488,9 @@ def interleave(
             determinism for performance. Defaults to False.
         drop_last (bool, optional): Drop the last non-full batch.
             Defaults to False.
+        from_tilestore (bool): Read pre-decoded tiles from tile stores
+            (see :mod:`slideflow.io.tilestore`), rather than TFRecords.
+            ``paths`` should then be paths to tile stores. Defaults to False.
         from_wsi (bool): Generate predictions from tiles dynamically
             extracted from whole-slide images, rather than TFRecords.
             Defaults to False (use TFRecords).
@@ -611,6 +616,11 @@ def interleave(
                 otsu_list += [wsi]
                 pb.advance(otsu_task)
             est_num_tiles = sum([wsi.estimated_num_tiles for wsi in otsu_list])
+        elif from_tilestore:
+
+            def base_parser(record):
+                return tuple([record[f] for f in features_to_return])
+
         elif tfrecord_parser is None:
             base_parser = None  # type: ignore
             for i in range(len(paths)):
@@ -636,14 +646,22 @@ def interleave(
                     incl_loc=incl_loc,
                 )
                 tfr = sf.util.path_to_name(tfr)
+            elif from_tilestore:
+                # Sharding and clipping are applied when reading the store,
+                # so that skipped tiles are never read.
+                tf_dts = _tilestore_dataset(
+                    tfr,
+                    shard=((shard_idx, num_shards) if num_shards else None),
+                    clip=(clip[tfr] if clip else None)
+                )
             else:
                 tf_dts = tf.data.TFRecordDataset(
                     tfr,
                     num_parallel_reads=num_parallel_reads
                 )
-            if num_shards:
+            if num_shards and not from_tilestore:
                 tf_dts = tf_dts.shard(num_shards, index=shard_idx)
-            if clip:
+            if clip and not from_tilestore:
                 tf_dts = tf_dts.take(
                     clip[tfr] // (num_shards if num_shards else 1)
                 )
@@ -705,6 +723,26 @@ def interleave(
         return dataset
 
 
+def _tilestore_dataset(
+    path: str,
+    shard: Optional[Tuple[int, int]] = None,
+    clip: Optional[int] = None
+) -> tf.data.Dataset:
+    """Return a dataset of tile dictionaries read from a tile store."""
+    with TileStore(path) as store:
+        tile_shape = store.tile_shape
+    loader = TileStoreIterator(path, shard=shard, clip=clip)
+    return tf.data.Dataset.from_generator(
+        lambda: iter(loader),
+        output_signature={
+            'image_raw': tf.TensorSpec(shape=tile_shape, dtype=tf.uint8),
+            'slide': tf.TensorSpec(shape=(), dtype=tf.string),
+            'loc_x': tf.TensorSpec(shape=(), dtype=tf.int64),
+            'loc_y': tf.TensorSpec(shape=(), dtype=tf.int64)
+        }
+    )
+
+
 def _get_parsed_datasets(
     tfrecord_dataset: tf.data.Dataset,
     base_parser: Callable,
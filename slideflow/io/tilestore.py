@@ -0,0 +1,325 @@
+"""Memory-mapped stores of pre-decoded tiles.
+
+A tile store holds every tile of a TFRecord, already decoded, as a single
+uint8 array of shape ``(N, H, W, 3)`` saved in NumPy ``.npy`` format
+(``{slide}.tiles.npy``). Tiles have a fixed stride, so a store can be
+memory-mapped and read with no image decoding. A sidecar file
+(``{slide}.tiles.npz``) holds the slide name, the ``(x, y)`` location of
+each tile, and the byte offset of each tile within the store.
+
+Tile stores trade disk space for CPU time, and are most useful for datasets
+which fit on local SSD storage.
+"""
+
+import os
+import cv2
+import numpy as np
+from os.path import dirname, exists, join
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from slideflow import errors
+from slideflow.tfrecord.iterator_utils import RandomSampler
+from slideflow.util import path_to_name, tfrecord2idx
+
+TILESTORE_EXT = '.tiles.npy'
+SIDECAR_EXT = '.tiles.npz'
+
+# -----------------------------------------------------------------------------
+
+
+def tilestore_path(tfrecord: str, directory: Optional[str] = None) -> str:
+    """Return the path of the tile store for a TFRecord.
+
+    Args:
+        tfrecord (str): Path to TFRecord.
+        directory (str, optional): Directory containing tile stores.
+            Defaults to None (the directory of the TFRecord).
+
+    Returns:
+        str: Path to the tile store.
+    """
+    if directory is None:
+        directory = dirname(tfrecord)
+    return join(directory, path_to_name(tfrecord) + TILESTORE_EXT)
+
+
+def sidecar_path(path: str) -> str:
+    """Return the path of the sidecar for a tile store."""
+    return path[:-len(TILESTORE_EXT)] + SIDECAR_EXT
+
+
+def is_current(path: str, tfrecord: str) -> bool:
+    """Check if a tile store exists and is newer than its TFRecord."""
+    return (exists(path)
+            and exists(sidecar_path(path))
+            and os.path.getmtime(sidecar_path(path)) >= os.path.getmtime(tfrecord))
+
+
+def _decode(image_raw: bytes) -> np.ndarray:
+    image = cv2.imdecode(np.frombuffer(image_raw, dtype=np.uint8),
+                         cv2.IMREAD_COLOR)
+    if image is None:
+        raise errors.TFRecordsError("Unable to decode image.")
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+def write_tilestore(
+    tfrecord: str,
+    path: Optional[str] = None,
+    *,
+    chunk_size: int = 256
+) -> str:
+    """Decode the tiles in a TFRecord and save them as a tile store.
+
+    Files are written under temporary names and moved into place once
+    complete, so an interrupted conversion never leaves a partial store.
+
+    Args:
+        tfrecord (str): Path to TFRecord.
+        path (str, optional): Destination path of the tile store. Defaults
+            to None (``{slide}.tiles.npy`` next to the TFRecord).
+
+    Keyword args:
+        chunk_size (int): Number of records to read at a time.
+            Defaults to 256.
+
+    Returns:
+        str: Path to the tile store.
+
+    Raises:
+        slideflow.errors.EmptyTFRecordsError: If the TFRecord is empty.
+    """
+    if path is None:
+        path = tilestore_path(tfrecord)
+    if dirname(path) and not exists(dirname(path)):
+        os.makedirs(dirname(path))
+    with tfrecord2idx.TFRecordRandomAccessReader(max_open_files=1) as reader:
+        n_tiles = len(reader.index(tfrecord))
+        if not n_tiles:
+            raise errors.EmptyTFRecordsError(f"{tfrecord} is empty.")
+        first = reader.get(tfrecord, 0)
+        tile_shape = _decode(first['image_raw']).shape
+        slide = first['slide']
+        locations = np.full((n_tiles, 2), -1, dtype=np.int64)
+        tmp_path = path + '.tmp'
+        tiles = np.lib.format.open_memmap(
+            tmp_path, mode='w+', dtype=np.uint8, shape=(n_tiles,) + tile_shape
+        )
+        try:
+            for start in range(0, n_tiles, chunk_size):
+                idx = range(start, min(start + chunk_size, n_tiles))
+                records = reader.get_many([(tfrecord, i) for i in idx])
+                for i, record in zip(idx, records):
+                    image = _decode(record['image_raw'])
+                    if image.shape != tile_shape:
+                        raise errors.TFRecordsError(
+                            f"Tile {i} in {tfrecord} has shape {image.shape}; "
+                            f"expected {tile_shape}."
+                        )
+                    tiles[i] = image
+                    if 'loc_x' in record and 'loc_y' in record:
+                        locations[i] = (record['loc_x'], record['loc_y'])
+            tiles.flush()
+            offsets = tiles.offset + np.arange(n_tiles, dtype=np.int64) * tiles[0].nbytes
+        finally:
+            del tiles
+    with open(sidecar_path(path) + '.tmp', 'wb') as f:
+        np.savez(f, slide=np.array(slide), locations=locations, offsets=offsets)
+    os.replace(tmp_path, path)
+    os.replace(sidecar_path(path) + '.tmp', sidecar_path(path))
+    return path
+
+
+# -----------------------------------------------------------------------------
+
+class TileStore:
+    """Random access to the tiles of a tile store.
+
+    Tiles are read from a read-only memory map, so no image decoding is
+    needed and only the pages which are read are loaded from disk.
+
+    Examples
+        Read tiles by index or by location.
+
+            .. code-block:: python
+
+                from slideflow.io import TileStore
+
+                with TileStore('/path/to/slide.tiles.npy') as store:
+                    tile = store[0]
+                    tiles = store.get_many([10, 2, 5])
+                    tile = store.get_by_location((1024, 2048))
+
+    """
+
+    def __init__(self, path: str) -> None:
+        """Open a tile store.
+
+        Args:
+            path (str): Path to the tile store (``{slide}.tiles.npy``).
+        """
+        self.path = path
+        with np.load(sidecar_path(path)) as sidecar:
+            self.slide = str(sidecar['slide'])
+            self.locations = sidecar['locations']
+            self.offsets = sidecar['offsets']
+        self.tiles = np.load(path, mmap_mode='r')  # type: Optional[np.memmap]
+        self._location_index = None  # type: Optional[tfrecord2idx.LocationIndex]
+
+    def __repr__(self) -> str:
+        return f"TileStore(path={self.path!r}, num_tiles={len(self)})"
+
+    def __len__(self) -> int:
+        return len(self.locations)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __getitem__(self, idx: int) -> np.ndarray:
+        return np.array(self.tiles[idx])
+
+    @property
+    def tile_shape(self) -> Tuple[int, int, int]:
+        """Shape of each tile (H, W, C)."""
+        return self.tiles.shape[1:]
+
+    def close(self) -> None:
+        """Release the memory map."""
+        self.tiles = None
+
+    def get_many(self, indices: Iterable[int]) -> np.ndarray:
+        """Read a batch of tiles, in the order requested.
+
+        Tiles are read in file order, so that random access touches the
+        memory map as sequentially as possible.
+
+        Args:
+            indices (Iterable[int]): Tile indices.
+
+        Returns:
+            np.ndarray: uint8 array of shape (N, H, W, 3).
+        """
+        indices = np.asarray(list(indices), dtype=np.int64)
+        order = np.argsort(indices, kind='stable')
+        tiles = np.empty((len(indices),) + self.tile_shape, dtype=np.uint8)
+        tiles[order] = self.tiles[indices[order]]
+        return tiles
+
+    def get_by_location(self, location: Tuple[int, int]) -> Optional[np.ndarray]:
+        """Read the tile at a location.
+
+        Args:
+            location (tuple(int, int)): ``(x, y)`` tile location.
+
+        Returns:
+            np.ndarray: uint8 tile, or None if the location is not found.
+        """
+        if self._location_index is None:
+            self._location_index = tfrecord2idx.LocationIndex.from_locations(
+                self.locations
+            )
+        idx = self._location_index.lookup(np.array([location]))[0]
+        return None if idx < 0 else self[idx]
+
+
+class TileStoreIterator:
+    """Iterate over the tiles of a tile store in order.
+
+    Sharding and clipping follow the same rules as TFRecord iterators:
+    tiles are split into contiguous shards, and if there are fewer tiles
+    than shards, the first shard reads every tile.
+
+    Yields dictionaries with the keys ``'image_raw'`` (uint8 array, H x W x C),
+    ``'slide'``, ``'loc_x'`` and ``'loc_y'``.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, bytes],
+        shard: Optional[Tuple[int, int]] = None,
+        clip: Optional[int] = None,
+        chunk_size: int = 64
+    ) -> None:
+        """Create an iterator over a tile store.
+
+        Args:
+            path (str): Path to the tile store.
+            shard (tuple(int, int), optional): ``(index, count)`` of the shard
+                to read. Defaults to None.
+            clip (int, optional): Only read the first ``clip`` tiles.
+                Defaults to None.
+            chunk_size (int): Number of tiles to copy out of the memory map
+                at a time. Defaults to 64.
+        """
+        self.path = path if isinstance(path, str) else path.decode('utf-8')
+        self.shard = shard
+        self.clip = clip
+        self.chunk_size = chunk_size
+        self.store = None  # type: Optional[TileStore]
+
+    def _bounds(self, n_tiles: int) -> Tuple[int, int]:
+        if self.clip:
+            n_tiles = min(self.clip, n_tiles)
+        if self.shard is None:
+            return 0, n_tiles
+        shard_idx, shard_count = self.shard
+        if shard_count >= n_tiles:
+            return (0, n_tiles) if shard_idx == 0 else (0, 0)
+        split = np.array_split(np.arange(n_tiles), shard_count)[shard_idx]
+        return int(split[0]), int(split[-1]) + 1
+
+    def __iter__(self) -> Iterable[Dict]:
+        self.close()
+        self.store = store = TileStore(self.path)
+        start, end = self._bounds(len(store))
+        locations = store.locations.tolist()
+        for chunk_start in range(start, end, self.chunk_size):
+            chunk_end = min(chunk_start + self.chunk_size, end)
+            tiles = np.array(store.tiles[chunk_start:chunk_end])
+            for i, tile in enumerate(tiles, start=chunk_start):
+                yield {
+                    'image_raw': tile,
+                    'slide': store.slide,
+                    'loc_x': locations[i][0],
+                    'loc_y': locations[i][1]
+                }
+        self.close()
+
+    def close(self) -> None:
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+
+def multi_tilestore_loader(
+    paths: List[Union[str, bytes]],
+    splits: Optional[List[float]] = None,
+    shard: Optional[Tuple[int, int]] = None,
+    clip: Optional[List[int]] = None,
+    infinite: bool = True
+) -> RandomSampler:
+    """Create an iterator which interleaves tiles from multiple tile stores.
+
+    Args:
+        paths (list(str)): Paths to tile stores.
+        splits (list(float), optional): Probability weight of each tile store.
+            Defaults to None (equal weights).
+        shard (tuple(int, int), optional): ``(index, count)`` of the shard
+            to read from each tile store. Defaults to None.
+        clip (list(int), optional): Maximum number of tiles to read from each
+            tile store. Defaults to None.
+        infinite (bool): Repeat indefinitely. Defaults to True.
+
+    Returns:
+        An iterator yielding tile dictionaries (see :class:`TileStoreIterator`).
+    """
+    loaders = [
+        TileStoreIterator(path, shard=shard, clip=(None if not clip else clip[i]))
+        for i, path in enumerate(paths)
+    ]
+    if splits is None:
+        splits = np.array([0.5 for _ in range(len(paths))])  # type: ignore
+    return RandomSampler(loaders, splits, infinite=infinite, shard=None)
@@ -2,6 +2,9 @@ import multiprocessing as mp
 import os
 import random
 import threading
+import time
+from collections import deque
+from multiprocessing import shared_memory
 import numpy as np
 import pandas as pd
 import torchvision
@@ -19,11 +22,14 @@ import slideflow as sf
 from slideflow import errors
 from slideflow.io import convert_dtype
 from slideflow.io.io_utils import detect_tfrecord_format
+from slideflow.io import tilestore as tilestore_utils
 from slideflow.tfrecord.torch.dataset import MultiTFRecordDataset
 from slideflow.tfrecord.iterator_utils import RandomSampler
-from slideflow.util import Labels, log, to_onehot, tfrecord2idx
+from slideflow.util import Labels, log, to_onehot
+from slideflow.util import catalog as catalog_utils
 
 if TYPE_CHECKING:
+    from slideflow.io.profiling import LoaderProfiler
     from slideflow.norm import StainNormalizer
     from torchvision.transforms import InterpolationMode
 
@@ -289,6 +295,12 @@ class InterleaveIterator(torch.utils.data.IterableDataset):
         worker_info = torch.utils.data.get_worker_info()
         worker_id = 0 if not worker_info else worker_info.id
         num_workers = 1 if not worker_info else worker_info.num_workers
+        interleave_kwargs = dict(self.interleave_kwargs)
+        if (worker_info and interleave_kwargs.get('global_shuffle')
+           and interleave_kwargs.get('seed') is None):
+            # Workers of a DataLoader share a base seed, so they draw the
+            # same global shuffle and read non-overlapping shards of it.
+            interleave_kwargs['seed'] = (worker_info.seed - worker_id) % 2**32
 
         queue_retriever = interleave(
             self.tfrecords,
@@ -310,7 +322,7 @@ class InterleaveIterator(torch.utils.data.IterableDataset):
             roi_method=self.roi_method,
             pool=self.pool,
             transform=self.transform,
-            **self.interleave_kwargs
+            **interleave_kwargs
         )
         self.close = queue_retriever.close
         try:
@@ -580,11 +592,12 @@ def random_jpeg_compression(img: torch.Tensor):
     return torchvision.io.decode_image(img)
 
 
-def compose_color_distortion(s=1.0):
+def compose_color_distortion(s=1.0, whc=True):
     """Compose augmentation for random color distortion.
 
     Args:
         s (float): Strength of the distortion.
+        whc (bool): Images are in W x H x C format. Defaults to True.
 
     Returns:
         Callable: PyTorch transform
@@ -593,6 +606,8 @@ def compose_color_distortion(s=1.0):
     color_jitter = transforms.ColorJitter(0.8*s, 0.8*s, 0.8*s, 0.2*s)
     rnd_color_jitter = transforms.RandomApply([color_jitter], p=0.8)
     rnd_gray = transforms.RandomGrayscale(p=0.2)
+    if not whc:
+        return transforms.Compose([rnd_color_jitter, rnd_gray])
     color_distort = transforms.Compose(
         [whc_to_cwh, rnd_color_jitter, rnd_gray, cwh_to_whc])
     return color_distort
@@ -604,7 +619,8 @@ def compose_augmentations(
     standardize: bool = False,
     normalizer: Optional["StainNormalizer"] = None,
     transform: Optional[Callable] = None,
-    whc: bool = False
+    whc: bool = False,
+    profiler: Optional["LoaderProfiler"] = None
 ):
     """Compose an augmentation pipeline for image processing.
 
@@ -630,6 +646,10 @@ def compose_augmentations(
             Performs transformation after augmentations but before standardization.
             Defaults to None.
         whc (bool): Images are in W x H x C format. Defaults to False.
+        profiler (:class:`slideflow.io.profiling.LoaderProfiler`, optional):
+            Record the time spent on stain normalization ('normalize') and
+            on all other transformations ('augment') for each image.
+            Defaults to None.
     """
 
     transformations = []
@@ -657,17 +677,18 @@ def compose_augmentations(
         transformations.append(transforms.RandomVerticalFlip(p=0.5))
 
     # Stain normalization.
-    if normalizer is not None:
-        transformations.append(
-            lambda img: normalizer.torch_to_torch(  # type: ignore
-                img,
-                augment=(isinstance(augment, str) and 'n' in augment)
-            )
+    def normalize(img):
+        return normalizer.torch_to_torch(  # type: ignore
+            img,
+            augment=(isinstance(augment, str) and 'n' in augment)
         )
 
+    if normalizer is not None:
+        transformations.append(normalize)
+
     # Random color distortion.
     if (isinstance(augment, str) and 'd' in augment):
-        transformations.append(compose_color_distortion())
+        transformations.append(compose_color_distortion(whc=False))
 
     # Random Gaussian blur.
     if augment is True or (isinstance(augment, str) and 'b' in augment):
@@ -692,11 +713,206 @@ def compose_augmentations(
     if standardize:
         transformations.append(lambda img: img / (255/2) - 1)
 
+    if transformations and profiler is not None:
+        steps = transformations
+
+        def profiled(img):
+            augment_time = 0.
+            start = time.perf_counter()
+            for step in steps:
+                if step is normalize:
+                    now = time.perf_counter()
+                    augment_time += now - start
+                    img = step(img)
+                    start = time.perf_counter()
+                    profiler.record('normalize', start - now)
+                else:
+                    img = step(img)
+            profiler.record('augment', augment_time + time.perf_counter() - start)
+            return img
+
+        transformations = [profiled]
+
     if transformations and whc:
         return transforms.Compose([whc_to_cwh] + transformations + [cwh_to_whc])
     else:
         return transforms.Compose(transformations)
 
+
+class BatchAugmenter:
+    """Apply augmentations and standardization to collated batches.
+
+    Performs the same augmentations as :func:`compose_augmentations`, in the
+    same order and with the same distribution, but on whole batches of
+    uint8 images (N x C x W x H), with random parameters drawn for each
+    image. Rotations and flips are combined into one of eight orientations,
+    and images are transformed in groups, with one tensor operation per
+    orientation, blur strength, or JPEG quality.
+
+    Stain normalization is applied to the whole batch with
+    ``normalizer.torch_to_torch()``. Color distortion (``'d'``) and arbitrary
+    transforms (``transform``, or a callable ``augment``) are applied
+    separately to each image.
+
+    Examples
+        Augment batches after collation in a DataLoader.
+
+            .. code-block:: python
+
+                from slideflow.io.torch import BatchAugmenter
+
+                augmenter = BatchAugmenter('xyrjb', standardize=True)
+                dataloader = torch.utils.data.DataLoader(
+                    ...,
+                    collate_fn=augmenter.collate
+                )
+
+    """
+
+    def __init__(
+        self,
+        augment: Union[str, bool] = False,
+        *,
+        standardize: bool = False,
+        normalizer: Optional["StainNormalizer"] = None,
+        transform: Optional[Callable] = None,
+        profiler: Optional["LoaderProfiler"] = None,
+    ) -> None:
+        """Prepare batch augmentations.
+
+        Args:
+            augment (str or bool): Image augmentations to perform, as
+                described in :func:`compose_augmentations`. A value of True
+                will use ``'xyrjb'``.
+
+        Keyword args:
+            standardize (bool, optional): Standardize images into the range
+                (-1, 1) using img / (255/2) - 1. Defaults to False.
+            normalizer (:class:`slideflow.norm.StainNormalizer`): Stain
+                normalizer to use on images. Defaults to None.
+            transform (Callable, optional): Arbitrary torchvision transform
+                function, applied to each image after augmentations but before
+                standardization. Defaults to None.
+            profiler (:class:`slideflow.io.profiling.LoaderProfiler`, optional):
+                Record the time spent on stain normalization ('normalize') and
+                on all other transformations ('augment') for each batch.
+                Defaults to None.
+        """
+        def enabled(key):
+            return augment is True or (isinstance(augment, str) and key in augment)
+
+        self.augment = augment
+        self.standardize = standardize
+        self.normalizer = normalizer
+        self.transform = transform
+        self.profiler = profiler
+        self.jpeg = enabled('j')
+        self.rotate = enabled('r')
+        self.flip_x = enabled('x')
+        self.flip_y = enabled('y')
+        self.stain_augment = isinstance(augment, str) and 'n' in augment
+        self.color_distort = (compose_color_distortion(whc=False)
+                              if isinstance(augment, str) and 'd' in augment
+                              else None)
+        self.blur = (RandomGaussianBlur(sigma=[0, 0.5, 1.0, 1.5, 2.0],
+                                        weights=[0.9, 0.1, 0.05, 0.025, 0.0125])
+                     if enabled('b') else None)
+
+    def __repr__(self) -> str:
+        return (f"BatchAugmenter(augment={self.augment!r}, "
+                f"standardize={self.standardize})")
+
+    @staticmethod
+    def _per_image(fn: Callable, batch: torch.Tensor) -> torch.Tensor:
+        return torch.stack([fn(img) for img in batch])
+
+    def _jpeg(self, batch: torch.Tensor) -> None:
+        n = batch.shape[0]
+        compress = torch.rand(n) < 0.5
+        quality = ((torch.rand(n) * 50) + 50).int()
+        for q in torch.unique(quality[compress]).tolist():
+            idx = torch.nonzero(compress & (quality == q)).flatten()
+            encoded = torchvision.io.encode_jpeg(list(batch[idx]), quality=q)
+            batch[idx] = torch.stack(
+                [torchvision.io.decode_image(e) for e in encoded]
+            )
+
+    def _orient(self, batch: torch.Tensor) -> None:
+        # Rotations and flips are combined into one of eight orientations
+        # per image, and each group of images is transformed at once.
+        n = batch.shape[0]
+        k = np.zeros(n, dtype=int)
+        if self.rotate:
+            k = np.array(random.choices(range(4), k=n))
+        flip_x = (torch.rand(n) < 0.5).numpy() if self.flip_x else np.zeros(n, bool)
+        flip_y = (torch.rand(n) < 0.5).numpy() if self.flip_y else np.zeros(n, bool)
+        orientation = k * 4 + flip_x * 2 + flip_y
+        for o in np.unique(orientation[orientation > 0]):
+            idx = torch.from_numpy(np.flatnonzero(orientation == o))
+            images = batch[idx]
+            if o // 4:
+                images = torch.rot90(images, int(o // 4), dims=(-2, -1))
+            dims = [d for d, f in ((-1, o & 2), (-2, o & 1)) if f]
+            if dims:
+                images = images.flip(dims)
+            batch[idx] = images
+
+    def _blur(self, batch: torch.Tensor) -> None:
+        assert self.blur is not None
+        sigma = np.array(random.choices(self.blur.sigma,
+                                        weights=self.blur.weights,
+                                        k=batch.shape[0]))
+        for s in self.blur.sigma:
+            if not s:
+                continue
+            idx = torch.from_numpy(np.flatnonzero(sigma == s))
+            if len(idx):
+                batch[idx] = self.blur.blur_fn[s](batch[idx])
+
+    def _augment(self, batch: torch.Tensor) -> torch.Tensor:
+        """Augment a batch, modifying it in place where possible."""
+        start = time.perf_counter()
+        normalize_time = 0.
+        if self.jpeg:
+            self._jpeg(batch)
+        if self.rotate or self.flip_x or self.flip_y:
+            self._orient(batch)
+        if self.normalizer is not None:
+            normalize_start = time.perf_counter()
+            batch = self.normalizer.torch_to_torch(  # type: ignore
+                batch,
+                augment=self.stain_augment
+            )
+            normalize_time = time.perf_counter() - normalize_start
+        if self.color_distort is not None:
+            batch = self._per_image(self.color_distort, batch)
+        if self.blur is not None:
+            self._blur(batch)
+        if callable(self.augment):
+            batch = self._per_image(self.augment, batch)
+        if self.transform is not None:
+            batch = self._per_image(self.transform, batch)
+        if self.standardize:
+            batch = batch.to(torch.float32).div_(255/2).sub_(1)
+        if self.profiler is not None:
+            if self.normalizer is not None:
+                self.profiler.record('normalize', normalize_time)
+            self.profiler.record(
+                'augment', time.perf_counter() - start - normalize_time
+            )
+        return batch
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        """Augment a batch of uint8 images (N x C x W x H)."""
+        return self._augment(batch.clone())
+
+    def collate(self, samples: List[Any]) -> Any:
+        """Collate samples with the default collate function and augment
+        the images, which should be the first item of each sample."""
+        batch = list(torch.utils.data.default_collate(samples))
+        batch[0] = self._augment(batch[0])
+        return batch
+
 # -------------------------------------------------------------------------
 
 def read_and_return_record(
@@ -826,6 +1042,75 @@ def _decode_image(
 
 # -------------------------------------------------------------------------
 
+class _DecodeSlots:
+    """Shared-memory slots for returning decoded images from processes.
+
+    Each slot holds the decoded images of one chunk of records. Slots are
+    created before the decode processes are forked, so processes write to
+    the same mappings without attaching by name. Images which do not fit
+    in the remaining space of a slot are returned through the result
+    queue instead.
+    """
+
+    def __init__(self, n_slots: int, slot_bytes: int) -> None:
+        self.slot_bytes = slot_bytes
+        self.shm = [shared_memory.SharedMemory(create=True, size=slot_bytes)
+                    for _ in range(n_slots)]
+
+    def __len__(self) -> int:
+        return len(self.shm)
+
+    def write(self, slot: int, records: List[List[Any]]) -> List[List[Any]]:
+        """Move decoded images into a slot, replacing them with
+        (offset, shape, dtype) references."""
+        offset = 0
+        for record in records:
+            image = record[0]
+            if not isinstance(image, torch.Tensor):
+                continue
+            image = image.contiguous()
+            nbytes = image.numel() * image.element_size()
+            if offset + nbytes > self.slot_bytes:
+                continue
+            dest = np.ndarray(image.shape, dtype=image.numpy().dtype,
+                              buffer=self.shm[slot].buf, offset=offset)
+            dest[...] = image.numpy()
+            record[0] = (offset, tuple(image.shape), dest.dtype.str)
+            offset += nbytes
+        return records
+
+    def read(self, slot: int, records: List[List[Any]]) -> List[List[Any]]:
+        """Copy images out of a slot, so that it can be reused."""
+        for record in records:
+            if isinstance(record[0], tuple):
+                offset, shape, dtype = record[0]
+                image = np.ndarray(shape, dtype=dtype,
+                                   buffer=self.shm[slot].buf, offset=offset)
+                record[0] = torch.from_numpy(image.copy())
+        return records
+
+    def close(self) -> None:
+        for shm in self.shm:
+            shm.close()
+            shm.unlink()
+        self.shm = []
+
+
+_decode_state = None  # type: Optional[Tuple[Callable, _DecodeSlots]]
+
+
+def _init_decode_process(worker: Callable, slots: _DecodeSlots) -> None:
+    global _decode_state
+    torch.set_num_threads(1)
+    _decode_state = (worker, slots)
+
+
+def _decode_chunk(slot: int, records: List[Any]) -> List[List[Any]]:
+    assert _decode_state is not None
+    worker, slots = _decode_state
+    return slots.write(slot, [worker(record) for record in records])
+
+
 def worker_init_fn(worker_id) -> None:
     np.random.seed(np.random.get_state()[1][0])  # type: ignore
 
@@ -954,6 +1239,12 @@ def interleave(
     pool: Optional[Any] = None,
     transform: Optional[Any] = None,
     tfrecord_parser: Optional[Callable] = None,
+    use_mmap: bool = False,
+    from_tilestore: bool = False,
+    global_shuffle: bool = False,
+    seed: Optional[int] = None,
+    decode_backend: str = 'threads',
+    profiler: Optional["LoaderProfiler"] = None,
 ):
 
     """Returns a generator that interleaves records from a collection of
@@ -992,7 +1283,8 @@ def interleave(
             Defaults to True.
         normalizer (:class:`slideflow.norm.StainNormalizer`, optional):
             Normalizer to use on images. Defaults to None.
-        num_threads (int, optional): Number of threads to use decoding images.
+        num_threads (int, optional): Number of threads (or processes, if
+            ``decode_backend='processes'``) to use decoding images.
             Defaults to 4.
         chunk_size (int, optional): Chunk size for image decoding.
             Defaults to 8.
@@ -1024,6 +1316,26 @@ def interleave(
             before standardization. Defaults to None.
         tfrecord_parser (Callable, optional): Custom parser for TFRecords.
             Defaults to None.
+        use_mmap (bool): Read TFRecords through memory maps, locating
+            records with the index files rather than reading each record
+            with separate system calls. Defaults to False.
+        from_tilestore (bool): Read pre-decoded tiles from tile stores
+            (see :mod:`slideflow.io.tilestore`), rather than TFRecords.
+            ``paths`` should then be paths to tile stores. Defaults to False.
+        global_shuffle (bool): Read TFRecord records in a globally shuffled
+            order drawn from the indices each epoch, rather than streaming
+            each TFRecord sequentially. Defaults to False.
+        seed (int, optional): Seed for ``global_shuffle``. Must be the same
+            for all replicas and workers. Defaults to None.
+        decode_backend (str): Decode and transform images on a pool of
+            ``'threads'``, or of forked ``'processes'`` which return decoded
+            images through shared memory. Processes are not limited by the
+            GIL, but cannot be started from DataLoader workers. Chunks are
+            returned in the order they are read. Defaults to 'threads'.
+        profiler (:class:`slideflow.io.profiling.LoaderProfiler`, optional):
+            Record the latency of reading, parsing, decoding, augmentation
+            and stain normalization, the depth of the record queues, and
+            the time spent waiting for decoded images. Defaults to None.
 
     """
     if not len(paths):
@@ -1037,6 +1349,12 @@ def interleave(
     if from_wsi and (not tile_um or not tile_px):
         raise ValueError("`tile_um` and `tile_px` required for interleave() "
                          "if `from_wsi=True`")
+    if decode_backend not in ('threads', 'processes'):
+        raise ValueError(f"Unrecognized decode_backend '{decode_backend}'; "
+                         "expected 'threads' or 'processes'")
+    if decode_backend == 'processes' and 'fork' not in mp.get_all_start_methods():
+        raise ValueError("decode_backend='processes' requires the 'fork' "
+                         "multiprocessing start method.")
     if prob_weights is not None:
         assert len(prob_weights) == len(paths)
     else:
@@ -1110,6 +1428,23 @@ def interleave(
             infinite=infinite
         )
         sampler_iter = iter(random_sampler)
+    elif from_tilestore:
+        # ---- Interleave pre-decoded tiles, which need no decoding -----------
+        img_type = 'numpy'
+
+        def base_parser(record):
+            parsed = [record[f] for f in features_to_return]
+            parsed[0] = torch.from_numpy(parsed[0])
+            return parsed
+
+        random_sampler = tilestore_utils.multi_tilestore_loader(
+            paths,
+            prob_weights,
+            shard=(rank, num_replicas),
+            clip=[clip[(t if isinstance(t, str) else t.decode('utf-8'))] for t in paths] if clip else None,
+            infinite=infinite
+        )
+        sampler_iter = iter(random_sampler)
     else:
         # ---- Get the base TFRecord parser, based on the first tfrecord ------
         _, img_type = detect_tfrecord_format(paths[0])
@@ -1127,24 +1462,10 @@ def interleave(
         # multiple instances of this function running across processes,
         # & having each create indices would result in conflicts / corruption.
         if indices is None:
-            indices = []
-
-            def load_index(tfr):
-                tfr = tfr.decode('utf-8')
-                try:
-                    index = tfrecord2idx.load_index(tfr)
-                except OSError:
-                    raise errors.TFRecordsError(
-                        f"Could not find index path for TFRecord {tfr}"
-                    )
-                return index
-
-            if pool is None:
-                pool = mp.dummy.Pool(16)
             log.debug("Loading indices...")
-            for index in pool.imap(load_index, paths):
-                indices += [index]
-            pool.close()
+            indices = catalog_utils.load_indices(
+                [(t if isinstance(t, str) else t.decode('utf-8')) for t in paths]
+            )
 
         # ---- Interleave and batch datasets ----------------------------------
         random_sampler = MultiTFRecordDataset(
@@ -1153,7 +1474,10 @@ def interleave(
             prob_weights,
             shard=(rank, num_replicas),
             clip=[clip[(t if isinstance(t, str) else t.decode('utf-8'))] for t in paths] if clip else None,
-            infinite=infinite
+            infinite=infinite,
+            use_mmap=use_mmap,
+            global_shuffle=global_shuffle,
+            seed=seed
         )
         sampler_iter = iter(random_sampler)
 
@@ -1163,11 +1487,14 @@ def interleave(
         standardize=standardize,
         normalizer=normalizer,
         transform=transform,
-        whc=True
+        whc=True,
+        profiler=profiler
     )
 
     # Worker to decode images and process records
     def threading_worker(record):
+        if profiler is not None:
+            return profiled_worker(record)
         record = base_parser(record)
         record[0] = _decode_image(
             record[0],  # Image is the first returned variable
@@ -1176,6 +1503,30 @@ def interleave(
         )
         return record
 
+    def profiled_worker(record):
+        start = time.perf_counter()
+        record = base_parser(record)
+        parsed = time.perf_counter()
+        profiler.record('parse', parsed - start)
+        record[0] = _decode_image(record[0], img_type=img_type)
+        profiler.record('decode', time.perf_counter() - parsed)
+        record[0] = transform_fn(record[0])
+        return record
+
+    # Process-based decoding. Processes are forked before any reading
+    # threads are started, and inherit the worker and shared memory slots.
+    if decode_backend == 'processes':
+        # Room for a chunk of float32 images; larger images are pickled.
+        image_bytes = (tile_px or 512) ** 2 * 3 * 4
+        decode_slots = _DecodeSlots(num_threads * 2, max(chunk_size, 1) * image_bytes)
+        decode_pool = mp.get_context('fork').Pool(
+            num_threads,
+            initializer=_init_decode_process,
+            initargs=(threading_worker, decode_slots)
+        )
+    else:
+        decode_slots, decode_pool = None, None
+
     # Randomly interleaves datasets according to weights, reading parsed
     # records to a buffer and sending parsed results to a queue after
     # reaching a set buffer size
@@ -1185,7 +1536,8 @@ def interleave(
             self.closed = False
             self.raw_q = Queue(num_threads)
             self.proc_q = Queue(num_threads)
-            self.n_threads = num_threads
+            # Decode processes are fed by a single dispatching thread.
+            self.n_threads = 1 if decode_pool is not None else num_threads
             self.n_closed = 0
             self.il_closed = False
             self._close_complete = False
@@ -1194,7 +1546,10 @@ def interleave(
                 msg = []
                 while not self.closed:
                     try:
+                        start = time.perf_counter()
                         record = next(sampler_iter)
+                        if profiler is not None:
+                            profiler.record('read', time.perf_counter() - start)
                         msg += [record]
                         if len(msg) < chunk_size:
                             continue
@@ -1220,12 +1575,44 @@ def interleave(
                     self.proc_q.put(decoded)
                 self.proc_q.put(None)
 
+            # Sends chunks to the decode processes, each with a free shared
+            # memory slot, and returns results in the order they were sent
+            def dispatcher():
+                pending = deque()  # type: deque
+                free_slots = list(range(len(decode_slots)))
+                finished = False
+                while pending or not finished:
+                    if not finished and free_slots:
+                        records = self.raw_q.get()
+                        if records is None:
+                            finished = True
+                            continue
+                        slot = free_slots.pop()
+                        pending.append((
+                            slot,
+                            decode_pool.apply_async(_decode_chunk, (slot, records))
+                        ))
+                    else:
+                        slot, result = pending.popleft()
+                        try:
+                            decoded = decode_slots.read(slot, result.get())
+                        except Exception as e:
+                            log.error(f"Error decoding images: {e}")
+                            self.closed = True
+                            decoded = None
+                        free_slots.append(slot)
+                        if decoded is not None:
+                            self.proc_q.put(decoded)
+                self.proc_q.put(None)
+
             # Parallelize the tfrecord reading interleaver
             # and the image processing decoder
             self.il_thread = threading.Thread(target=interleaver)
             self.il_thread.start()
             self.proc_threads = [
-                threading.Thread(target=decoder)
+                threading.Thread(
+                    target=(dispatcher if decode_pool is not None else decoder)
+                )
                 for _ in range(self.n_threads)
             ]
             for proc in self.proc_threads:
@@ -1233,7 +1620,13 @@ def interleave(
 
         def __iter__(self):
             while True:
+                if profiler is not None:
+                    profiler.record_depth('raw_q', self.raw_q.qsize())
+                    profiler.record_depth('proc_q', self.proc_q.qsize())
+                start = time.perf_counter()
                 record = self.proc_q.get()
+                if profiler is not None:
+                    profiler.record('stall', time.perf_counter() - start)
                 if record is None:
                     self.n_closed += 1
                     if self.n_closed == self.n_threads:
@@ -1261,6 +1654,10 @@ def interleave(
                 pool.close()
             else:
                 self.sampler.close()
+            if decode_pool is not None:
+                decode_pool.terminate()
+                decode_pool.join()
+                decode_slots.close()
             self._close_complete = True
 
     return QueueRetriever(random_sampler, num_threads)
@@ -1279,6 +1676,7 @@ def interleave_dataloader(
     persistent_workers: bool = False,
     drop_last: bool = False,
     from_wsi: bool = False,
+    batch_augment: bool = False,
     **kwargs
 ) -> torch.utils.data.DataLoader:
 
@@ -1303,15 +1701,32 @@ def interleave_dataloader(
 
             Combine letters to define augmentations, such as ``'xyrjn'``.
             A value of True will use ``'xyrjb'``.
+        batch_augment (bool): Apply augmentations, stain normalization,
+            transforms, and standardization to whole batches after collation
+            (see :class:`BatchAugmenter`), rather than to each image in the
+            decoding threads. Requires a batch size. Defaults to False.
         chunk_size (int, optional): Chunk size for image decoding.
             Defaults to 1.
         clip (dict, optional): Dict mapping tfrecords to number of tiles to
             take per tfrecord. Defaults to None.
+        decode_backend (str): Decode images on a pool of ``'threads'`` in
+            each DataLoader worker, or on a pool of ``'processes'`` in the
+            main process, returning images through shared memory. The
+            process backend uses no DataLoader workers, and ``num_threads``
+            sets the number of decode processes. Defaults to 'threads'.
         drop_last (bool, optional): Drop the last non-full batch.
             Defaults to False.
+        from_tilestore (bool): Read pre-decoded tiles from tile stores,
+            rather than TFRecords. ``tfrecords`` should then be paths to tile
+            stores. Defaults to False.
         from_wsi (bool): Generate predictions from tiles dynamically
             extracted from whole-slide images, rather than TFRecords.
             Defaults to False (use TFRecords).
+        global_shuffle (bool): Read TFRecord records in a globally
+            shuffled order drawn from the indices each epoch, rather than
+            streaming each TFRecord sequentially. Workers share a shuffle
+            seed; pass ``seed`` to share it across replicas.
+            Defaults to False.
         incl_loc (bool, optional): Include loc_x and loc_y as additional
             returned variables. Defaults to False.
         incl_slidenames (bool, optional): Include slidenames as third returned
@@ -1347,6 +1762,10 @@ def interleave_dataloader(
             SlideflowIterator. Defaults to 1.
         prob_weights (dict, optional): Dict mapping tfrecords to probability
             of including in batch. Defaults to None.
+        profiler (:class:`slideflow.io.profiling.LoaderProfiler`, optional):
+            Record per-stage loading latency, queue depths, and stall time
+            across all workers. Also available as ``dataloader.profiler``.
+            Defaults to None.
         rank (int, optional): Worker ID to identify this worker.
             Used to interleave results.
             among workers without duplications. Defaults to 0 (first worker).
@@ -1354,6 +1773,8 @@ def interleave_dataloader(
             from_wsi=True.  Defaults to None.
         roi_method (str, optional): Method for extracting ROIs. Only used if
             from_wsi=True. Defaults to 'auto'.
+        seed (int, optional): Seed for ``global_shuffle``.
+            Defaults to None.
         standardize (bool, optional): Standardize images to mean 0 and
             variance of 1. Defaults to True.
         tile_um (int, optional): Size of tiles to extract from WSI, in
@@ -1375,6 +1796,11 @@ def interleave_dataloader(
     if from_wsi and num_workers:
         raise ValueError("Option `from_wsi=True` incompatible with "
                          "num_workers > 0")
+    if kwargs.get('decode_backend') == 'processes':
+        if num_workers:
+            raise ValueError("Option `decode_backend='processes'` "
+                             "incompatible with num_workers > 0")
+        num_workers = 0
 
     if num_workers is None and sf.util.num_cpu():
         num_workers = max(sf.util.num_cpu() // 4, 1)  # type: ignore
@@ -1384,6 +1810,21 @@ def interleave_dataloader(
     if 'num_threads' not in kwargs and sf.util.num_cpu():
         kwargs['num_threads'] = int(math.ceil(sf.util.num_cpu() / max(num_workers, 1)))
         log.debug(f"Threads per worker={kwargs['num_threads']}")
+    if batch_augment:
+        if batch_size is None:
+            raise ValueError("Option `batch_augment=True` requires a batch size.")
+        augmenter = BatchAugmenter(
+            kwargs.pop('augment', False),
+            standardize=kwargs.pop('standardize', True),
+            normalizer=kwargs.pop('normalizer', None),
+            transform=kwargs.pop('transform', None),
+            profiler=kwargs.get('profiler')
+        )
+        collate_fn = augmenter.collate
+        kwargs.update(augment=False, standardize=False)
+        log.debug(f"Augmenting batches with {augmenter}")
+    else:
+        collate_fn = None
 
     iterator = InterleaveIterator(
         tfrecords=tfrecords,
@@ -1403,9 +1844,11 @@ def interleave_dataloader(
         persistent_workers=persistent_workers,
         worker_init_fn=worker_init_fn,
         drop_last=drop_last,
-        prefetch_factor=prefetch_factor
+        prefetch_factor=(prefetch_factor if num_workers else None),
+        collate_fn=collate_fn
     )
     dataloader.num_tiles = iterator.num_tiles
+    dataloader.profiler = kwargs.get('profiler')
     dataloader.dataset.dataloader = dataloader  # type: ignore
     # Give a closing function to the DataLoader
     # to cleanup open files from iter()
@@ -52,6 +52,7 @@ def features_from_slide_torch(
     callback: Optional[Callable] = None,
     normalizer: Optional[Union[str, "StainNormalizer"]] = None,
     preprocess_fn: Optional[Callable] = None,
+    normalize_batches: bool = False,
     **kwargs
 ) -> Optional[np.ndarray]:
 
@@ -65,6 +66,23 @@ def features_from_slide_torch(
 
     _log_normalizer(normalizer)
 
+    # Stain normalize whole batches in this process, rather than
+    # each tile in the tile extraction workers.
+    batch_normalizer = None
+    if normalize_batches and normalizer:
+        if isinstance(normalizer, str):
+            normalizer = sf.norm.autoselect(
+                normalizer, kwargs.get('normalizer_source')
+            )
+        batch_normalizer, normalizer = normalizer, None
+        if kwargs.pop('context_normalize', False):
+            batch_normalizer.set_context(slide)
+
+    # Tiles returned through shared memory must remain valid
+    # until each batch has been collated.
+    if kwargs.get('shared_memory'):
+        kwargs['shm_hold'] = max(kwargs.get('shm_hold', 1), batch_size)
+
     # Build the tile generator
     generator = slide.build_generator(
         shuffle=shuffle,
@@ -78,7 +96,7 @@ def features_from_slide_torch(
 
     # Build the PyTorch dataloader
     tile_dataset = torch.utils.data.DataLoader(
-        _SlideIterator(preprocess=preprocess_fn,
+        _SlideIterator(preprocess=(None if batch_normalizer else preprocess_fn),
                        img_format=img_format,
                        generator=generator),
         batch_size=batch_size,
@@ -86,6 +104,11 @@ def features_from_slide_torch(
 
     # Extract features from the tiles
     for i, (batch_images, batch_loc) in enumerate(tile_dataset):
+        if batch_normalizer is not None:
+            batch_images = batch_normalizer.torch_to_torch(batch_images)
+            if preprocess_fn:
+                batch_images = torch.stack([preprocess_fn(img)
+                                            for img in batch_images])
         batch_images = batch_images.to(extractor.device)
         model_out = sf.util.as_list(extractor(batch_images))
 
@@ -112,4 +135,7 @@ def features_from_slide_torch(
         if callback:
             callback(grid_idx_updated)
 
+    if batch_normalizer is not None:
+        batch_normalizer.clear_context()
+
     return features_grid
@@ -1185,21 +1185,27 @@ class DatasetFeatures:
                 num=tiles_per_feature,
                 dtype=int
             )
-            for i, g in track(enumerate(gradient[sample_idx]),
-                             total=tiles_per_feature,
-                             description=f"Feature {f}"):
-                for tfr in self.tfrecords:
-                    if sf.util.path_to_name(tfr) == g['slide']:
-                        tfr_dir = tfr
-                if not tfr_dir:
+            tfr_by_slide = {sf.util.path_to_name(tfr): tfr
+                            for tfr in self.tfrecords}
+            examples = []
+            for i, g in enumerate(gradient[sample_idx]):
+                if g['slide'] not in tfr_by_slide:
                     log.warning("TFRecord location not found for "
                                 f"slide {g['slide']}")
-                slide, image = sf.io.get_tfrecord_by_index(tfr_dir, g['index'])
+                    continue
+                examples.append((i, g))
+
+            # Read tiles in a single batch, sorted by file offset.
+            records = tfrecord2idx.default_reader().get_many(
+                [(tfr_by_slide[g['slide']], g['index']) for _, g in examples]
+            )
+            for (i, g), record in track(zip(examples, records),
+                                        total=len(examples),
+                                        description=f"Feature {f}"):
                 tile_filename = (f"{i}-tfrecord{g['slide']}-{g['index']}"
                                  + f"-{g['val']:.2f}.jpg")
-                image_string = open(join(outdir, str(f), tile_filename), 'wb')
-                image_string.write(image.numpy())
-                image_string.close()
+                with open(join(outdir, str(f), tile_filename), 'wb') as image_string:
+                    image_string.write(record['image_raw'])
 
     # --- Deprecated functions ----------------------------------------------------
 
@@ -3,6 +3,7 @@
 import inspect
 import json
 import os
+import time
 import types
 import numpy as np
 import multiprocessing as mp
@@ -21,6 +22,7 @@ from typing import (TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple,
 import slideflow as sf
 import slideflow.util.neptune_utils
 from slideflow import errors
+from slideflow.io.profiling import LoaderProfiler
 from slideflow.model import base as _base
 from slideflow.model import torch_utils
 from slideflow.model.torch_utils import autocast
@@ -578,6 +580,7 @@ class Trainer:
         self.epoch_records = 0  # type: int
         self.running_loss = 0.0
         self.running_corrects = {}  # type: Union[Tensor, Dict[str, Tensor]]
+        self.loader_profiler = None  # type: Optional[LoaderProfiler]
 
     def _accuracy_as_numpy(
         self,
@@ -961,6 +964,20 @@ class Trainer:
                     step=step
                 )
 
+    def _log_loader_profile(self) -> None:
+        """Logs data loading statistics to Tensorboard and Neptune, then
+        resets the profiler, so each log covers the steps since the last."""
+        assert self.loader_profiler is not None
+        scalars = self.loader_profiler.scalars()
+        if self.use_tensorboard:
+            for name, value in scalars.items():
+                self.writer.add_scalar(name, value, self.global_step)
+        if self.neptune_run:
+            for name, value in scalars.items():
+                self.neptune_run[f'metrics/{name}'].log(value,
+                                                       step=self.global_step)
+        self.loader_profiler.reset()
+
 
     def _log_early_stop_to_neptune(self) -> None:
         # Log early stop to neptune
@@ -1228,6 +1245,7 @@ class Trainer:
                     batch_size=self.hp.batch_size,
                     augment=self.hp.augment,
                     drop_last=True,
+                    profiler=self.loader_profiler,
                     **vars(interleave_args)
                 ))
             }
@@ -1266,7 +1284,11 @@ class Trainer:
 
     def _training_step(self, pb: Progress) -> None:
         assert self.model is not None
+        wait_start = time.perf_counter()
         images, labels, slides = next(self.dataloaders['train'])
+        if self.loader_profiler is not None:
+            self.loader_profiler.record('batch_wait',
+                                        time.perf_counter() - wait_start)
         images = images.to(self.device, non_blocking=True)
         images = images.to(memory_format=torch.channels_last)
         labels = self._labels_to_device(labels, self.device)
@@ -1341,6 +1363,9 @@ class Trainer:
                 self._accuracy_as_numpy(_train_acc),
                 'train'
             )
+        if (self.loader_profiler is not None
+           and self.global_step % self.log_frequency == 0):
+            self._log_loader_profile()
         # Log to neptune & check early stopping
         self._log_to_neptune(loss.item(), train_acc, 'train', phase='batch')
         self._check_early_stopping(None, None)
@@ -1638,6 +1663,7 @@ class Trainer:
         seed: int = 0,
         from_wsi: bool = False,
         roi_method: str = 'auto',
+        profile_loader: bool = False,
     ) -> Dict[str, Any]:
         """Builds and trains a model from hyperparameters.
 
@@ -1699,6 +1725,12 @@ class Trainer:
                 If 'ignore', will extract tiles across the whole-slide
                 regardless of whether an ROI is available.
                 Defaults to 'auto'.
+            profile_loader (bool): Record per-stage latencies of the training
+                dataloader (read, parse, decode, augment, normalize) and the
+                time spent waiting for each batch, logging percentiles to
+                Tensorboard and Neptune every ``log_frequency`` steps.
+                Statistics are available during training through
+                ``Trainer.loader_profiler``. Defaults to False.
 
         Returns:
             Dict:   Nested dict containing metrics for each evaluated epoch.
@@ -1719,6 +1751,8 @@ class Trainer:
         self.ema_smoothing = ema_smoothing
         self.use_tensorboard = use_tensorboard
         self.log_frequency = log_frequency
+        if profile_loader:
+            self.loader_profiler = LoaderProfiler()
 
         if from_wsi and sf.slide_backend() == 'libvips':
             pool = mp.Pool(
@@ -2092,7 +2126,9 @@ class Features(BaseFeatureExtractor):
         either a batch of images or a :class:`slideflow.slide.WSI` object.
 
         When calling on a `WSI` object, keyword arguments are passed to
-        :meth:`slideflow.WSI.build_generator()`.
+        :meth:`slideflow.WSI.build_generator()`. Pass
+        ``normalize_batches=True`` to stain normalize whole batches of tiles
+        at once, rather than each tile in the tile extraction workers.
 
         """
         if isinstance(inp, sf.slide.WSI):
@@ -17,7 +17,7 @@ from rich.progress import track
 import slideflow as sf
 from slideflow import errors
 from slideflow.stats import SlideMap, get_centroid_index
-from slideflow.util import log
+from slideflow.util import log, tfrecord2idx
 from slideflow.stats import get_centroid_index
 
 if TYPE_CHECKING:
@@ -33,7 +33,7 @@ def process_tile_image(args, decode_kwargs):
         return None, None, None, None
     if isinstance(image, tuple):
         tfr, tfr_idx = image
-        image = sf.io.get_tfrecord_by_index(tfr, tfr_idx)['image_raw']
+        image = tfrecord2idx.default_reader().get(tfr, tfr_idx)['image_raw']
     if image is None:
         return point_index, None, None, None
     if sf.model.is_tensorflow_tensor(image):
@@ -298,7 +298,7 @@ class Mosaic:
             if not tfr:
                 log.error(f"TFRecord {tfr} not found in slide_map")
                 return None
-            image = sf.io.get_tfrecord_by_index(tfr, tfr_idx)['image_raw']
+            image = tfrecord2idx.default_reader().get(tfr, tfr_idx)['image_raw']
         else:
             image = self.images[index]
         return image
@@ -563,6 +563,15 @@ class Mosaic:
                 image = self.images[idx]
             to_map.append((idx, point.grid_x * self.tile_size, point.grid_y * self.tile_size, point.display_size, point.alpha, image))
 
+        # Read images from TFRecords in a single batch, sorted by file offset.
+        if has_tfr:
+            to_read = [i for i, args in enumerate(to_map) if isinstance(args[-1], tuple)]
+            records = tfrecord2idx.default_reader().get_many(
+                [to_map[i][-1] for i in to_read]
+            )
+            for i, record in zip(to_read, records):
+                to_map[i] = to_map[i][:-1] + (record['image_raw'],)
+
         if pool is None:
             pool = DPool(sf.util.num_cpu())
             should_close_pool = True
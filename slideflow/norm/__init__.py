@@ -2,9 +2,11 @@
 
 from __future__ import absolute_import
 
+import hashlib
 import os
 import sys
 import multiprocessing as mp
+from collections import OrderedDict
 from io import BytesIO
 from functools import partial
 from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple, Union
@@ -28,6 +30,9 @@ if TYPE_CHECKING:
 class StainNormalizer:
 
     vectorized = False
+    max_cached_luts = 4
+    # Pixels per chunk of a batch normalized together (e.g. 8 tiles at 64 px)
+    batch_pixels = 2 ** 15
     normalizers = {
         'macenko':  macenko.MacenkoNormalizer,
         'macenko_fast':  macenko.MacenkoFastNormalizer,
@@ -106,12 +111,24 @@ class StainNormalizer:
                 >>> dataloader = dataset.torch(..., normalizer=macenko)
                 >>> dts = dataset.tensorflow(..., normalizer=macenko)
 
+            Compile a contextual Reinhard normalizer into a lookup table.
+
+                >>> reinhard = sf.norm.StainNormalizer('reinhard_fast')
+                >>> reinhard.set_lut(64)
+                >>> with reinhard.context(slide):
+                ...     reinhard.transform(image)
+
         """
         if method not in self.normalizers:
             raise ValueError(f"Unrecognized normalizer method {method}")
 
         self.method = method
         self.n = self.normalizers[method]()
+        self.lut_size = None  # type: Optional[int]
+        self._context_key = None  # type: Optional[str]
+        # (key, size**3 grid, expanded 256**3 table or None)
+        self._lut = None  # type: Optional[Tuple]
+        self._lut_cache = OrderedDict()  # type: OrderedDict
 
         if kwargs:
             self.n.fit(**kwargs)
@@ -124,6 +141,18 @@ class StainNormalizer:
         base += ")"
         return base
 
+    def __getstate__(self):
+        # Only the compact grid of the current lookup table is sent to
+        # workers, which expand it into the full table once, on first use.
+        state = self.__dict__.copy()
+        state['_lut_cache'] = OrderedDict()
+        if self._lut is not None and self._lut[0][0] == self._context_key:
+            key, grid, _ = self._lut
+            state['_lut'] = (key, grid, None)
+        else:
+            state['_lut'] = None
+        return state
+
     @property
     def device(self) -> str:
         return 'cpu'
@@ -134,9 +163,10 @@ class StainNormalizer:
         *,
         augment: bool = False
     ) -> "torch.Tensor":
-        """Normalize a torch uint8 image (CWH).
+        """Normalize a torch uint8 image (CWH) or batch of images (BCWH).
 
-        Normalization ocurs via intermediate conversion to WHC.
+        Normalization ocurs via intermediate conversion to WHC. Batches are
+        normalized together (see :meth:`rgb_to_rgb`).
 
         Args:
             inp (torch.Tensor): Image, uint8. Images are normalized in
@@ -150,9 +180,7 @@ class StainNormalizer:
         import torch
         from slideflow.io.torch import cwh_to_whc, whc_to_cwh, is_cwh
 
-        if len(inp.shape) == 4:
-            return torch.stack([self._torch_transform(img) for img in inp])
-        elif is_cwh(inp):
+        if is_cwh(inp):
             # Convert from CWH -> WHC (normalize) -> CWH
             return whc_to_cwh(
                 torch.from_numpy(
@@ -163,7 +191,9 @@ class StainNormalizer:
                 )
             )
         else:
-            return torch.from_numpy(self.rgb_to_rgb(inp.cpu().numpy()))
+            return torch.from_numpy(
+                self.rgb_to_rgb(inp.cpu().numpy(), augment=augment)
+            )
 
     def fit(
         self,
@@ -463,16 +493,42 @@ class StainNormalizer:
     ) -> np.ndarray:
         """Normalize a numpy array (uint8), returning a numpy array (uint8).
 
+        Batches of images are normalized with the vectorized
+        ``transform_batch()`` of the normalizer, if available (Macenko,
+        Reinhard, and Vahadane), in chunks of about ``batch_pixels`` pixels.
+        Tiles larger than about 180 px are passed to ``transform_batch()``
+        one at a time, which is still faster than ``transform()``; at these
+        sizes the per-call overhead saved by larger chunks is outweighed by
+        the cost of intermediate arrays falling out of cache. As with
+        single images, an error is raised if an image in the batch cannot
+        be normalized.
+
         Args:
-            image (np.ndarray): Image (uint8).
+            image (np.ndarray): Image (uint8), W x H x C, or batch of
+                images, N x W x H x C.
 
         Keyword args:
             augment (bool): Transform using stain aumentation.
                 Defaults to False.
 
         Returns:
-            np.ndarray: Normalized image, uint8, W x H x C.
+            np.ndarray: Normalized image, uint8, W x H x C (or N x W x H x C).
         """
+        if not augment:
+            lut = self.get_lut()
+            if lut is not None:
+                return sf.norm.utils.apply_lut(image, lut)
+        if len(image.shape) == 4:
+            if not hasattr(self.n, 'transform_batch'):
+                return np.stack([self.n.transform(img, augment=augment)
+                                 for img in image])
+            chunk = max(1, self.batch_pixels // (image.shape[1] * image.shape[2]))
+            if len(image) <= chunk:
+                return self.n.transform_batch(image, augment=augment)
+            return np.concatenate([
+                self.n.transform_batch(image[i:i + chunk], augment=augment)
+                for i in range(0, len(image), chunk)
+            ])
         return self.n.transform(image, augment=augment)
 
     def tf_to_rgb(
@@ -652,6 +708,10 @@ class StainNormalizer:
             else:
                 image = context  # type: ignore
             self.n.set_context(image)
+            self._context_key = hashlib.sha1(
+                np.ascontiguousarray(image)
+            ).hexdigest()
+            self.get_lut()
             return True
         else:
             return False
@@ -660,6 +720,80 @@ class StainNormalizer:
         """Remove any previously set stain normalizer context."""
         if hasattr(self.n, 'clear_context'):
             self.n.clear_context()
+        self._context_key = None
+
+    # --- Color lookup tables -------------------------------------------------
+
+    def set_lut(self, size: Optional[int] = 64) -> None:
+        """Normalize with precomputed color lookup tables, when possible.
+
+        When the transform depends only on the color of each pixel, as for
+        'reinhard_fast' and 'reinhard_fast_mask' with a whole-slide context
+        set, the normalizer is compiled into a table mapping every RGB color
+        to its normalized color, and images are normalized with a single
+        lookup. Tables are built when a context is set, and cached for each
+        context and fit. When the normalizer is pickled (e.g. for tile
+        extraction workers), only the size x size x size grid is sent, and
+        each worker expands it into the full table once.
+
+        Other normalizers (e.g. Macenko, which estimates a stain matrix for
+        each image) and stain augmentation are not affected.
+
+        Args:
+            size (int, optional): Number of points along each color axis at
+                which the normalizer is evaluated, from 2 to 256. Tables with
+                fewer than 256 points are expanded to every color with
+                trilinear interpolation, which is faster to build but may
+                differ slightly from the exact transform. A size of 256 is
+                exact, but sends a 48 MB table to each worker. If None,
+                disables lookup tables. Defaults to 64.
+        """
+        if size is not None and not 2 <= size <= 256:
+            raise ValueError(f"Lookup table size must be between 2 and 256, "
+                             f"got {size}")
+        self.lut_size = size
+        self._lut = None
+        self._lut_cache.clear()
+        self.get_lut()
+
+    def get_lut(self) -> Optional[np.ndarray]:
+        """Get the color lookup table for the current fit and context.
+
+        Returns:
+            np.ndarray: uint8 lookup table with shape (256, 256, 256, 3),
+            indexed by RGB color, or None if lookup tables are disabled or the
+            normalizer does not currently transform pixels independently.
+        """
+        if self.lut_size is None:
+            return None
+        is_pixelwise = getattr(self.n, 'is_pixelwise', None)
+        if is_pixelwise is None or not is_pixelwise():
+            return None
+        key = (self._context_key, ) + tuple(
+            np.asarray(v).tobytes() for v in self.n.get_fit().values()
+        )
+        if self._lut is not None and self._lut[0] == key:
+            _, grid, lut = self._lut
+            if lut is None:
+                # Grid received from another process.
+                lut = sf.norm.utils.expand_lut(grid)
+                self._lut = (key, grid, lut)
+            return lut
+        if key in self._lut_cache:
+            self._lut_cache.move_to_end(key)
+            grid, lut = self._lut_cache[key]
+        else:
+            log.debug(f"Building stain normalizer lookup table "
+                      f"(size={self.lut_size})")
+            size = self.lut_size
+            grid = self.n.transform(sf.norm.utils.lut_grid(size))
+            grid = grid.reshape(size, size, size, 3)
+            lut = sf.norm.utils.expand_lut(grid)
+            self._lut_cache[key] = (grid, lut)
+            while len(self._lut_cache) > self.max_cached_luts:
+                self._lut_cache.popitem(last=False)
+        self._lut = (key, grid, lut)
+        return lut
 
 
 def autoselect(
@@ -8,6 +8,8 @@ from typing import Tuple, Dict, Optional
 from contextlib import contextmanager
 
 import slideflow.norm.utils as ut
+from slideflow import errors
+from slideflow.util import log
 
 
 class MacenkoNormalizer:
@@ -231,6 +233,80 @@ class MacenkoNormalizer:
 
         return HE, C
 
+    def _matrix_and_concentrations_batch(
+        self,
+        imgs: np.ndarray,
+        standardize: bool = True
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Gets the H&E stain matrices and concentrations for a batch of images.
+
+        Vectorized equivalent of :meth:`_matrix_and_concentrations`, with the
+        covariance, eigen-decomposition and angular percentiles of each
+        image calculated across the batch.
+
+        Args:
+            imgs (np.ndarray): Images (RGB uint8) with dimensions N, W, H, C.
+            standardize (bool): Perform brightness standardization.
+                Defaults to True.
+
+        Returns:
+            A tuple containing
+
+                np.ndarray: H&E stain matrices, shape = (N, 3, 2)
+
+                np.ndarray: Concentrations of individual stains,
+                shape = (N, 2, W * H)
+
+                np.ndarray: Images for which a stain matrix could not be
+                estimated, as they have fewer than two pixels above the
+                luminosity threshold (bool), shape = (N,)
+        """
+        n = len(imgs)
+        if standardize:
+            imgs = ut.standardize_brightness_batch(imgs)
+
+        # Calculate optical density.
+        OD = -np.log((imgs.reshape(n, -1, 3).astype(float) + 1) / 255)
+
+        # Mask transparent pixels.
+        valid = ~np.any(OD < self.beta, axis=2)
+        n_valid = valid.sum(axis=1)
+        failed = n_valid < 2
+
+        # Compute eigenvectors of the covariance of each image.
+        mean = ((OD * valid[..., np.newaxis]).sum(axis=1)
+                / np.maximum(n_valid, 1)[:, np.newaxis])
+        centered = (OD - mean[:, np.newaxis]) * valid[..., np.newaxis]
+        cov = (centered.transpose(0, 2, 1) @ centered
+               / np.maximum(n_valid - 1, 1)[:, np.newaxis, np.newaxis])
+        cov[failed] = np.eye(3)
+        eigvals, eigvecs = np.linalg.eigh(cov)
+        plane = eigvecs[:, :, 1:3]
+
+        # Project on the plane spanned by the eigenvectors corresponding to
+        # the two largest eigenvalues.
+        That = OD @ plane
+        phi = np.arctan2(That[..., 1], That[..., 0])
+        minPhi, maxPhi = ut.masked_percentile(
+            phi, [self.alpha, 100 - self.alpha], valid
+        )
+        vMin = np.einsum('nij,nj->ni', plane,
+                         np.stack([np.cos(minPhi), np.sin(minPhi)], axis=1))
+        vMax = np.einsum('nij,nj->ni', plane,
+                         np.stack([np.cos(maxPhi), np.sin(maxPhi)], axis=1))
+
+        # Ensure the vector corresponding to hematoxylin is first, eosin second.
+        HE = np.where(
+            (vMin[:, 0] > vMax[:, 0])[:, np.newaxis, np.newaxis],
+            np.stack([vMin, vMax], axis=2),
+            np.stack([vMax, vMin], axis=2)
+        )
+        HE[failed] = self.stain_matrix_target
+
+        # Determine concentrations of the individual stains.
+        C = np.linalg.pinv(HE) @ OD.transpose(0, 2, 1)
+
+        return HE, C, failed
 
     def matrix_and_concentrations(
         self,
@@ -317,6 +393,84 @@ class MacenkoNormalizer:
 
         return Inorm
 
+    def transform_batch(
+        self,
+        imgs: np.ndarray,
+        *,
+        augment: bool = False,
+        ignore_errors: bool = False
+    ) -> np.ndarray:
+        """Normalize a batch of H&E images.
+
+        Equivalent to :meth:`transform` applied to each image, with the
+        stain matrix and concentrations of each image estimated across the
+        batch.
+
+        Args:
+            imgs (np.ndarray): Images, RGB uint8 with dimensions N, W, H, C.
+
+        Keyword args:
+            augment (bool): Perform random stain augmentation, sampling
+                targets separately for each image. Defaults to False.
+            ignore_errors (bool): Return images for which a stain matrix
+                cannot be estimated, such as blank tiles, unchanged, rather
+                than raising an error. Defaults to False.
+
+        Returns:
+            np.ndarray: Normalized images.
+
+        Raises:
+            slideflow.errors.NormalizerError: If a stain matrix cannot be
+                estimated for an image, and ``ignore_errors`` is False.
+        """
+
+        n, h, w, c = imgs.shape
+
+        # Augmentation; optional
+        if augment and not any(m in self._augment_params
+                               for m in ('matrix_stdev', 'concentrations_stdev')):
+            raise ValueError("Augmentation space not configured.")
+        if augment and 'matrix_stdev' in self._augment_params:
+            HERef = np.random.normal(
+                self.stain_matrix_target,
+                self._augment_params['matrix_stdev'],
+                size=(n, 3, 2)
+            )
+        else:
+            HERef = np.broadcast_to(self.stain_matrix_target, (n, 3, 2))
+        if augment and 'concentrations_stdev' in self._augment_params:
+            maxCRef = np.random.normal(
+                self.target_concentrations,
+                self._augment_params['concentrations_stdev'],
+                size=(n, 2)
+            )
+        else:
+            maxCRef = np.broadcast_to(self.target_concentrations, (n, 2))
+
+        # Get stain matrices and concentrations from images.
+        HE, C, failed = self._matrix_and_concentrations_batch(imgs)
+        if failed.any():
+            msg = (f"Unable to estimate stain matrix for {failed.sum()} of "
+                   f"{n} images")
+            if not ignore_errors:
+                raise errors.NormalizerError(msg)
+            log.warning(f"{msg}; returning these images unchanged.")
+        if self._ctx_maxC is not None:
+            maxC = np.broadcast_to(self._ctx_maxC, (n, 2))
+        else:
+            maxC = np.percentile(C, 99, axis=2)
+
+        tmp = np.divide(maxC, maxCRef)
+        C2 = np.divide(C, tmp[:, :, np.newaxis])
+
+        # Recreate the images using reference mixing matrices.
+        Inorm = np.multiply(255, np.exp(-HERef @ C2))
+        Inorm = np.clip(Inorm, 0, 255)
+        Inorm = np.reshape(Inorm.transpose(0, 2, 1), (n, h, w, 3)).astype(np.uint8)
+        Inorm[failed] = imgs[failed]
+
+        return Inorm
+
     @contextmanager
     def image_context(self, I: np.ndarray):
         """Set the whole-slide context for the stain normalizer.
@@ -387,4 +541,13 @@ class MacenkoFastNormalizer(MacenkoNormalizer):
     ) -> Tuple[np.ndarray, np.ndarray]:
         return super()._matrix_and_concentrations(
             img, mask, standardize=False
+        )
+
+    def _matrix_and_concentrations_batch(
+        self,
+        imgs: np.ndarray,
+        standardize: bool = False
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return super()._matrix_and_concentrations_batch(
+            imgs, standardize=False
         )
\ No newline at end of file
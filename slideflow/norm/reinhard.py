@@ -260,6 +260,91 @@ class ReinhardFastNormalizer:
         else:
             return merged
 
+    def transform_batch(
+        self,
+        I: np.ndarray,
+        ctx_means: Optional[np.ndarray] = None,
+        ctx_stds: Optional[np.ndarray] = None,
+        *,
+        augment: bool = False
+    ) -> np.ndarray:
+        """Normalize a batch of H&E images.
+
+        Equivalent to :meth:`transform` applied to each image, with color
+        conversion and channel statistics vectorized across the batch.
+
+        Args:
+            I (np.ndarray): Images, RGB uint8 with dimensions N, W, H, C.
+            ctx_means (np.ndarray, optional): Context channel means (e.g. from
+                whole-slide image). If None, calculates means from each image.
+                Defaults to None.
+            ctx_stds (np.ndarray, optional): Context channel standard deviations
+                (e.g. from whole-slide image). If None, calculates standard
+                deviations from each image. Defaults to None.
+
+        Keyword args:
+            augment (bool): Transform using stain augmentation, sampling
+                targets separately for each image. Defaults to False.
+
+        Returns:
+            np.ndarray: Normalized images.
+        """
+        if self.target_means is None or self.target_stds is None:
+            raise ValueError("Normalizer has not been fit: call normalizer.fit()")
+        n = len(I)
+
+        # Augmentation; optional
+        if augment and not any(m in self._augment_params
+                               for m in ('means_stdev', 'stds_stdev')):
+            raise ValueError("Augmentation space not configured.")
+        if augment and 'means_stdev' in self._augment_params:
+            target_means = np.random.normal(
+                self.target_means,
+                self._augment_params['means_stdev'],
+                size=(n, 3)
+            )
+        else:
+            target_means = np.broadcast_to(self.target_means, (n, 3))
+        if augment and 'stds_stdev' in self._augment_params:
+            target_stds = np.random.normal(
+                self.target_stds,
+                self._augment_params['stds_stdev'],
+                size=(n, 3)
+            )
+        else:
+            target_stds = np.broadcast_to(self.target_stds, (n, 3))
+
+        channels = lab_split(I)
+        if self.threshold is not None:
+            mask = ((channels[2] + 128.) / 255. < self.threshold)[..., np.newaxis]
+        if (ctx_means is not None or ctx_stds is not None
+           or self._ctx_means is not None):
+            means, stds = self._get_mean_std(I, ctx_means, ctx_stds)
+            means = np.broadcast_to(np.ravel(means), (n, 3))
+            stds = np.broadcast_to(np.ravel(stds), (n, 3))
+        else:
+            means = np.stack([c.mean(axis=(1, 2), dtype=np.float64)
+                              for c in channels], axis=1)
+            stds = np.stack([c.std(axis=(1, 2), dtype=np.float64)
+                             for c in channels], axis=1)
+
+        # Broadcast per-image statistics over pixels.
+        means, stds, target_means, target_stds = [
+            a[:, np.newaxis, np.newaxis]
+            for a in (means, stds, target_means, target_stds)
+        ]
+        norm1, norm2, norm3 = [
+            ((c - means[..., i]) * (target_stds[..., i] / stds[..., i]))
+            + target_means[..., i]
+            for i, c in enumerate(channels)
+        ]
+
+        merged = merge_back(norm1, norm2, norm3)
+        if self.threshold is not None:
+            return np.where(mask, merged, I)
+        else:
+            return merged
+
     @contextmanager
     def image_context(self, I: np.ndarray):
         """Set the whole-slide context for the stain normalizer.
@@ -314,6 +399,15 @@ class ReinhardFastNormalizer:
         """Remove any previously set stain normalizer context."""
         self._ctx_means, self._ctx_stds = None, None
 
+    def is_pixelwise(self) -> bool:
+        """Check if the transform depends only on the color of each pixel.
+
+        This is the case when a context is set, which fixes the channel means
+        and standard deviations, and allows the transform to be precomputed
+        as a color lookup table.
+        """
+        return self._ctx_means is not None and self._ctx_stds is not None
+
 
 class ReinhardNormalizer(ReinhardFastNormalizer):
 
@@ -395,6 +489,39 @@ class ReinhardNormalizer(ReinhardFastNormalizer):
         I = ut.standardize_brightness(I)
         return super().transform(I, ctx_means, ctx_stds, augment=augment)
 
+    def transform_batch(
+        self,
+        I: np.ndarray,
+        ctx_means: Optional[np.ndarray] = None,
+        ctx_stds: Optional[np.ndarray] = None,
+        *,
+        augment: bool = False
+    ) -> np.ndarray:
+        """Normalize a batch of H&E images.
+
+        Equivalent to :meth:`transform` applied to each image, with
+        brightness standardization, color conversion and channel statistics
+        vectorized across the batch.
+
+        Args:
+            I (np.ndarray): Images, RGB uint8 with dimensions N, W, H, C.
+            ctx_means (np.ndarray, optional): Context channel means (e.g. from
+                whole-slide image). If None, calculates means from each image.
+                Defaults to None.
+            ctx_stds (np.ndarray, optional): Context channel standard deviations
+                (e.g. from whole-slide image). If None, calculates standard
+                deviations from each image. Defaults to None.
+
+        Keyword args:
+            augment (bool): Transform using stain augmentation, sampling
+                targets separately for each image. Defaults to False.
+
+        Returns:
+            np.ndarray: Normalized images.
+        """
+        I = ut.standardize_brightness_batch(I)
+        return super().transform_batch(I, ctx_means, ctx_stds, augment=augment)
+
     def set_context(self, I: np.ndarray):
         """Set the whole-slide context for the stain normalizer.
 
@@ -420,6 +547,13 @@ class ReinhardNormalizer(ReinhardFastNormalizer):
         """Remove any previously set stain normalizer context."""
         super().clear_context()
 
+    def is_pixelwise(self) -> bool:
+        """Check if the transform depends only on the color of each pixel.
+
+        Brightness is standardized per image, so this is never the case.
+        """
+        return False
+
 
 class ReinhardFastMaskNormalizer(ReinhardFastNormalizer):
 
@@ -286,6 +286,127 @@ def _as_numpy(arg1: Union[List, np.ndarray]) -> np.ndarray:
     else:
         raise ValueError(f'Expected numpy array; got {type(arg1)}')
 
+# --- Batched utilities -------------------------------------------------------
+
+def standardize_brightness_batch(I: np.ndarray) -> np.ndarray:
+    """Standardize the brightness of each image in a batch.
+
+    Equivalent to :func:`standardize_brightness` applied to each image.
+
+    Args:
+        I (np.ndarray): RGB uint8 images, with shape (N, W, H, C).
+
+    Returns:
+        np.ndarray: uint8 images.
+    """
+    p = np.percentile(I.reshape(len(I), -1), 90, axis=1)
+    p = p.reshape((-1,) + (1,) * (I.ndim - 1))
+    return np.clip(I * 255.0 / p, 0, 255).astype(np.uint8)
+
+
+def masked_percentile(
+    x: np.ndarray,
+    q: Union[float, List[float]],
+    mask: np.ndarray
+) -> np.ndarray:
+    """Compute percentiles of each row, using only the masked values.
+
+    Values are interpolated linearly, as with ``np.percentile``.
+
+    Args:
+        x (np.ndarray): Values, with shape (N, P).
+        q (float or list(float)): Percentile(s), from 0 to 100.
+        mask (np.ndarray): Boolean mask of the values to use, with shape
+            (N, P).
+
+    Returns:
+        np.ndarray: Percentiles with shape (N,), or (len(q), N) if ``q`` is
+        a list. Rows with no masked values are NaN.
+    """
+    x = np.where(mask, x, np.inf)
+    x.sort(axis=-1)
+    n = mask.sum(axis=-1)
+    pos = np.asarray(q, dtype=np.float64)[..., np.newaxis] / 100 * (n - 1)
+    lo = np.clip(np.floor(pos).astype(np.int64), 0, None)
+    hi = np.minimum(lo + 1, np.maximum(n - 1, 0))
+    rows = np.arange(len(x))
+    x_lo, x_hi = x[rows, lo], x[rows, hi]
+    with np.errstate(invalid='ignore'):
+        out = x_lo + (x_hi - x_lo) * (pos - lo)
+    return np.where(n > 0, out, np.nan)
+
+# --- Color lookup tables -----------------------------------------------------
+
+def lut_grid(size: int) -> np.ndarray:
+    """Create an image holding a regular grid of RGB colors.
+
+    Args:
+        size (int): Number of grid points along each color axis, evenly
+            spaced from 0 to 255.
+
+    Returns:
+        np.ndarray: uint8 image with shape (size * size, size, 3), holding
+        color (r, g, b) at position (r * size + g, b).
+    """
+    levels = np.round(np.linspace(0, 255, size)).astype(np.uint8)
+    grid = np.stack(np.meshgrid(levels, levels, levels, indexing='ij'), axis=-1)
+    return grid.reshape(size * size, size, 3)
+
+
+def expand_lut(lut: np.ndarray) -> np.ndarray:
+    """Expand a color lookup table to all 256 levels of each channel.
+
+    Tables with fewer than 256 points along each axis are expanded with
+    trilinear interpolation, performed as three separable passes. The last
+    pass is performed one red level at a time, to stay in cache.
+
+    Args:
+        lut (np.ndarray): Lookup table with shape (size, size, size, 3),
+            mapping the colors of :func:`lut_grid` to normalized colors.
+
+    Returns:
+        np.ndarray: uint8 lookup table with shape (256, 256, 256, 3).
+    """
+    size = lut.shape[0]
+    if size == 256:
+        return lut.astype(np.uint8)
+    pos = np.arange(256, dtype=np.float32) * ((size - 1) / 255)
+    i0 = np.minimum(pos.astype(np.int64), size - 2)
+    frac = pos - i0
+
+    def interp(a, axis):
+        shape = [1] * a.ndim
+        shape[axis] = 256
+        lo = np.take(a, i0, axis=axis)
+        hi = np.take(a, i0 + 1, axis=axis)
+        hi -= lo
+        hi *= frac.reshape(shape)
+        lo += hi
+        return lo
+
+    rg = interp(interp(lut.astype(np.float32), 0), 1)
+    out = np.empty((256, 256, 256, 3), dtype=np.uint8)
+    for r in range(256):
+        rgb = interp(rg[r], 1)
+        rgb += 0.5
+        out[r] = np.clip(rgb, 0, 255, out=rgb)
+    return out
+
+
+def apply_lut(I: np.ndarray, lut: np.ndarray) -> np.ndarray:
+    """Map the colors of an image, or batch of images, through a lookup table.
+
+    Args:
+        I (np.ndarray): RGB uint8 image(s), with channels last.
+        lut (np.ndarray): Lookup table with shape (256, 256, 256, 3).
+
+    Returns:
+        np.ndarray: uint8 image(s), with the same shape as ``I``.
+    """
+    I = I.astype(np.int32, copy=False)
+    idx = (I[..., 0] << 16) | (I[..., 1] << 8) | I[..., 2]
+    return lut.reshape(-1, 3)[idx]
+
 # =============================================================================
 
 import numpy as np
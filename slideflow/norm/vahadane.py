@@ -8,6 +8,7 @@ import joblib
 from typing import Dict
 
 import slideflow.norm.utils as ut
+from slideflow.util import log
 from sklearn.decomposition import DictionaryLearning
 
 
@@ -204,6 +205,68 @@ class VahadaneSklearnNormalizer:
         normalized = (255 * np.exp(-1 * dot_prod.reshape(I.shape))).astype(np.uint8)
         return np.where(mask, normalized, I)
 
+    def transform_batch(
+        self,
+        I: np.ndarray,
+        *,
+        augment: bool = False,
+        ignore_errors: bool = False
+    ) -> np.ndarray:
+        """Normalize a batch of H&E images.
+
+        Equivalent to :meth:`transform` applied to each image. The stain
+        matrix of each image is learned separately, while brightness
+        standardization, color conversion and stain concentrations are
+        vectorized across the batch.
+
+        Args:
+            I (np.ndarray): Images, RGB uint8 with dimensions N, W, H, C.
+
+        Keyword args:
+            ignore_errors (bool): Return images for which a stain matrix
+                cannot be learned, such as blank tiles, unchanged, rather
+                than raising an error. Defaults to False.
+
+        Returns:
+            np.ndarray: Normalized images.
+
+        Raises:
+            ValueError: If a stain matrix cannot be learned for an image,
+                and ``ignore_errors`` is False.
+        """
+        if augment:
+            raise NotImplementedError(
+                "Stain augmentation is not implemented for Vahadane normalization"
+            )
+        if self.stain_matrix_target is None:
+            raise ValueError("Normalizer has not been fit: call normalizer.fit()")
+
+        n = len(I)
+        orig = I
+        I = ut.standardize_brightness_batch(I)
+        I_LAB = cv2.cvtColor(I.reshape((-1,) + I.shape[2:]), cv2.COLOR_RGB2LAB)
+        mask = (I_LAB[:, :, 0] / 255.0 < self.threshold).reshape(I.shape[:3] + (1,))
+        failed = np.zeros(n, dtype=bool)
+        stain_matrix_source = np.empty((n, 2, 3))
+        for i, img in enumerate(I):
+            try:
+                stain_matrix_source[i] = self.get_stain_matrix(img)
+            except ValueError:
+                if not ignore_errors:
+                    raise
+                failed[i] = True
+                stain_matrix_source[i] = self.stain_matrix_target
+        if failed.any():
+            log.warning(f"Unable to learn stain matrix for {failed.sum()} of "
+                        f"{n} images; returning these images unchanged.")
+        OD = ut.RGB_to_OD(I).reshape((n, -1, 3))
+        source_concentrations = OD @ np.linalg.pinv(stain_matrix_source)
+        dot_prod = source_concentrations @ self.stain_matrix_target
+        normalized = (255 * np.exp(-1 * dot_prod.reshape(I.shape))).astype(np.uint8)
+        normalized = np.where(mask, normalized, I)
+        normalized[failed] = orig[failed]
+        return normalized
+
 
 class VahadaneSpamsNormalizer(VahadaneSklearnNormalizer):
 
@@ -41,7 +41,7 @@ from .project_utils import (  # noqa: F401
 
 if TYPE_CHECKING:
     from slideflow.model import DatasetFeatures, Trainer, BaseFeatureExtractor
-    from slideflow.slide import SlideReport
+    from slideflow.slide import SlideReport, SlideBuffer
     from slideflow import simclr, mil
     from ConfigSpace import ConfigurationSpace, Configuration
     from smac.facade.smac_bb_facade import SMAC4BB  # noqa: F401
@@ -1610,11 +1610,14 @@ class Project:
                 Experimental function with limited testing.
             randomize_origin (bool): Randomize pixel starting
                 position during extraction. Defaults to False.
-            buffer (str, optional): Slides will be copied to this directory
-                before extraction. Defaults to None. Using an SSD or ramdisk
-                buffer vastly improves tile extraction speed.
-            q_size (int): Size of queue when using a buffer.
-                Defaults to 2.
+            buffer (str or :class:`slideflow.slide.SlideBuffer`, optional):
+                Slides will be copied to this directory before extraction,
+                several slides ahead of the slide being extracted. Pass a
+                :class:`slideflow.slide.SlideBuffer` for a size-limited cache
+                which persists across runs. Defaults to None. Using an SSD or
+                ramdisk buffer vastly improves tile extraction speed.
+            q_size (int): Number of slides to copy ahead of the slide being
+                extracted, when ``buffer`` is a path. Defaults to 2.
             qc (str, optional): 'otsu', 'blur', 'both', or None. Perform blur
                 detection quality control - discarding tiles with detected
                 out-of-focus regions or artifact - and/or otsu's method.
@@ -2166,6 +2169,7 @@ class Project:
         img_format: str = 'auto',
         skip_completed: bool = False,
         verbose: bool = True,
+        buffer: Optional["SlideBuffer"] = None,
         **kwargs: Any
     ) -> None:
         """Create predictive heatmap overlays on a set of slides.
@@ -2215,6 +2219,9 @@ class Project:
                 logged in the model params.json.
             skip_completed (bool, optional): Skip heatmaps for slides that
                 already have heatmaps in target directory.
+            buffer (:class:`slideflow.slide.SlideBuffer`, optional): Copy
+                slides into this slide buffer ahead of use, generating
+                heatmaps from the local copies. Defaults to None.
             show_roi (bool): Show ROI on heatmaps.
             interpolation (str): Interpolation strategy for predictions.
                 Defaults to None.
@@ -2268,6 +2275,9 @@ class Project:
             os.makedirs(outdir)
         args.outdir = outdir
 
+        # Slide buffer is not passed to the subprocess
+        del args.buffer
+
         # Verbose output
         if verbose:
             n_poss_slides = len(dataset.slides())
@@ -2282,17 +2292,25 @@ class Project:
         # I suspect this is a libvips or openslide issue but I haven't been
         # able to identify the root cause. Isolating processes when multiple
         # slides are to be processed sequentially is a functional workaround.
-        for slide in dataset.slide_paths():
-            name = path_to_name(slide)
-            if (skip_completed and exists(join(outdir, f'{name}-custom.png'))):
-                log.info(f'Skipping completed heatmap for slide {name}')
-                return
-
+        slide_list = dataset.slide_paths()
+        if skip_completed:
+            for slide in [s for s in slide_list if exists(
+                    join(outdir, f'{path_to_name(s)}-custom.png'))]:
+                log.info(f'Skipping completed heatmap for slide '
+                         f'{path_to_name(slide)}')
+                slide_list.remove(slide)
+        if buffer is None:
+            slide_iter = zip(slide_list, slide_list)
+        else:
+            slide_iter = buffer.prefetch(slide_list)
+        for _, slide in slide_iter:
             ctx = multiprocessing.get_context('spawn')
             process = ctx.Process(target=project_utils._heatmap_worker,
                                   args=(slide, args, kwargs))
             process.start()
             process.join()
+        if buffer is not None:
+            buffer.log_stats()
 
     def generate_mosaic(
         self,
@@ -2929,6 +2947,7 @@ class Project:
         source: Optional[str] = None,
         img_format: str = 'auto',
         randomize_origin: bool = False,
+        buffer: Optional["SlideBuffer"] = None,
         **kwargs: Any
     ) -> None:
         """Generate a map of predictions across a whole-slide image.
@@ -2974,6 +2993,9 @@ class Project:
                 logged in the model params.json.
             randomize_origin (bool, optional): Randomize pixel starting
                 position during extraction. Defaults to False.
+            buffer (:class:`slideflow.slide.SlideBuffer`, optional): Copy
+                slides into this slide buffer ahead of use, generating
+                predictions from the local copies. Defaults to None.
             whitespace_fraction (float, optional): Range 0-1. Defaults to 1.
                 Discard tiles with this fraction of whitespace.
                 If 1, will not perform whitespace filtering.
@@ -3037,7 +3059,11 @@ class Project:
             log.info(f'Total estimated tiles: {total_tiles}')
 
             # Predict for each WSI
-            for slide_path in slide_list:
+            if buffer is None:
+                slide_iter = zip(slide_list, slide_list)
+            else:
+                slide_iter = buffer.prefetch(slide_list)
+            for _, slide_path in slide_iter:
                 log.info(f'Working on slide {path_to_name(slide_path)}')
                 try:
                     wsi = sf.WSI(slide_path,
@@ -3065,6 +3091,8 @@ class Project:
                     log.error(f'[green]{path_to_name(slide_path)}[/] is '
                               'corrupt; skipping slide')
                     continue
+        if buffer is not None:
+            buffer.log_stats()
 
     def save(self) -> None:
         """Save current project configuration as ``settings.json``."""
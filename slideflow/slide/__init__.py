@@ -8,8 +8,13 @@ import csv
 import json
 import multiprocessing as mp
 import os
+import pickle
+import queue
 import random
+import tempfile
+import threading
 import time
+import uuid
 import warnings
 import cv2
 import numpy as np
@@ -24,6 +29,8 @@ from PIL import Image, ImageDraw
 from rich.progress import Progress
 from skimage import img_as_ubyte
 from slideflow import errors
+from collections import deque
+from contextlib import contextmanager, nullcontext
 from functools import partial
 from os.path import exists, join
 from types import SimpleNamespace
@@ -35,8 +42,14 @@ from slideflow.util import SUPPORTED_FORMATS  # noqa F401
 from slideflow.util import log, path_to_name  # noqa F401
 from .report import ExtractionPDF  # noqa F401
 from .report import ExtractionReport, SlideReport
+from .shm import SharedTileBuffer, shared_tile_worker
+from .buffer import SlideBuffer
+from .checkpoint import ExtractionCheckpoint, DEFAULT_CHECKPOINT_EVERY
 from .utils import *
-from .backends import tile_worker, wsi_reader, backend_formats
+from .backends import (tile_worker, tile_block_worker, multiscale_tile_worker,
+                       grid_filter_fractions, wsi_reader, backend_formats,
+                       registered_worker, register_worker_state,
+                       unregister_worker_state, init_worker_state)
 
 
 warnings.simplefilter('ignore', Image.DecompressionBombWarning)
@@ -81,6 +94,86 @@ def _convert_img_to_format(image: np.ndarray, img_format: str) -> str:
         raise ValueError(f"Unknown image format {img_format}")
 
 
+def _coord_blocks(
+    coord: np.ndarray,
+    block_size: Tuple[int, int]
+) -> List[np.ndarray]:
+    """Group grid coordinates into blocks of neighboring grid cells.
+
+    Args:
+        coord (np.ndarray): Grid coordinates, with shape (n_tiles, 4) and
+            rows in the format (x, y, grid_x, grid_y).
+        block_size (tuple(int, int)): Number of grid columns and rows
+            per block.
+
+    Returns:
+        List of np.ndarray, one for each non-empty block, with coordinates
+        sorted in row-major order.
+    """
+    if not len(coord):
+        return []
+    block_x = coord[:, 2] // block_size[0]
+    block_y = coord[:, 3] // block_size[1]
+    order = np.lexsort((coord[:, 2], coord[:, 3], block_x, block_y))
+    coord, block_x, block_y = coord[order], block_x[order], block_y[order]
+    is_new = (np.diff(block_x) != 0) | (np.diff(block_y) != 0)
+    return np.split(coord, np.flatnonzero(is_new) + 1)
+
+
+def _coord_cells(
+    coord: np.ndarray,
+    cell_px: int
+) -> List[np.ndarray]:
+    """Group tile coordinates into square cells of the slide.
+
+    Args:
+        coord (np.ndarray): Tile coordinates, with shape (n_tiles, n) and
+            rows beginning with the base layer (x, y) location of the tile.
+        cell_px (int): Width/height of each cell, in base layer pixels.
+
+    Returns:
+        List of np.ndarray, one for each non-empty cell.
+    """
+    if not len(coord):
+        return []
+    cell_x = coord[:, 0] // cell_px
+    cell_y = coord[:, 1] // cell_px
+    order = np.lexsort((cell_x, cell_y))
+    coord, cell_x, cell_y = coord[order], cell_x[order], cell_y[order]
+    is_new = (np.diff(cell_x) != 0) | (np.diff(cell_y) != 0)
+    return np.split(coord, np.flatnonzero(is_new) + 1)
+
+
+def _queued_generator(tiles: "queue.Queue") -> Callable:
+    """Return a tile generator yielding tiles from a queue, until None."""
+
+    def generator():
+        while True:
+            tile = tiles.get()
+            if tile is None:
+                return
+            elif isinstance(tile, Exception):
+                raise tile
+            yield tile
+
+    return generator
+
+
+@contextmanager
+def _cleanup_worker_state(
+    state_key: Optional[str],
+    state_path: Optional[str] = None
+):
+    """Unregister tile extraction state and remove its temporary file."""
+    try:
+        yield
+    finally:
+        if state_key is not None:
+            unregister_worker_state(state_key)
+        if state_path is not None and exists(state_path):
+            os.remove(state_path)
+
+
 def log_extraction_params(**kwargs) -> None:
     '''Logs tile extraction parameters.'''
 
@@ -239,6 +332,7 @@ class _BaseLoader:
         self.stride_div = stride_div
         self.path = path
         self.qc_masks = []
+        self.qc_filter_thresholds = []  # type: List[float]
         self.rois = []  # type: List
         self.qc_mpp = None  # type: Optional[float]
         self.blur_burden = None  # type: Optional[float]
@@ -432,6 +526,7 @@ class _BaseLoader:
     def remove_qc(self) -> None:
         self._build_coord()
         self.qc_masks = []
+        self.qc_filter_thresholds = []
         log.debug(f'QC removed from slide {self.shortname}')
 
     def qc(
@@ -536,14 +631,21 @@ class _BaseLoader:
         downsample = self.dimensions[0] / mask.shape[1]
         qc_ratio = 1 / downsample
         qc_width = int(np.round(self.full_extract_px * qc_ratio))
-        for i, (x, y, xi, yi) in enumerate(self.coord):  # type: ignore
-            qc_x = int(np.round(x * qc_ratio))
-            qc_y = int(np.round(y * qc_ratio))
-            submask = mask[qc_y:(qc_y+qc_width), qc_x:(qc_x+qc_width)]
-            if np.mean(submask) > filter_threshold:
-                self.grid[xi, yi] = 0
+        qc_xy = np.round(self.coord[:, 0:2] * qc_ratio).astype(np.int64)
+        # Fraction of each tile covered by the mask, clipped to the mask
+        # bounds. Tiles entirely outside the mask are not filtered.
+        qc_h, qc_w = mask.shape
+        area = (
+            (np.clip(qc_xy[:, 0] + qc_width, 0, qc_w) - np.clip(qc_xy[:, 0], 0, qc_w))
+            * (np.clip(qc_xy[:, 1] + qc_width, 0, qc_h) - np.clip(qc_xy[:, 1], 0, qc_h))
+        )
+        with np.errstate(divide='ignore', invalid='ignore'):
+            masked = window_sums(mask, qc_xy, qc_width) / area
+        filtered = self.coord[masked > filter_threshold]
+        self.grid[filtered[:, 2], filtered[:, 3]] = 0
 
         self.qc_masks.append(mask)
+        self.qc_filter_thresholds.append(filter_threshold)
         self.qc_mpp = self.mpp * downsample
         self.estimated_num_tiles = int(self.grid.sum())
         return Image.fromarray(img_as_ubyte(self.qc_mask))
@@ -692,6 +794,9 @@ class _BaseLoader:
         tiles_dir: Optional[str] = None,
         img_format: str = 'jpg',
         report: bool = True,
+        checkpoint_every: Optional[int] = None,
+        resume: bool = False,
+        generator: Optional[Callable] = None,
         **kwargs
     ) -> Optional[SlideReport]:
         """Extracts tiles from slide using the build_generator() method,
@@ -705,6 +810,20 @@ class _BaseLoader:
             img_format (str): 'png' or 'jpg'. Format of images for internal
                 storage in tfrecords. PNG (lossless) format recommended for
                 fidelity, JPG (lossy) for efficiency. Defaults to 'jpg'.
+            checkpoint_every (int, optional): Flush written tiles to disk and
+                save a checkpoint (``{slide}.checkpoint.npz``) every this
+                many tiles, so that an interrupted extraction can be resumed
+                with ``resume=True``. Defaults to None (no checkpoints).
+            resume (bool): Resume an interrupted extraction from its last
+                checkpoint, extracting only tiles which are missing. If no
+                checkpoint is found, the slide is extracted from the
+                beginning. Enables checkpoints, every
+                ``DEFAULT_CHECKPOINT_EVERY`` (1000) tiles if
+                ``checkpoint_every`` is not set. Defaults to False.
+            generator (Callable, optional): Tile generator to save tiles
+                from, rather than building one with :meth:`build_generator`.
+                Used to extract several tile sizes from shared reads.
+                Defaults to None.
 
         Keyword Args:
             whitespace_fraction (float, optional): Range 0-1. Defaults to 1.
@@ -771,19 +890,61 @@ class _BaseLoader:
             )
             with open(unfinished_marker, 'w') as marker_file:
                 marker_file.write(' ')
+
+        # Set up checkpoints, restoring tiles extracted before an
+        # interruption if resuming.
+        checkpoint = None
+        if resume and not checkpoint_every:
+            checkpoint_every = DEFAULT_CHECKPOINT_EVERY
+        if checkpoint_every and (tfrecord_dir or tiles_dir) and not dry_run:
+            checkpoint = ExtractionCheckpoint(
+                (tfrecord_dir or tiles_dir),  # type: ignore
+                self.name,
+                tfrecord=bool(tfrecord_dir),
+                tile_px=self.tile_px,
+                tile_um=self.tile_um,
+                stride_div=self.stride_div
+            )
+            if resume and checkpoint.load():
+                checkpoint.recover()
+                log.info(f"Resuming extraction for [green]{self.name}[/] "
+                         f"from checkpoint ({len(checkpoint)} tiles)")
+                if tiles_dir:
+                    self._remove_stale_tiles(tiles_dir, len(checkpoint))
+                kwargs['exclude_grid'] = checkpoint.grid
+                if kwargs.get('max_tiles') is not None:
+                    kwargs['max_tiles'] = max(
+                        kwargs['max_tiles'] - len(checkpoint), 0)
+            else:
+                checkpoint.remove()
+        n_restored = 0 if checkpoint is None else len(checkpoint)
+
         if tfrecord_dir and not dry_run:
-            writer = sf.io.TFRecordWriter(join(
-                tfrecord_dir,
-                self.name+".tfrecords"
-            ))
+            tfr_path = join(tfrecord_dir, self.name+".tfrecords")
+            writer_path = tfr_path if checkpoint is None else checkpoint.writer_path
+            if sf.backend() == 'torch' and writer_path == tfr_path:
+                # Index the TFRecord while writing, rather than re-reading it.
+                writer = sf.io.TFRecordWriter(
+                    tfr_path,
+                    index_path=join(tfrecord_dir, self.name+".index")
+                )
+            else:
+                writer = sf.io.TFRecordWriter(writer_path)
 
-        generator = self.build_generator(
-            img_format=img_format,
-            **kwargs
-        )
+        if generator is None and kwargs.get('max_tiles') == 0:
+            # All tiles were extracted before the interruption.
+            generator = partial(iter, [])
+        elif generator is None:
+            generator = self.build_generator(
+                img_format=img_format,
+                **kwargs
+            )
         if not generator:
-            if tfrecord_dir:
-                os.remove(join(tfrecord_dir, self.name+".tfrecords"))
+            if tfrecord_dir and not dry_run:
+                writer.close()
+                self._remove_tfrecord(tfr_path)
+            if checkpoint is not None:
+                checkpoint.remove()
             return None
 
         sample_tiles = []  # type: List
@@ -792,10 +953,15 @@ class _BaseLoader:
         grid_locations = []
         ws_fractions = []
         gs_fractions = []
+        if checkpoint is not None:
+            locations = checkpoint.locations.tolist()
+            grid_locations = checkpoint.grid.tolist()
+            ws_fractions = checkpoint.ws_fractions.tolist()
+            gs_fractions = checkpoint.gs_fractions.tolist()
         num_wrote_to_tfr = 0
         slidename_bytes = bytes(self.name, 'utf-8')
 
-        for index, tile_dict in enumerate(generator_iterator):
+        for index, tile_dict in enumerate(generator_iterator, n_restored):
             location = tile_dict['loc']
             locations += [location]
             grid_locations += [tile_dict['grid']]
@@ -808,6 +974,9 @@ class _BaseLoader:
                 continue
 
             image_string = tile_dict['image']
+            if isinstance(image_string, memoryview):
+                # Tile returned through shared memory.
+                image_string = image_string.tobytes()
             if len(sample_tiles) < 10:
                 sample_tiles += [image_string]
             elif (not tiles_dir and not tfrecord_dir) and not dry_run:
@@ -839,14 +1008,25 @@ class _BaseLoader:
                 )
                 writer.write(record)
                 num_wrote_to_tfr += 1
+            if checkpoint is not None and not (index + 1) % checkpoint_every:
+                if tfrecord_dir:
+                    writer.flush()
+                checkpoint.update(grid_locations, locations,
+                                  ws_fractions, gs_fractions)
+                checkpoint.save()
         if tfrecord_dir and not dry_run:
             writer.close()
+            if checkpoint is not None:
+                checkpoint.finish()
+                num_wrote_to_tfr += n_restored
             if not num_wrote_to_tfr:
-                os.remove(join(tfrecord_dir, self.name+".tfrecords"))
+                self._remove_tfrecord(tfr_path)
                 log.info(f'No tiles extracted for [green]{self.name}')
         if self.pb is None:
             generator_iterator.close()
 
+        if checkpoint is not None and not tfrecord_dir:
+            checkpoint.finish()
         if (tfrecord_dir or tiles_dir) and not dry_run:
             try:
                 os.remove(unfinished_marker)
@@ -890,6 +1070,24 @@ class _BaseLoader:
             log.debug("Skipping slide report")
             return None
 
+    @staticmethod
+    def _remove_tfrecord(path: str) -> None:
+        """Remove an empty TFRecord and its index, if one was written."""
+        os.remove(path)
+        for ext in ('.index.npz', '.index.npy'):
+            index_path = path[:-len('.tfrecords')] + ext
+            if exists(index_path):
+                os.remove(index_path)
+
+    def _remove_stale_tiles(self, tiles_dir: str, n_tiles: int) -> None:
+        """Remove loose tiles saved after the last extraction checkpoint."""
+        prefix = f'{self.shortname}_'
+        for filename in os.listdir(tiles_dir):
+            stem = os.path.splitext(filename)[0]
+            idx = stem[len(prefix):]
+            if stem.startswith(prefix) and idx.isdigit() and int(idx) >= n_tiles:
+                os.remove(join(tiles_dir, filename))
+
     def preview(
         self,
         rois: bool = True,
@@ -1039,6 +1237,10 @@ class WSI(_BaseLoader):
         self.verbose = verbose
         self.segmentation = None
         self.grid = None
+        self.pickled_state_bytes = None  # type: Optional[int]
+        self.ws_fractions = None  # type: Optional[np.ndarray]
+        self.gs_fractions = None  # type: Optional[np.ndarray]
+        self._filter_fractions_params = None  # type: Optional[Tuple]
         self.use_edge_tiles = use_edge_tiles
 
         if (not isinstance(roi_filter_method, (int, float))
@@ -1204,7 +1406,6 @@ class WSI(_BaseLoader):
 
         # Coordinates must be in level 0 (full) format
         # for the read_region function
-        self.coord = []  # type: Union[List, np.ndarray]
         edge_buffer = 0 if self.use_edge_tiles else self.full_extract_px
         y_range = np.arange(
             start_y,
@@ -1217,6 +1418,20 @@ class WSI(_BaseLoader):
             self.full_stride
         )
         self.grid = np.ones((len(x_range), len(y_range)), dtype=bool)
+        self.ws_fractions = None
+        self.gs_fractions = None
+
+        # Coordinate rows are (x, y, grid_x, grid_y), ordered by row (y)
+        # and then by column (x).
+        x, y = np.meshgrid(x_range, y_range)
+        xi, yi = np.meshgrid(
+            np.arange(len(x_range), dtype=np.int32),
+            np.arange(len(y_range), dtype=np.int32)
+        )
+        self.coord = np.stack(
+            [x.ravel(), y.ravel(), xi.ravel(), yi.ravel()],
+            axis=1
+        ).astype(np.int32)
 
         # ROI filtering
         roi_by_center = (self.roi_filter_method == 'center')
@@ -1259,24 +1474,20 @@ class WSI(_BaseLoader):
             self.roi_mask = rasterio.features.rasterize(
                 scaled,
                 out_shape=(self.grid.shape[1] * o, self.grid.shape[0] * o),
-                all_touched=False).astype(bool)
+                all_touched=False,
+                dtype=np.uint8).astype(bool)
         else:
             self.roi_mask = None
 
-        for yi, y in enumerate(y_range):
-            for xi, x in enumerate(x_range):
-                y = int(y)
-                x = int(x)
-                self.coord.append([x, y, xi, yi])
-
-                # ROI filtering
-                if self.has_rois() and roi_by_center:
-                    point_in_roi = self.roi_mask[yi, xi]
-                    # If the extraction method is 'inside',
-                    # skip the tile if it's not in an ROI
-                    if (((self.roi_method in ('inside', 'auto')) and not point_in_roi)
-                       or ((self.roi_method == 'outside') and point_in_roi)):
-                        self.grid[xi, yi] = 0
+        # ROI filtering by tile center. The ROI mask has shape
+        # (grid_y, grid_x), while the grid has shape (grid_x, grid_y).
+        if self.has_rois() and roi_by_center:
+            # If the extraction method is 'inside',
+            # skip tiles that are not in an ROI
+            if self.roi_method in ('inside', 'auto'):
+                self.grid &= self.roi_mask.T
+            elif self.roi_method == 'outside':
+                self.grid &= ~self.roi_mask.T
 
         # If roi_filter_method is a float, then perform tile selection
         # based on what proportion of the tile is in an ROI,
@@ -1287,7 +1498,6 @@ class WSI(_BaseLoader):
                 filter_threshold=(1-self.roi_filter_method)
             )
 
-        self.coord = np.array(self.coord)
         self.estimated_num_tiles = int(self.grid.sum())
         log.debug(f"Set up coordinate grid, shape={self.grid.shape}")
 
@@ -1444,6 +1654,12 @@ class WSI(_BaseLoader):
                 Defaults to False.
             dry_run (bool, optional): Determine tiles that would be extracted,
                 but do not export any images. Defaults to None.
+            checkpoint_every (int, optional): Flush written tiles to disk and
+                save a checkpoint every this many tiles, so that an
+                interrupted extraction can be resumed. Defaults to None.
+            resume (bool): Resume an interrupted extraction from its last
+                checkpoint, extracting only tiles which are missing.
+                Defaults to False.
         """
         return super().extract_tiles(
             tfrecord_dir,
@@ -1494,12 +1710,454 @@ class WSI(_BaseLoader):
             **kwargs
         )
 
+    def with_tile_size(
+        self,
+        tile_px: int,
+        tile_um: Union[int, str],
+        stride_div: Optional[int] = None
+    ) -> "WSI":
+        """Return this slide at a different tile size.
+
+        The returned slide shares this slide's reader, ROIs, and QC masks,
+        so QC does not need to be repeated for the new tile size.
+
+        Args:
+            tile_px (int): Size of tiles to extract, in pixels.
+            tile_um (int or str): Size of tiles to extract, in microns (int)
+                or magnification (str, e.g. "20x").
+            stride_div (int, optional): Stride divisor for tile extraction.
+                Defaults to the stride divisor of this slide.
+
+        Returns:
+            :class:`slideflow.WSI`
+        """
+        wsi = WSI(
+            self.path,
+            tile_px=tile_px,
+            tile_um=tile_um,
+            stride_div=(stride_div or self.stride_div),
+            enable_downsample=self.enable_downsample,
+            roi_method='ignore',
+            roi_filter_method=self.roi_filter_method,
+            randomize_origin=self.randomize_origin,
+            pb=self.pb,
+            verbose=False,
+            use_edge_tiles=self.use_edge_tiles,
+            mpp=self._mpp_override,
+            **self._reader_kwargs
+        )
+        # The new slide's reader normally comes from the per-process reader
+        # cache, but share ours explicitly in case caching is disabled.
+        wsi._BaseLoader__slide = self.slide
+        if self.roi_method != 'ignore':
+            wsi.rois = self.rois
+            wsi.roi_method = self.roi_method
+            wsi.process_rois()
+        for mask, threshold in zip(self.qc_masks, self.qc_filter_thresholds):
+            wsi.apply_qc_mask(mask, filter_threshold=threshold)
+        wsi.blur_burden = self.blur_burden
+        return wsi
+
+    def extract_tiles_multiscale(
+        self,
+        tile_sizes: List[Tuple[int, Union[int, str]]],
+        tfrecord_dirs: Optional[List[Optional[str]]] = None,
+        tiles_dirs: Optional[List[Optional[str]]] = None,
+        img_format: str = 'jpg',
+        report: bool = True,
+        **kwargs
+    ) -> List[Optional[SlideReport]]:
+        """Extract tiles at several tile sizes, sharing slide preparation.
+
+        ROIs and QC masks of this slide are shared by all tile sizes (see
+        :meth:`WSI.with_tile_size`), so QC is performed once. Tile sizes are
+        extracted concurrently, each writing its own TFRecord, with tiles
+        read by a single worker pool.
+
+        If the tile grids of all sizes are aligned, each region of the slide
+        is read once, at the pyramid level of the finest tile size, and tiles
+        of every size are cropped from the shared region. Grids are aligned
+        if the stride of each size evenly divides the largest stride, and
+        tile sizes and strides are whole pixels at the level being read.
+        Tiles of coarser sizes are downsampled from their crop, so they may
+        differ slightly from tiles extracted at each size separately, and
+        whitespace/grayspace filtering is performed on the crop. Shared reads
+        support filtering, stain normalization, shuffling, and dry runs; with
+        other extraction options, unaligned grids, or the cuCIM backend, tile
+        regions are read separately for each size.
+
+        Args:
+            tile_sizes (list(tuple(int, int or str))): List of
+                (tile_px, tile_um) tile sizes.
+            tfrecord_dirs (list(str), optional): TFRecord directory for each
+                tile size. Defaults to None.
+            tiles_dirs (list(str), optional): Directory for loose images,
+                for each tile size. Defaults to None.
+            img_format (str): 'png' or 'jpg'. Defaults to 'jpg'.
+            report (bool): Generate slide reports. Defaults to True.
+
+        Keyword Args:
+            **kwargs: All keyword arguments are passed to
+                :meth:`WSI.extract_tiles()` for each tile size.
+
+        Returns:
+            List of :class:`slideflow.slide.report.SlideReport` (or None),
+            one for each tile size.
+        """
+        if tfrecord_dirs is None:
+            tfrecord_dirs = [None] * len(tile_sizes)
+        if tiles_dirs is None:
+            tiles_dirs = [None] * len(tile_sizes)
+        if not len(tfrecord_dirs) == len(tiles_dirs) == len(tile_sizes):
+            raise ValueError("Expected a TFRecord and tile directory for "
+                             "each tile size.")
+        wsis = [
+            self if (tile_px, tile_um) == (self.tile_px, self.tile_um)
+            else self.with_tile_size(tile_px, tile_um)
+            for tile_px, tile_um in tile_sizes
+        ]
+        level = self._shared_read_level(wsis, kwargs)
+
+        # Share a single worker pool across tile sizes.
+        pool = kwargs.pop('pool', None)
+        num_threads = kwargs.pop('num_threads', None)
+        num_processes = kwargs.pop('num_processes', None)
+        should_close = pool is None
+        if pool is None:
+            if num_threads is None and num_processes is None:
+                n_cores = sf.util.num_cpu(default=8)
+                if sf.slide_backend() == 'libvips':
+                    num_processes = max(int(n_cores/2), 1)
+                else:
+                    num_threads = n_cores
+            if num_threads is not None and num_threads > 1:
+                pool = mp.dummy.Pool(processes=num_threads)
+            elif num_processes is not None and num_processes > 1:
+                ptype = 'spawn' if sf.slide_backend() == 'libvips' else 'fork'
+                pool = mp.get_context(ptype).Pool(
+                    processes=num_processes,
+                    initializer=sf.util.set_ignore_sigint,
+                )
+
+        # Read regions once for all tile sizes, if the grids are aligned.
+        if level is None:
+            shared_reads = nullcontext([None] * len(wsis))
+        else:
+            log.debug(f"Reading tiles of all sizes from level {level}")
+            shared_reads = self._shared_reads(
+                wsis, level, pool, img_format, **kwargs
+            )
+        if pool is None:
+            # Extract serially within each tile size.
+            kwargs['num_threads'] = 1
+
+        def extract(i, generators):
+            return wsis[i].extract_tiles(
+                tfrecord_dir=tfrecord_dirs[i],
+                tiles_dir=tiles_dirs[i],
+                img_format=img_format,
+                report=report,
+                pool=pool,
+                generator=generators[i],
+                **kwargs
+            )
+
+        try:
+            with shared_reads as generators, \
+                 mp.dummy.Pool(len(wsis)) as writers:
+                return writers.map(
+                    partial(extract, generators=generators),
+                    range(len(wsis))
+                )
+        finally:
+            if should_close and pool is not None:
+                pool.close()
+
+    def _shared_read_level(
+        self,
+        wsis: List["WSI"],
+        kwargs: Dict[str, Any]
+    ) -> Optional[int]:
+        """Return the pyramid level from which tiles of all the given slides
+        can be cropped, or None if their grids are not aligned or shared
+        reads do not support the extraction arguments."""
+        supported = ('whitespace_fraction', 'whitespace_threshold',
+                     'grayspace_fraction', 'grayspace_threshold',
+                     'normalizer', 'normalizer_source', 'shuffle',
+                     'deterministic', 'dry_run', 'pool', 'num_threads',
+                     'num_processes')
+        unsupported = [k for k, v in kwargs.items()
+                       if k not in supported
+                       and v is not None and v is not False]
+        if sf.slide_backend() != 'libvips' or unsupported:
+            return None
+        level = min(w.downsample_level for w in wsis)
+        downsample_factor = self.slide.level_downsamples[level]
+        cell_px = max(w.full_stride for w in wsis)
+        for w in wsis:
+            if (w.randomize_origin
+               or cell_px % w.full_stride
+               or w.full_stride % downsample_factor
+               or w.full_extract_px % downsample_factor):
+                return None
+        return level
+
+    @contextmanager
+    def _shared_reads(
+        self,
+        wsis: List["WSI"],
+        level: int,
+        pool: Optional["mp.pool.Pool"],
+        img_format: str,
+        *,
+        shuffle: bool = True,
+        deterministic: bool = True,
+        normalizer: Optional[Union[str, "slideflow.norm.StainNormalizer"]] = None,
+        normalizer_source: Optional[str] = None,
+        whitespace_fraction: Optional[float] = None,
+        whitespace_threshold: Optional[float] = None,
+        grayspace_fraction: Optional[float] = None,
+        grayspace_threshold: Optional[float] = None,
+        dry_run: bool = False
+    ):
+        """Read tiles of several sizes from shared regions of the slide.
+
+        Regions are read by :func:`multiscale_tile_worker` in a background
+        thread, one grid cell of the coarsest stride at a time, and tiles
+        are queued for the slide of each size.
+
+        Yields:
+            List of tile generators (or None, if a size has no tiles to
+            extract), one for each slide in ``wsis``.
+        """
+        filter_kw = _update_kw_with_defaults(dict(
+            whitespace_fraction=whitespace_fraction,
+            whitespace_threshold=whitespace_threshold,
+            grayspace_fraction=grayspace_fraction,
+            grayspace_threshold=grayspace_threshold,
+            img_format=img_format
+        ))
+        if normalizer and not isinstance(normalizer, sf.norm.StainNormalizer):
+            normalizer = sf.norm.StainNormalizer(normalizer)  # type: ignore
+            if normalizer_source is not None:
+                normalizer.fit(normalizer_source)  # type: ignore
+
+        # Tile sizes and offsets are whole pixels at the level being read.
+        downsample_factor = self.slide.level_downsamples[level]
+        args = SimpleNamespace(
+            path=self.path,
+            mpp_override=self._mpp_override,
+            reader_kwargs=self._reader_kwargs,
+            downsample_level=level,
+            sizes=[
+                SimpleNamespace(
+                    full_extract_px=w.full_extract_px,
+                    extract_px=int(w.full_extract_px / downsample_factor),
+                    tile_px=w.tile_px,
+                    normalizer=normalizer,
+                    yolo=False,
+                    draw_roi=False,
+                    dry_run=dry_run,
+                    has_segmentation=False,
+                    **filter_kw
+                ) for w in wsis
+            ]
+        )
+
+        # Group tiles of all sizes, filtered with QC or ROI, into grid cells
+        # of the coarsest stride.
+        coord = []
+        for i, w in enumerate(wsis):
+            c = w.coord[w.grid[tuple(w.coord[:, 2:4].T)].astype(bool)]
+            coord.append(np.column_stack([c, np.full(len(c), i, c.dtype)]))
+        cells = _coord_cells(
+            np.concatenate(coord),
+            max(w.full_stride for w in wsis)
+        )
+        if shuffle:
+            random.shuffle(cells)
+
+        tiles = [queue.Queue() for _ in wsis]  # type: List[queue.Queue]
+        stop = threading.Event()
+
+        def read():
+            n_extracted = [0] * len(wsis)
+            task_fn = partial(multiscale_tile_worker, args=args)
+            try:
+                if pool is None:
+                    i_mapped = map(task_fn, cells)
+                else:
+                    map_fn = pool.imap if deterministic else pool.imap_unordered
+                    csize = max(min(int(len(cells)/pool._processes), 8), 1)
+                    i_mapped = map_fn(task_fn, cells, chunksize=csize)
+                for results in i_mapped:
+                    for i, result in results:
+                        if self.pb is not None:
+                            self.pb.advance(0)
+                        if result is not None:
+                            tiles[i].put(result)
+                            n_extracted[i] += 1
+                    if stop.is_set():
+                        break
+            except Exception as e:
+                for t in tiles:
+                    t.put(e)
+            finally:
+                for t in tiles:
+                    t.put(None)
+            log_fn = log.info if self.verbose else log.debug
+            for w, n in zip(wsis, n_extracted):
+                log_fn(f"Finished tile extraction for [green]{w.shortname}[/] "
+                       f"at {w.tile_px}px, {w.tile_um}um ({n} tiles of "
+                       f"{w.estimated_num_tiles} possible)")
+
+        reader = threading.Thread(target=read, daemon=True)
+        reader.start()
+        try:
+            yield [
+                _queued_generator(t) if w.estimated_num_tiles else None
+                for w, t in zip(wsis, tiles)
+            ]
+        finally:
+            stop.set()
+            reader.join()
+
     def has_rois(self) -> bool:
         """Checks if the slide has loaded ROIs and they are not being ignored."""
         return (self.roi_method != 'ignore'
                 and len(self.rois)
                 and self.annPolys is not None)
 
+    def _filter_level(self) -> Tuple[int, int]:
+        """Return the pyramid level used by tile workers for whitespace and
+        grayspace filtering, and its downsample ratio relative to the
+        extraction level."""
+        if self.enable_downsample:
+            downsamples = np.array(self.slide.level_downsamples)
+            filter_lev = np.max(np.argwhere(downsamples < self.extract_px))
+            filter_downsample_factor = self.slide.level_downsamples[filter_lev]
+            lev_ds = self.slide.level_downsamples[self.downsample_level]
+            filter_downsample_ratio = filter_downsample_factor // lev_ds
+        else:
+            filter_lev = self.downsample_level
+            filter_downsample_ratio = 1
+        return filter_lev, filter_downsample_ratio
+
+    def compute_filter_fractions(
+        self,
+        whitespace_threshold: Optional[float] = None,
+        grayspace_threshold: Optional[float] = None,
+        *,
+        exact: bool = False
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Calculate whitespace and grayspace fractions for the entire grid.
+
+        Fractions are calculated in a single vectorized pass over one pyramid
+        level, rather than by reading each tile, and are stored in
+        ``WSI.ws_fractions`` and ``WSI.gs_fractions`` as arrays with the same
+        shape as ``WSI.grid``. Results are cached until the grid is rebuilt.
+
+        Args:
+            whitespace_threshold (int, optional): Range 0-255. Threshold above
+                which a pixel (RGB average) is whitespace. Defaults to 230.
+            grayspace_threshold (float, optional): Range 0-1. Pixels in HSV
+                format with saturation below this threshold are grayspace.
+                Defaults to 0.05.
+
+        Keyword args:
+            exact (bool): Calculate fractions at the same pyramid level and
+                with the same operations used for filtering during tile
+                extraction, so that fractions are identical to those
+                calculated by tile workers. If False, uses a low-resolution
+                level on which each tile spans approximately 16 pixels.
+                Defaults to False.
+
+        Returns:
+            np.ndarray: Whitespace fraction for each grid cell.
+
+            np.ndarray: Grayspace fraction for each grid cell.
+        """
+        if whitespace_threshold is None:
+            whitespace_threshold = DEFAULT_WHITESPACE_THRESHOLD
+        if grayspace_threshold is None:
+            grayspace_threshold = DEFAULT_GRAYSPACE_THRESHOLD
+
+        if exact:
+            level, ratio = self._filter_level()
+            if ratio > 1:
+                extract_px = int(self.extract_px // ratio)
+            else:
+                level, extract_px = self.downsample_level, int(self.extract_px)
+        else:
+            level = self.slide.best_level_for_downsample(
+                self.full_extract_px / 16
+            )
+            extract_px = max(int(np.round(
+                self.full_extract_px / self.slide.level_downsamples[level]
+            )), 1)
+
+        params = (whitespace_threshold, grayspace_threshold, level, extract_px)
+        if self.ws_fractions is not None and self._filter_fractions_params == params:
+            return self.ws_fractions, self.gs_fractions
+
+        ws, gs = grid_filter_fractions(
+            self.slide,
+            self.coord[:, 0:2],
+            level,
+            extract_px,
+            whitespace_threshold,
+            grayspace_threshold
+        )
+        grid_idx = tuple(self.coord[:, 2:4].T)
+        self.ws_fractions = np.zeros(self.grid.shape, dtype=np.float64)
+        self.gs_fractions = np.zeros(self.grid.shape, dtype=np.float64)
+        self.ws_fractions[grid_idx] = ws
+        self.gs_fractions[grid_idx] = gs
+        self._filter_fractions_params = params
+        log.debug(f"Calculated whitespace/grayspace fractions for grid "
+                  f"(level={level}, tile={extract_px}px)")
+        return self.ws_fractions, self.gs_fractions
+
+    def _check_jpeg_passthrough(
+        self,
+        *,
+        img_format: str,
+        normalizer: Optional["slideflow.norm.StainNormalizer"],
+        draw_roi: bool,
+        from_centroids: bool,
+        block_size: Optional[Tuple[int, int]]
+    ) -> bool:
+        """Check whether stored JPEG tiles can be copied during extraction."""
+        jpeg_level = None
+        if sf.slide_backend() != 'libvips':
+            reason = 'requires the libvips backend'
+        elif img_format not in ('jpg', 'jpeg'):
+            reason = "requires img_format='jpg'"
+        elif normalizer:
+            reason = 'not compatible with stain normalization'
+        elif draw_roi or from_centroids or block_size is not None:
+            reason = ('not compatible with draw_roi, from_centroids, '
+                      'or block_size')
+        elif int(self.tile_px) != self.extract_px:
+            reason = f'tiles are resized ({self.extract_px}px -> {self.tile_px}px)'
+        else:
+            jpeg_level = self.slide.jpeg_tile_level(self.downsample_level)
+            if jpeg_level is None:
+                reason = 'slide level is not stored as JPEG tiles'
+            elif (jpeg_level.tile_width != self.extract_px
+                  or jpeg_level.tile_height != self.extract_px):
+                reason = (f'stored tile size ({jpeg_level.tile_width}x'
+                          f'{jpeg_level.tile_height}px) does not match '
+                          f'extraction size ({self.extract_px}px)')
+            else:
+                reason = None
+        if reason is not None:
+            log.debug(f"JPEG passthrough disabled for {self.name}: {reason}")
+            return False
+        log.debug(f"JPEG passthrough enabled for {self.name}: copying aligned "
+                  f"{jpeg_level.tile_width}px JPEG tiles")
+        return True
+
     def build_generator(
         self,
         *,
@@ -1525,7 +2183,17 @@ class WSI(_BaseLoader):
         max_tiles: Optional[int] = None,
         from_centroids: bool = False,
         apply_masks: bool = True,
-        deterministic: bool = True
+        deterministic: bool = True,
+        block_size: Optional[Union[int, Tuple[int, int]]] = None,
+        prefilter: Union[bool, str] = False,
+        prefilter_margin: float = 0.1,
+        register_state: bool = False,
+        measure_pickled_bytes: bool = False,
+        shared_memory: bool = False,
+        shm_slots: Optional[int] = None,
+        shm_hold: int = 1,
+        jpeg_passthrough: bool = False,
+        exclude_grid: Optional[np.ndarray] = None
     ) -> Optional[Callable]:
         """Builds tile generator to extract tiles from this slide.
 
@@ -1587,6 +2255,65 @@ class WSI(_BaseLoader):
             shard (tuple(int, int), optional): If provided, will only extract
                 tiles from the shard with index `shard[0]` out of `shard[1]`
                 shards. Defaults to None.
+            block_size (int or tuple(int, int), optional): Extract tiles in
+                blocks of neighboring grid cells, with this many grid
+                columns and rows per block (an int is used for both). Each
+                worker reads a single region per block and slices the
+                (possibly overlapping) tiles from memory, reducing redundant
+                reads when ``stride_div > 1``. Shuffling is performed at the
+                block level. Only supported by the libvips backend.
+                Defaults to None (read each tile individually).
+            prefilter (bool or str): Skip tiles that clearly fail whitespace
+                or grayspace filtering without reading them, using fractions
+                calculated for the whole grid in one pass over a
+                low-resolution pyramid level (see
+                :meth:`WSI.compute_filter_fractions`). Tiles within
+                ``prefilter_margin`` of the filtering fraction are still read
+                and checked at full resolution. If 'exact', fractions are
+                calculated at the filtering level used by tile workers, and
+                extracted tiles are identical to those extracted without
+                prefiltering. Defaults to False.
+            prefilter_margin (float): Margin above the whitespace/grayspace
+                fraction within which tiles are not skipped by the
+                prefilter. Ignored if ``prefilter='exact'``. Defaults to 0.1.
+            register_state (bool): Send the extraction arguments (ROIs, grid,
+                normalizer, etc.) to each worker process once, rather than
+                with every chunk of tasks. Workers of a pool created by this
+                generator receive the arguments via the pool initializer;
+                workers of a shared ``pool`` load them once from a temporary
+                file. Tasks then carry only tile coordinates. Defaults to
+                False.
+            measure_pickled_bytes (bool): Measure the number of bytes pickled
+                for worker state when extracting with a process pool, and
+                store it in ``WSI.pickled_state_bytes``. Always measured and
+                logged when debug logging is enabled. Defaults to False.
+            shared_memory (bool): Return tiles from worker processes through
+                a shared-memory ring buffer, rather than pickling each tile
+                through the pool's result pipe. Yielded images are views
+                into shared memory (np.ndarray for 'numpy', memoryview for
+                encoded formats), which remain valid until ``shm_hold``
+                further tiles have been yielded. Only used with process
+                pools, and not with ``block_size``. Defaults to False.
+            shm_slots (int, optional): Number of tile slots in the shared
+                memory buffer. Defaults to None (sized from the number of
+                processes and ``shm_hold``).
+            shm_hold (int): Number of subsequently yielded tiles for which a
+                tile's shared memory remains valid. When batching tiles
+                without copying, set to at least the batch size.
+                Defaults to 1.
+            jpeg_passthrough (bool): When extracting JPEG tiles from a slide
+                stored as JPEG tiles (e.g. SVS or pyramidal TIFF), copy the
+                stored tile directly for tiles that align with the slide's
+                tile grid, rather than decoding and re-encoding the region.
+                Requires that the extraction size matches the stored tile
+                size, without resizing. Not used with stain normalization,
+                ``draw_roi``, ``block_size``, or ``from_centroids``; tiles
+                which are not aligned are extracted normally.
+                Defaults to False.
+            exclude_grid (np.ndarray, optional): Grid indices of tiles to
+                skip, as an array of shape (N, 2) with (grid_x, grid_y), such
+                as tiles already extracted before an interruption. Not used
+                with ``from_centroids``. Defaults to None.
 
         Returns:
             dict: Dict with keys 'image' (image data), 'yolo' (optional
@@ -1612,6 +2339,14 @@ class WSI(_BaseLoader):
                 "Cannot build generator from segmentation centroids; "
                 "segmentation not yet applied. Use WSI.apply_segmentation()."
             )
+        if isinstance(block_size, int):
+            block_size = (block_size, block_size)
+        if block_size is not None and (from_centroids
+                                       or sf.slide_backend() != 'libvips'):
+            log.warning("Block extraction is only available for grid-based "
+                        "extraction with the libvips backend; extracting "
+                        "tiles individually.")
+            block_size = None
 
         super().build_generator()
         if self.estimated_num_tiles == 0:
@@ -1630,15 +2365,35 @@ class WSI(_BaseLoader):
 
         # Get information about highest level downsample, as we will filter
         # on that layer if downsampling is enabled
-        if self.enable_downsample:
-            downsamples = np.array(self.slide.level_downsamples)
-            filter_lev = np.max(np.argwhere(downsamples < self.extract_px))
-            filter_downsample_factor = self.slide.level_downsamples[filter_lev]
-            lev_ds = self.slide.level_downsamples[self.downsample_level]
-            filter_downsample_ratio = filter_downsample_factor // lev_ds
-        else:
-            filter_lev = self.downsample_level
-            filter_downsample_ratio = 1
+        filter_lev, filter_downsample_ratio = self._filter_level()
+
+        # Skip tiles which clearly fail whitespace/grayspace filtering,
+        # based on fractions calculated for the entire grid at once.
+        prefiltered = self.grid
+        if (prefilter
+           and not from_centroids
+           and (whitespace_fraction < 1 or grayspace_fraction < 1)
+           and FORCE_CALCULATE_WHITESPACE not in (whitespace_fraction,
+                                                  grayspace_fraction)):
+            exact = (prefilter == 'exact')
+            margin = 0 if exact else prefilter_margin
+            ws_frac, gs_frac = self.compute_filter_fractions(
+                whitespace_threshold,
+                grayspace_threshold,
+                exact=exact
+            )
+            prefiltered = self.grid.copy()
+            if whitespace_fraction < 1:
+                prefiltered &= ~(ws_frac > whitespace_fraction + margin)
+            if grayspace_fraction < 1:
+                prefiltered &= ~(gs_frac > grayspace_fraction + margin)
+            log.debug(f"Prefilter skipping {self.grid.sum() - prefiltered.sum()} "
+                      f"of {self.grid.sum()} tiles")
+
+        # Skip tiles which have already been extracted.
+        if exclude_grid is not None and len(exclude_grid):
+            prefiltered = prefiltered.copy()
+            prefiltered[tuple(np.asarray(exclude_grid, dtype=int).T)] = False
 
         # Prepare stain normalization
         if normalizer and not isinstance(normalizer, sf.norm.StainNormalizer):
@@ -1660,6 +2415,24 @@ class WSI(_BaseLoader):
             log.debug("Preparing whole-slide context for normalizer")
             normalizer.set_context(self)
 
+        # Normalizers compiled into lookup tables carry the table with them,
+        # so send them to each worker once rather than with every chunk.
+        if (normalizer
+           and not register_state
+           and isinstance(normalizer, sf.norm.StainNormalizer)
+           and normalizer.get_lut() is not None):
+            log.debug("Registering worker state for lookup table normalizer")
+            register_state = True
+
+        if jpeg_passthrough:
+            jpeg_passthrough = self._check_jpeg_passthrough(
+                img_format=img_format,
+                normalizer=normalizer,
+                draw_roi=draw_roi,
+                from_centroids=from_centroids,
+                block_size=block_size
+            )
+
         w_args = SimpleNamespace(**{
             'full_extract_px': self.full_extract_px,
             'mpp_override': self._mpp_override,
@@ -1683,7 +2456,8 @@ class WSI(_BaseLoader):
             'yolo': yolo,
             'draw_roi': draw_roi,
             'dry_run': dry_run,
-            'has_segmentation': from_centroids
+            'has_segmentation': from_centroids,
+            'jpeg_passthrough': jpeg_passthrough
         })
 
         def generator():
@@ -1694,12 +2468,12 @@ class WSI(_BaseLoader):
             # Skip tiles filtered out with QC or ROI
             if not from_centroids:
                 non_roi_coord = self.coord[
-                    self.grid[tuple(self.coord[:, 2:4].T)].astype(bool)
+                    prefiltered[tuple(self.coord[:, 2:4].T)].astype(bool)
                 ]
                 # Shuffle coordinates to randomize extraction order
                 if shuffle:
                     np.random.shuffle(non_roi_coord)
-                num_possible_tiles = len(non_roi_coord)
+                num_possible_tiles = int(self.grid.sum())
             else:
                 from slideflow.cellseg import seg_utils
 
@@ -1730,7 +2504,24 @@ class WSI(_BaseLoader):
                 sharded_coords = np.array_split(non_roi_coord, shard_count)
                 non_roi_coord = sharded_coords[shard_idx]
 
+            # Group coordinates into blocks, if reading by block.
+            if block_size is not None:
+                non_roi_coord = _coord_blocks(non_roi_coord, block_size)
+                if shuffle:
+                    random.shuffle(non_roi_coord)
+                worker = tile_block_worker
+                log.debug(f"Extracting {len(non_roi_coord)} blocks "
+                          f"(block_size={block_size})")
+            else:
+                worker = tile_worker
+
+            # Key for extraction arguments in the worker state registry
+            state_key = None
+            if register_state:
+                state_key = f'{self.path}:{uuid.uuid4().hex}'
+
             # Set up worker pool
+            shared_pool = (pool is not None)
             if pool is None:
                 if num_threads is None and num_processes is None:
                     # Libvips is extremely slow with ThreadPools.
@@ -1752,16 +2543,23 @@ class WSI(_BaseLoader):
                     log.debug(f"Building generator with Pool({num_processes}), "
                               f"type={ptype}")
                     ctx = mp.get_context(ptype)
-                    pool = ctx.Pool(
-                        processes=num_processes,
-                        initializer=sf.util.set_ignore_sigint,
-                    )
+                    if register_state:
+                        pool = ctx.Pool(
+                            processes=num_processes,
+                            initializer=init_worker_state,
+                            initargs=(state_key, w_args)
+                        )
+                    else:
+                        pool = ctx.Pool(
+                            processes=num_processes,
+                            initializer=sf.util.set_ignore_sigint,
+                        )
                     should_close = True
                 else:
                     log.debug(f"Building generator without multithreading")
                     def _generator():
                         for c in non_roi_coord:
-                            yield tile_worker(c, args=w_args)
+                            yield worker(c, args=w_args)
                     i_mapped = _generator()
             else:
                 log.debug("Building generator with a shared pool")
@@ -1772,6 +2570,80 @@ class WSI(_BaseLoader):
             else:
                 pbar = None
 
+            # Prepare the task function sent to the pool with each chunk.
+            state_path = None
+            is_process_pool = (pool is not None
+                               and not isinstance(pool, mp.pool.ThreadPool))
+            if pool is None or not register_state:
+                task_fn = partial(worker, args=w_args)
+            else:
+                if shared_pool and is_process_pool:
+                    # Workers load the arguments once from a temporary file.
+                    fd, state_path = tempfile.mkstemp(suffix='.pkl')
+                    with os.fdopen(fd, 'wb') as f:
+                        pickle.dump(w_args, f)
+                elif not is_process_pool:
+                    register_worker_state(state_key, w_args)
+                task_fn = partial(
+                    registered_worker,
+                    key=state_key,
+                    worker=worker,
+                    state_path=state_path
+                )
+
+            # Return tiles through a shared-memory ring buffer.
+            tile_buffer = None
+            max_chunk = 64
+            if (shared_memory
+               and is_process_pool
+               and not dry_run
+               and block_size is None):
+                max_chunk = 8
+                if shm_slots is None:
+                    n_slots = shm_hold + 2 * max_chunk * pool._processes
+                else:
+                    n_slots = max(shm_slots, shm_hold + 2)
+                    max_chunk = max(min(max_chunk, n_slots - shm_hold - 1), 1)
+                tile_buffer = SharedTileBuffer(
+                    n_slots,
+                    self.tile_px * self.tile_px * 3
+                )
+                task_fn = partial(
+                    shared_tile_worker,
+                    fn=task_fn,
+                    shm_name=tile_buffer.name,
+                    slot_bytes=tile_buffer.slot_bytes
+                )
+                log.debug(f"Using shared tile buffer with {n_slots} slots")
+            elif shared_memory:
+                log.debug("Shared memory tile transport requires a process "
+                          "pool and is not used with block extraction or "
+                          "dry runs; disabling.")
+
+            def submit(items):
+                if tile_buffer is not None:
+                    return tile_buffer.tasks(items)
+                return items
+
+            # Instrumentation of bytes pickled for worker state. Pickling
+            # the task and arguments is not free, so only measure on request.
+            self.pickled_state_bytes = None
+            measure_bytes = is_process_pool and (
+                measure_pickled_bytes or sf.getLoggingLevel() <= 10
+            )
+            if measure_bytes:
+                if hasattr(non_roi_coord, '__len__'):
+                    n_items = len(non_roi_coord)
+                else:
+                    n_items = num_possible_tiles
+                task_bytes = len(pickle.dumps(task_fn))
+                if register_state:
+                    state_bytes = len(pickle.dumps(w_args))
+                    if not shared_pool:
+                        state_bytes *= pool._processes
+                else:
+                    state_bytes = 0
+
             if pool is not None:
                 map_fn = pool.imap if deterministic else pool.imap_unordered
                 if lazy_iter:
@@ -1782,27 +2654,64 @@ class WSI(_BaseLoader):
                     batched_coord = sf.util.batch(non_roi_coord, batch_size)
                     def _generator():
                         for batch in batched_coord:
-                            yield from map_fn(
-                                partial(tile_worker, args=w_args),
-                                batch
-                            )
+                            yield from map_fn(task_fn, submit(batch))
                     i_mapped = _generator()
+                    n_chunks = n_items if measure_bytes else 0
 
                 else:
-                    csize = max(min(int(self.estimated_num_tiles/pool._processes), 64), 1)
+                    if block_size is not None:
+                        n_tasks = len(non_roi_coord)
+                    else:
+                        n_tasks = self.estimated_num_tiles
+                    csize = max(min(int(n_tasks/pool._processes), max_chunk), 1)
                     log.debug(f"Using imap chunksize={csize}")
                     i_mapped = map_fn(
-                        partial(tile_worker, args=w_args),
-                        non_roi_coord,
+                        task_fn,
+                        submit(non_roi_coord),
                         chunksize=csize
                     )
+                    if measure_bytes:
+                        n_chunks = int(np.ceil(n_items / csize))
+                if measure_bytes:
+                    self.pickled_state_bytes = state_bytes + n_chunks * task_bytes
+                    log.debug(
+                        f"Pickled {self.pickled_state_bytes:,} bytes of worker "
+                        f"state for {self.name} ({task_bytes:,} bytes per "
+                        f"chunk, {n_chunks} chunks)"
+                    )
 
-            with sf.util.cleanup_progress(pbar):
+            # Blocks return a list of results, one for each tile.
+            if block_size is not None:
+                i_mapped = (r for block in i_mapped for r in block)
+
+            # Slots of yielded tiles not yet released.
+            held_slots = deque()  # type: deque
+
+            with sf.util.cleanup_progress(pbar), \
+                 _cleanup_worker_state(state_key, state_path), \
+                 (tile_buffer or nullcontext()):
+                # Tiles skipped by the prefilter count towards progress.
+                n_prefiltered = int(self.grid.sum() - prefiltered.sum())
+                if n_prefiltered and show_progress:
+                    pbar.advance(task, n_prefiltered)
+                elif n_prefiltered and self.pb is not None:
+                    self.pb.advance(0, n_prefiltered)
                 for e, result in enumerate(i_mapped):
                     if show_progress:
                         pbar.advance(task, 1)
                     elif self.pb is not None:
                         self.pb.advance(0)
+                    if tile_buffer is not None:
+                        slot, result = result
+                        if result is not None and 'shm' in result:
+                            result['image'] = tile_buffer.view(
+                                slot, result.pop('shm')
+                            )
+                            held_slots.append(slot)
+                            while len(held_slots) > shm_hold:
+                                tile_buffer.release(held_slots.popleft())
+                        else:
+                            tile_buffer.release(slot)
                     if result is None:
                         continue
                     else:
@@ -2239,6 +3148,11 @@ class WSI(_BaseLoader):
             'slide':        Slide name (if ``incl_slidenames=True``)
             'loc_x'         Image tile x location (if ``incl_loc`` provided)
             'loc_y'         Image tile y location (if ``incl_loc`` provided)
+
+            If ``shared_memory=True`` is passed to the tile generator, numpy
+            images are zero-copy views into shared memory, which remain valid
+            until ``shm_hold`` further tiles have been yielded. When batching
+            with a DataLoader, set ``shm_hold`` to at least the batch size.
         """
         import torch
 
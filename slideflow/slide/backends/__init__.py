@@ -1,7 +1,10 @@
 """Abstraction to support both Libvips and cuCIM backends."""
 
 import slideflow as sf
-from typing import List
+from typing import Callable, Dict, List, Optional
+
+from .cache import (reader_cache, register_worker_state, unregister_worker_state,
+                    init_worker_state, load_worker_state)
 
 
 def tile_worker(*args, **kwargs):
@@ -12,6 +15,60 @@ def tile_worker(*args, **kwargs):
     return tile_worker(*args, **kwargs)
 
 
+def tile_block_worker(*args, **kwargs):
+    if sf.slide_backend() == 'libvips':
+        from .vips import tile_block_worker
+    else:
+        raise NotImplementedError(
+            "Block extraction is not supported by the slide backend "
+            f"{sf.slide_backend()}"
+        )
+    return tile_block_worker(*args, **kwargs)
+
+
+def multiscale_tile_worker(*args, **kwargs):
+    if sf.slide_backend() == 'libvips':
+        from .vips import multiscale_tile_worker
+    else:
+        raise NotImplementedError(
+            "Multiscale extraction from shared reads is not supported by "
+            f"the slide backend {sf.slide_backend()}"
+        )
+    return multiscale_tile_worker(*args, **kwargs)
+
+
+def grid_filter_fractions(*args, **kwargs):
+    if sf.slide_backend() == 'libvips':
+        from .vips import grid_filter_fractions
+    elif sf.slide_backend() == 'cucim':
+        from .cucim import grid_filter_fractions
+    return grid_filter_fractions(*args, **kwargs)
+
+
+def registered_worker(
+    c,
+    *,
+    key: str,
+    worker: Callable,
+    state_path: Optional[str] = None
+):
+    """Run a tile worker with extraction arguments from the state registry.
+
+    Tasks submitted with this worker carry only the slide state key and
+    coordinates, rather than the full extraction arguments.
+
+    Args:
+        c: Tile or block coordinates.
+
+    Keyword args:
+        key (str): Slide state key.
+        worker (Callable): Tile worker, such as :func:`tile_worker`.
+        state_path (str, optional): Path to pickled extraction arguments,
+            loaded if the state is not yet registered in this process.
+    """
+    return worker(c, args=load_worker_state(key, state_path))
+
+
 def wsi_reader(path: str, *args, **kwargs):
     """Get a slide image reader from the current backend."""
     if sf.slide_backend() == 'libvips':
@@ -22,6 +79,36 @@ def wsi_reader(path: str, *args, **kwargs):
         from .cucim import get_cucim_reader
         return get_cucim_reader(path, *args, **kwargs)
 
+
+def set_reader_cache_size(capacity: int) -> None:
+    """Set the maximum number of slide readers cached by this process.
+
+    Slide readers are cached per process in a least-recently-used cache.
+    The default capacity (8) can also be set with the environment variable
+    ``SF_READER_CACHE_SIZE``, which is inherited by worker processes.
+    A capacity of 0 disables caching.
+
+    Args:
+        capacity (int): Maximum number of cached readers.
+    """
+    reader_cache.resize(capacity)
+
+
+def reader_cache_info() -> Dict[str, int]:
+    """Return hit/miss counters and size of this process's reader cache.
+
+    Returns:
+        Dict[str, int]: Dictionary with the keys 'hits', 'misses',
+        'size', and 'capacity'.
+    """
+    return reader_cache.info()
+
+
+def clear_reader_cache() -> None:
+    """Close all slide readers cached by this process."""
+    reader_cache.clear()
+
+
 def backend_formats() -> List[str]:
     if sf.slide_backend() == 'libvips':
         from .vips import SUPPORTED_BACKEND_FORMATS
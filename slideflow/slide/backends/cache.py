@@ -0,0 +1,193 @@
+"""Per-process caches of slide readers and tile extraction state."""
+
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import slideflow as sf
+from slideflow.util import log
+
+# -----------------------------------------------------------------------------
+
+DEFAULT_READER_CACHE_SIZE = 8
+MAX_WORKER_STATES = 8
+
+# -----------------------------------------------------------------------------
+
+
+class ReaderCache:
+
+    def __init__(self, capacity: int = DEFAULT_READER_CACHE_SIZE) -> None:
+        """Least-recently-used cache of slide readers.
+
+        Readers are keyed by the path and arguments used to create them.
+        Each process holds its own cache, so workers in a shared pool which
+        interleave tiles from several slides keep each slide open, rather
+        than re-opening a slide each time the active slide changes.
+
+        Args:
+            capacity (int): Maximum number of cached readers.
+                Defaults to 8.
+        """
+        self._readers = OrderedDict()  # type: OrderedDict
+        self._lock = threading.Lock()
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._readers)
+
+    @staticmethod
+    def _key(path: str, args: Tuple, kwargs: Dict) -> Tuple:
+        # Keyword arguments (e.g. cache_kw) may be unhashable.
+        return (path, repr(args), repr(sorted(kwargs.items())))
+
+    def get(
+        self,
+        path: str,
+        args: Tuple,
+        kwargs: Dict[str, Any],
+        factory: Callable
+    ) -> Any:
+        """Return a cached reader, creating it with ``factory`` if needed.
+
+        Args:
+            path (str): Path to slide.
+            args (tuple): Positional arguments for the reader.
+            kwargs (dict): Keyword arguments for the reader.
+            factory (Callable): Called as ``factory(path, *args, **kwargs)``
+                to create the reader on a cache miss.
+
+        Returns:
+            Slide reader.
+        """
+        key = self._key(path, args, kwargs)
+        with self._lock:
+            if key in self._readers:
+                self._readers.move_to_end(key)
+                self.hits += 1
+                return self._readers[key]
+            self.misses += 1
+        reader = factory(path, *args, **kwargs)
+        if self.capacity > 0:
+            with self._lock:
+                self._readers[key] = reader
+                self._readers.move_to_end(key)
+                self._evict()
+        return reader
+
+    def _evict(self) -> None:
+        while len(self._readers) > max(self.capacity, 0):
+            _, reader = self._readers.popitem(last=False)
+            log.debug(f"Evicted slide reader for {reader.path} from cache")
+
+    def resize(self, capacity: int) -> None:
+        """Set the maximum number of cached readers, evicting as needed."""
+        with self._lock:
+            self.capacity = capacity
+            self._evict()
+
+    def clear(self) -> None:
+        """Remove all cached readers and reset hit/miss counters."""
+        with self._lock:
+            self._readers.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> Dict[str, int]:
+        """Return cache statistics.
+
+        Returns:
+            Dict[str, int]: Dictionary with the keys 'hits', 'misses',
+            'size', and 'capacity'.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._readers),
+            'capacity': self.capacity
+        }
+
+
+def _default_capacity() -> int:
+    if 'SF_READER_CACHE_SIZE' in os.environ:
+        try:
+            return int(os.environ['SF_READER_CACHE_SIZE'])
+        except ValueError:
+            log.warning("Unrecognized value for SF_READER_CACHE_SIZE: "
+                        f"{os.environ['SF_READER_CACHE_SIZE']}")
+    return DEFAULT_READER_CACHE_SIZE
+
+
+reader_cache = ReaderCache(_default_capacity())
+
+
+# -----------------------------------------------------------------------------
+
+# Tile extraction arguments registered in this process, keyed by a
+# per-generator slide state key.
+_worker_states = OrderedDict()  # type: OrderedDict
+_worker_states_lock = threading.Lock()
+
+
+def register_worker_state(key: str, args: SimpleNamespace) -> None:
+    """Register tile extraction arguments in this process.
+
+    Args:
+        key (str): Slide state key.
+        args (SimpleNamespace): Tile extraction arguments.
+    """
+    with _worker_states_lock:
+        _worker_states[key] = args
+        _worker_states.move_to_end(key)
+        while len(_worker_states) > MAX_WORKER_STATES:
+            _worker_states.popitem(last=False)
+
+
+def unregister_worker_state(key: str) -> None:
+    """Remove tile extraction arguments registered in this process."""
+    with _worker_states_lock:
+        _worker_states.pop(key, None)
+
+
+def init_worker_state(key: str, args: SimpleNamespace) -> None:
+    """Multiprocessing pool initializer which registers extraction arguments.
+
+    Args:
+        key (str): Slide state key.
+        args (SimpleNamespace): Tile extraction arguments.
+    """
+    sf.util.set_ignore_sigint()
+    register_worker_state(key, args)
+
+
+def load_worker_state(
+    key: str,
+    state_path: Optional[str] = None
+) -> SimpleNamespace:
+    """Return registered tile extraction arguments.
+
+    If the arguments are not yet registered in this process, they are
+    loaded from ``state_path`` and registered.
+
+    Args:
+        key (str): Slide state key.
+        state_path (str, optional): Path to pickled extraction arguments.
+            Defaults to None.
+
+    Returns:
+        SimpleNamespace: Tile extraction arguments.
+    """
+    with _worker_states_lock:
+        if key in _worker_states:
+            return _worker_states[key]
+    if state_path is None:
+        raise KeyError(f"Tile extraction state {key} not registered")
+    with open(state_path, 'rb') as f:
+        args = pickle.load(f)
+    register_worker_state(key, args)
+    return args
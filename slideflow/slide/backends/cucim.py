@@ -13,6 +13,7 @@ from skimage.transform import resize
 from skimage.util import img_as_float
 from skimage.color import rgb2hsv
 from slideflow.slide.utils import *
+from slideflow.slide.backends.cache import reader_cache
 
 if TYPE_CHECKING:
     from cucim import CuImage
@@ -24,13 +25,12 @@ SUPPORTED_BACKEND_FORMATS = ['svs', 'tif', 'tiff']
 # -----------------------------------------------------------------------------
 
 __cv2_resize__ = True
-__cuimage__ = None
-__cuimage_path__ = None
 
 # -----------------------------------------------------------------------------
 
 def get_cucim_reader(path: str, *args, **kwargs):
-    return _cuCIMReader(path, *args, **kwargs)
+    """Get a cuCIM slide reader, using the per-process reader cache."""
+    return reader_cache.get(path, args, kwargs, _cuCIMReader)
 
 
 def cucim2numpy(img: "CuImage") -> np.ndarray:
@@ -189,6 +189,58 @@ def tile_worker(
     return return_dict
 
 
+def grid_filter_fractions(
+    slide: "_cuCIMReader",
+    coord: np.ndarray,
+    level: int,
+    extract_px: int,
+    whitespace_threshold: float,
+    grayspace_threshold: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Calculate whitespace and grayspace fractions for a grid of tiles.
+
+    Whitespace and grayspace masks are calculated once for an entire pyramid
+    level, using the same operations as :func:`tile_worker`, and are then
+    summed over each tile window, one horizontal strip of tiles at a time.
+    Tiles extending past the slide edge are padded with white.
+
+    Args:
+        slide (_cuCIMReader): Slide reader.
+        coord (np.ndarray): Top-left (x, y) tile coordinates, in base layer
+            pixels, with shape (n_tiles, 2).
+        level (int): Downsample level at which to calculate fractions.
+        extract_px (int): Width/height of each tile at the given level.
+        whitespace_threshold (float): Threshold above which a pixel
+            (RGB average) is whitespace.
+        grayspace_threshold (float): Pixels with an HSV saturation below
+            this threshold (range 0-1) are grayspace.
+
+    Returns:
+        np.ndarray: Whitespace fraction for each tile, with shape (n_tiles,).
+
+        np.ndarray: Grayspace fraction for each tile, with shape (n_tiles,).
+    """
+    downsample_factor = slide.level_downsamples[level]
+    level_xy = (np.asarray(coord)[:, 0:2] / downsample_factor).astype(int)
+    image = slide.read_level(level, to_numpy=True)
+    pad_x = max(0, int(level_xy[:, 0].max()) + extract_px - image.shape[1])
+    pad_y = max(0, int(level_xy[:, 1].max()) + extract_px - image.shape[0])
+    image = np.pad(image, ((0, pad_y), (0, pad_x), (0, 0)), constant_values=255)
+
+    # Masks are calculated one strip of tiles at a time, to bound memory.
+    n_px = extract_px * extract_px
+    ws = np.zeros(len(level_xy))
+    gs = np.zeros(len(level_xy))
+    for y0, y1, idx in window_strips(level_xy, extract_px, image.shape[1]):
+        strip = image[y0:y1]
+        ws_mask = np.mean(strip, axis=-1) > whitespace_threshold
+        gs_mask = rgb2hsv(strip[:, :, 0:3])[:, :, 1] < grayspace_threshold
+        strip_xy = level_xy[idx] - np.array([0, y0])
+        ws[idx] = window_sums(ws_mask, strip_xy, extract_px) / n_px
+        gs[idx] = window_sums(gs_mask, strip_xy, extract_px) / n_px
+    return ws, gs
+
+
 class _cuCIMReader:
 
     has_levels = True
@@ -202,18 +254,12 @@ class _cuCIMReader:
         ignore_missing_mpp: bool = True
     ):
         '''Wrapper for cuCIM reader to preserve cross-compatible functionality.'''
-        global __cuimage__, __cuimage_path__
-
         from cucim import CuImage
 
         self.path = path
         self.cache_kw = cache_kw if cache_kw else {}
         self.loaded_downsample_levels = {}  # type: Dict[int, "CuImage"]
-        if path == __cuimage_path__:
-            self.reader = __cuimage__
-        else:
-            __cuimage__ = self.reader = CuImage(path)
-            __cuimage_path__ = path
+        self.reader = CuImage(path)
         self.num_workers = num_workers
         self._mpp = None
 
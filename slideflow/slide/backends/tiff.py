@@ -0,0 +1,246 @@
+"""Direct access to JPEG-compressed tiles stored in tiled TIFF slides.
+
+Used for JPEG passthrough during tile extraction: when the extraction grid
+aligns with the stored tile grid of a pyramid level, the compressed tile
+is copied as-is rather than decoded and re-encoded.
+"""
+
+import os
+import struct
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from slideflow.util import log
+
+# -----------------------------------------------------------------------------
+
+# TIFF tags
+_WIDTH = 256
+_HEIGHT = 257
+_BITS_PER_SAMPLE = 258
+_COMPRESSION = 259
+_PHOTOMETRIC = 262
+_SAMPLES_PER_PIXEL = 277
+_PLANAR_CONFIG = 284
+_TILE_WIDTH = 322
+_TILE_HEIGHT = 323
+_TILE_OFFSETS = 324
+_TILE_BYTE_COUNTS = 325
+_JPEG_TABLES = 347
+
+_COMPRESSION_JPEG = 7
+_PHOTOMETRIC_RGB = 2
+_PHOTOMETRIC_YCBCR = 6
+
+# TIFF field type: (struct format, size in bytes)
+_FIELD_TYPES = {
+    1: ('B', 1),   # BYTE
+    2: ('B', 1),   # ASCII
+    3: ('H', 2),   # SHORT
+    4: ('I', 4),   # LONG
+    7: ('B', 1),   # UNDEFINED
+    13: ('I', 4),  # IFD
+    16: ('Q', 8),  # LONG8
+    18: ('Q', 8),  # IFD8
+}
+
+# JPEG markers
+_SOI = b'\xff\xd8'
+_EOI = b'\xff\xd9'
+
+# Adobe APP14 segment with transform=0, which marks 3-channel JPEG data as
+# RGB rather than YCbCr.
+_ADOBE_RGB = (b'\xff\xee\x00\x0eAdobe'
+              + struct.pack('>HHHB', 100, 0, 0, 0))
+
+# -----------------------------------------------------------------------------
+
+
+class TiledJPEGLevel:
+
+    def __init__(
+        self,
+        path: str,
+        width: int,
+        height: int,
+        tile_width: int,
+        tile_height: int,
+        offsets: np.ndarray,
+        byte_counts: np.ndarray,
+        tables: Optional[bytes] = None,
+        rgb: bool = False
+    ) -> None:
+        """Stored JPEG tiles of a single tiled TIFF page.
+
+        Args:
+            path (str): Path to TIFF file.
+            width (int): Page width, in pixels.
+            height (int): Page height, in pixels.
+            tile_width (int): Width of stored tiles, in pixels.
+            tile_height (int): Height of stored tiles, in pixels.
+            offsets (np.ndarray): File offset of each tile, in row-major order.
+            byte_counts (np.ndarray): Compressed size of each tile.
+            tables (bytes, optional): Shared JPEG quantization and Huffman
+                tables (TIFF JPEGTables tag). Defaults to None.
+            rgb (bool): Tiles are stored as RGB rather than YCbCr.
+                Defaults to False.
+        """
+        self.path = path
+        self.width = width
+        self.height = height
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+        self.offsets = offsets
+        self.byte_counts = byte_counts
+        self.tables = tables
+        self.rgb = rgb
+        self.tiles_across = -(-width // tile_width)
+        self._file = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_file'] = None
+        return state
+
+    @property
+    def dimensions(self) -> Tuple[int, int]:
+        return self.width, self.height
+
+    def read_tile(self, col: int, row: int) -> bytes:
+        """Read a stored tile as a complete JPEG image.
+
+        Args:
+            col (int): Tile column.
+            row (int): Tile row.
+
+        Returns:
+            bytes: JPEG-encoded tile.
+        """
+        if self._file is None:
+            self._file = open(self.path, 'rb')
+        i = row * self.tiles_across + col
+        # Positional reads are safe to share between threads.
+        data = os.pread(
+            self._file.fileno(),
+            int(self.byte_counts[i]),
+            int(self.offsets[i])
+        )
+        return self._merge(data)
+
+    def _merge(self, data: bytes) -> bytes:
+        """Merge JPEG tables into an abbreviated tile stream."""
+        if not data.startswith(_SOI):
+            raise ValueError("Stored tile is not a JPEG stream")
+        header = _SOI
+        if self.rgb and b'\xff\xeeAdobe' not in data[:64]:
+            header += _ADOBE_RGB
+        if self.tables:
+            # Tables are stored as a complete stream, SOI ... EOI.
+            header += self.tables[2:-2]
+        return header + data[2:]
+
+
+def _read_ifds(f, path: str) -> Tuple[str, List[Dict[int, Tuple]]]:
+    """Read the byte order and the tag entries of each image file directory.
+
+    Tag entries are (field type, count, raw value or offset).
+    """
+    header = f.read(16)
+    order = {b'II': '<', b'MM': '>'}.get(header[:2])
+    if order is None:
+        raise ValueError(f"{path} is not a TIFF file")
+    version = struct.unpack(order + 'H', header[2:4])[0]
+    if version == 42:
+        offset_fmt, count_fmt, entry_size = 'I', 'H', 12
+        next_ifd = struct.unpack(order + 'I', header[4:8])[0]
+    elif version == 43:
+        offset_fmt, count_fmt, entry_size = 'Q', 'Q', 20
+        next_ifd = struct.unpack(order + 'Q', header[8:16])[0]
+    else:
+        raise ValueError(f"{path} is not a TIFF file")
+    count_size = struct.calcsize(count_fmt)
+    offset_size = struct.calcsize(offset_fmt)
+
+    ifds = []
+    seen = set()
+    while next_ifd and next_ifd not in seen:
+        seen.add(next_ifd)
+        f.seek(next_ifd)
+        n_entries = struct.unpack(order + count_fmt, f.read(count_size))[0]
+        raw = f.read(n_entries * entry_size + offset_size)
+        tags = {}
+        for i in range(n_entries):
+            entry = raw[i * entry_size: (i + 1) * entry_size]
+            tag, dtype = struct.unpack(order + 'HH', entry[:4])
+            count = struct.unpack(
+                order + offset_fmt, entry[4:4 + offset_size])[0]
+            tags[tag] = (dtype, count, entry[4 + offset_size:])
+        next_ifd = struct.unpack(order + offset_fmt, raw[-offset_size:])[0]
+        ifds.append(tags)
+    return order, ifds
+
+
+def _tag_values(f, order: str, entry: Tuple) -> np.ndarray:
+    """Read the values of a TIFF tag entry."""
+    dtype, count, value = entry
+    if dtype not in _FIELD_TYPES:
+        raise ValueError(f"Unsupported TIFF field type {dtype}")
+    fmt, size = _FIELD_TYPES[dtype]
+    nbytes = count * size
+    if nbytes <= len(value):
+        data = value[:nbytes]
+    else:
+        offset_fmt = 'I' if len(value) == 4 else 'Q'
+        f.seek(struct.unpack(order + offset_fmt, value)[0])
+        data = f.read(nbytes)
+    return np.frombuffer(data, dtype=np.dtype(order + fmt))
+
+
+def read_jpeg_levels(path: str) -> List[TiledJPEGLevel]:
+    """Find tiled, JPEG-compressed RGB pages in a TIFF file.
+
+    Args:
+        path (str): Path to slide.
+
+    Returns:
+        List[TiledJPEGLevel]: JPEG-tiled pages. Empty if the file is not a
+        TIFF or has no pages stored as 8-bit, 3-channel JPEG tiles.
+    """
+    levels = []
+    try:
+        with open(path, 'rb') as f:
+            order, ifds = _read_ifds(f, path)
+
+            def value(tags, tag, default=None):
+                if tag not in tags:
+                    return default
+                return int(_tag_values(f, order, tags[tag])[0])
+
+            for tags in ifds:
+                if (value(tags, _COMPRESSION) != _COMPRESSION_JPEG
+                   or _TILE_OFFSETS not in tags
+                   or value(tags, _SAMPLES_PER_PIXEL, 1) != 3
+                   or value(tags, _BITS_PER_SAMPLE, 1) != 8
+                   or value(tags, _PLANAR_CONFIG, 1) != 1
+                   or value(tags, _PHOTOMETRIC) not in (_PHOTOMETRIC_RGB,
+                                                        _PHOTOMETRIC_YCBCR)):
+                    continue
+                tables = None
+                if _JPEG_TABLES in tags:
+                    tables = _tag_values(f, order, tags[_JPEG_TABLES]).tobytes()
+                levels.append(TiledJPEGLevel(
+                    path,
+                    width=value(tags, _WIDTH),
+                    height=value(tags, _HEIGHT),
+                    tile_width=value(tags, _TILE_WIDTH),
+                    tile_height=value(tags, _TILE_HEIGHT),
+                    offsets=_tag_values(f, order, tags[_TILE_OFFSETS]),
+                    byte_counts=_tag_values(f, order, tags[_TILE_BYTE_COUNTS]),
+                    tables=tables,
+                    rgb=(value(tags, _PHOTOMETRIC) == _PHOTOMETRIC_RGB)
+                ))
+    except (OSError, ValueError, struct.error) as e:
+        log.debug(f"Unable to read JPEG tiles from {path}: {e}")
+        return []
+    return levels
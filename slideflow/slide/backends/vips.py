@@ -9,10 +9,12 @@ import numpy as np
 import slideflow as sf
 from types import SimpleNamespace
 from PIL import Image, UnidentifiedImageError
-from typing import (Any, Dict, List, Optional, Tuple, Union)
+from typing import (Any, Callable, Dict, List, Optional, Tuple, Union)
 from slideflow import errors
 from slideflow.util import log, path_to_name, path_to_ext  # noqa F401
 from slideflow.slide.utils import *
+from slideflow.slide.backends.cache import reader_cache
+from slideflow.slide.backends.tiff import TiledJPEGLevel, read_jpeg_levels
 
 try:
     import pyvips as vips
@@ -27,12 +29,6 @@ SUPPORTED_BACKEND_FORMATS = ['svs', 'tif', 'ndpi', 'vms', 'vmu', 'scn', 'mrxs',
 
 # -----------------------------------------------------------------------------
 
-__vipsreader__ = None
-__vipsreader_path__ = None
-__vipsreader_args__ = None
-__vipsreader_kwargs__ = None
-
-# -----------------------------------------------------------------------------
 
 VIPS_FORMAT_TO_DTYPE = {
     'uchar': np.uint8,
@@ -49,38 +45,35 @@ VIPS_FORMAT_TO_DTYPE = {
 
 
 def get_libvips_reader(path: str, *args, **kwargs):
-    global __vipsreader__, __vipsreader_path__, __vipsreader_args__, __vipsreader_kwargs__
+    """Get a libvips slide reader, using the per-process reader cache.
+
+    Readers are cached by path and arguments in a least-recently-used cache
+    (see :func:`slideflow.slide.backends.set_reader_cache_size`), with
+    pyramid levels loaded lazily upon first read.
+    """
+    return reader_cache.get(path, args, kwargs, _open_libvips_reader)
+
 
-    # Return from buffer, if present.
-    if (__vipsreader_path__ == path
-       and __vipsreader_args__ == args
-       and __vipsreader_kwargs__ == kwargs):
-        return __vipsreader__
+def _open_libvips_reader(path: str, *args, **kwargs):
+    """Open a libvips slide reader, detecting the appropriate reader type."""
 
     # Read a JPEG/PNG/TIFF image.
     if path_to_ext(path).lower() in ('jpg', 'jpeg', 'png'):
-        reader = _SingleLevelVIPSReader(path, *args, **kwargs)
-
-    # Read a slide image.
+        return _SingleLevelVIPSReader(path, *args, **kwargs)
+
+    # Read a slide image, re-using the image loaded for format detection.
+    vips_image = vips.Image.new_from_file(path)
+    kwargs.setdefault('loaded_image', vips_image)
+    if (vips_image.get('vips-loader') == 'tiffload'
+        and 'n-pages' in vips_image.get_fields()
+        and 'image-description' in vips_image.get_fields()
+        and vips_image.get('image-description').startswith('Versa')):
+        return _VersaVIPSReader(path, *args, **kwargs)
+    elif (vips_image.get('vips-loader') == 'tiffload'
+          and 'n-pages' in vips_image.get_fields()):
+        return _MultiPageVIPSReader(path, *args, **kwargs)
     else:
-        vips_image = vips.Image.new_from_file(path)
-        if (vips_image.get('vips-loader') == 'tiffload'
-            and 'n-pages' in vips_image.get_fields()
-            and 'image-description' in vips_image.get_fields()
-            and vips_image.get('image-description').startswith('Versa')):
-            reader = _VersaVIPSReader(path, *args, **kwargs)
-        elif (vips_image.get('vips-loader') == 'tiffload'
-              and 'n-pages' in vips_image.get_fields()):
-            reader = _MultiPageVIPSReader(path, *args, **kwargs)
-        else:
-            reader = _VIPSReader(path, *args, **kwargs)
-
-    # Buffer args and return.
-    __vipsreader_path__ = path
-    __vipsreader_args__ = args
-    __vipsreader_kwargs__ = kwargs
-    __vipsreader__ = reader
-    return reader
+        return _VIPSReader(path, *args, **kwargs)
 
 
 def vips2numpy(
@@ -240,27 +233,283 @@ def tile_worker(
         tile_mask = None
         x, y, grid_x, grid_y = c
 
-    x_coord = int(x + args.full_extract_px / 2)
-    y_coord = int(y + args.full_extract_px / 2)
-
-    # If downsampling is enabled, read image from highest level
-    # to perform filtering; otherwise filter from our target level
     slide = get_libvips_reader(args.path, args.mpp_override, **args.reader_kwargs)
-    if args.whitespace_fraction < 1 or args.grayspace_fraction < 1:
+
+    def read_filter_region():
+        # If downsampling is enabled, read image from highest level
+        # to perform filtering; otherwise filter from our target level
         if args.filter_downsample_ratio > 1:
             filter_extract_px = args.extract_px // args.filter_downsample_ratio
-            filter_region = slide.read_region(
+            return slide.read_region(
                 (x, y),
                 args.filter_downsample_level,
                 (filter_extract_px, filter_extract_px)
             )
         else:
-            # Read the region and resize to target size
-            filter_region = slide.read_region(
-                (x, y),
-                args.downsample_level,
-                (args.extract_px, args.extract_px)
-            )
+            return read_region()
+
+    def read_region():
+        return slide.read_region(
+            (x, y),
+            args.downsample_level,
+            (args.extract_px, args.extract_px)
+        )
+
+    def read_jpeg():
+        return slide.read_jpeg_tile(
+            (x, y),
+            args.downsample_level,
+            (args.extract_px, args.extract_px)
+        )
+
+    return _process_tile(
+        c,
+        (x, y, grid_x, grid_y),
+        args,
+        read_region=read_region,
+        read_filter_region=read_filter_region,
+        read_jpeg=(read_jpeg if getattr(args, 'jpeg_passthrough', False)
+                   else None),
+        tile_mask=tile_mask
+    )
+
+
+def tile_block_worker(
+    block: np.ndarray,
+    args: SimpleNamespace
+) -> List[Optional[Dict]]:
+    '''Multiprocessing worker for WSI. Extracts a block of neighboring tiles.
+
+    Reads a single region covering all tiles in the block (and, if filtering
+    at a lower magnification, a single filter region), then slices the
+    individual, possibly overlapping, tiles from the in-memory region.
+
+    Args:
+        block (np.ndarray): Grid coordinates, with shape (n_tiles, 4) and
+            rows in the format (x, y, grid_x, grid_y).
+        args (SimpleNamespace): Tile extraction arguments.
+
+    Returns:
+        List of the return values of :func:`tile_worker` for each tile
+        in the block, in the same order as ``block``.
+    '''
+    slide = get_libvips_reader(args.path, args.mpp_override, **args.reader_kwargs)
+    block = np.asarray(block)
+    regions = {}  # type: Dict[str, Tuple["vips.Image", np.ndarray]]
+
+    def block_region(key, level, extract_px):
+        if key not in regions:
+            regions[key] = _read_block_region(slide, block, level, extract_px)
+        return regions[key]
+
+    def crop(key, level, extract_px, i):
+        region, offsets = block_region(key, level, extract_px)
+        return region.crop(*offsets[i], extract_px, extract_px)
+
+    results = []
+    for i, c in enumerate(block):
+        x, y, grid_x, grid_y = (int(_c) for _c in c)
+
+        def read_region(i=i):
+            return crop('tile', args.downsample_level, args.extract_px, i)
+
+        def read_filter_region(i=i):
+            if args.filter_downsample_ratio > 1:
+                return crop(
+                    'filter',
+                    args.filter_downsample_level,
+                    args.extract_px // args.filter_downsample_ratio,
+                    i
+                )
+            else:
+                return read_region(i)
+
+        results.append(_process_tile(
+            c,
+            (x, y, grid_x, grid_y),
+            args,
+            read_region=read_region,
+            read_filter_region=read_filter_region,
+        ))
+    return results
+
+
+def _read_block_region(
+    slide: "_VIPSReader",
+    block: np.ndarray,
+    level: int,
+    extract_px: int
+) -> Tuple["vips.Image", np.ndarray]:
+    """Read the region spanning a block of tiles into memory.
+
+    Args:
+        slide (_VIPSReader): Slide reader.
+        block (np.ndarray): Grid coordinates, with shape (n_tiles, 4).
+        level (int): Downsample level to read.
+        extract_px (int): Width/height of each tile at the given level.
+
+    Returns:
+        vips.Image: Region covering all tiles in the block.
+
+        np.ndarray: Top-left (x, y) offset of each tile within the region,
+        with shape (n_tiles, 2).
+    """
+    # Use the same truncation as read_region(), so that tiles sliced from
+    # the block are identical to tiles read individually.
+    downsample_factor = slide.level_downsamples[level]
+    level_xy = (block[:, 0:2] / downsample_factor).astype(int)
+    origin = level_xy.min(axis=0)
+    size = level_xy.max(axis=0) - origin + extract_px
+    region = slide.read_region(
+        (int(block[:, 0].min()), int(block[:, 1].min())),
+        level,
+        (int(size[0]), int(size[1]))
+    )
+    return region.copy_memory(), level_xy - origin
+
+
+def multiscale_tile_worker(
+    cell: np.ndarray,
+    args: SimpleNamespace
+) -> List[Tuple[int, Optional[Dict]]]:
+    '''Multiprocessing worker for WSI. Extracts tiles of several sizes from
+    one region of the slide.
+
+    Reads a single region covering all tiles in the cell, at the pyramid
+    level of the finest tile size, and crops each tile from the in-memory
+    region. Tiles of coarser sizes are downsampled from their crop.
+
+    Args:
+        cell (np.ndarray): Tile coordinates, with shape (n_tiles, 5) and
+            rows in the format (x, y, grid_x, grid_y, size_index).
+        args (SimpleNamespace): Multiscale extraction arguments, with
+            per-size tile extraction arguments in ``args.sizes``.
+
+    Returns:
+        List of (size_index, result) for each tile in the cell, where
+        result is the return value of :func:`tile_worker`.
+    '''
+    slide = get_libvips_reader(args.path, args.mpp_override, **args.reader_kwargs)
+    cell = np.asarray(cell)
+    sizes = [args.sizes[s] for s in cell[:, 4]]
+    crop_px = np.array([s.extract_px for s in sizes])
+
+    # Use the same truncation as read_region().
+    downsample_factor = slide.level_downsamples[args.downsample_level]
+    level_xy = (cell[:, 0:2] / downsample_factor).astype(int)
+    origin = level_xy.min(axis=0)
+    size = (level_xy + crop_px[:, None]).max(axis=0) - origin
+    region = slide.read_region(
+        (int(cell[:, 0].min()), int(cell[:, 1].min())),
+        args.downsample_level,
+        (int(size[0]), int(size[1]))
+    ).copy_memory()
+    offsets = level_xy - origin
+
+    results = []
+    for i, c in enumerate(cell):
+        x, y, grid_x, grid_y, size_idx = (int(_c) for _c in c)
+
+        def read_region(i=i):
+            return region.crop(*offsets[i], crop_px[i], crop_px[i])
+
+        results.append((size_idx, _process_tile(
+            c[0:4],
+            (x, y, grid_x, grid_y),
+            sizes[i],
+            read_region=read_region,
+            read_filter_region=read_region,
+        )))
+    return results
+
+
+def grid_filter_fractions(
+    slide: "_VIPSReader",
+    coord: np.ndarray,
+    level: int,
+    extract_px: int,
+    whitespace_threshold: float,
+    grayspace_threshold: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Calculate whitespace and grayspace fractions for a grid of tiles.
+
+    Whitespace and grayspace masks are calculated once for an entire pyramid
+    level, using the same operations as :func:`tile_worker`, and are then
+    summed over each tile window. Masks are calculated for one horizontal
+    strip of tiles at a time, so that memory use is bounded for large
+    levels. When calculated at the filtering level used
+    by :func:`tile_worker`, the returned fractions are identical to those
+    calculated for each tile individually.
+
+    Args:
+        slide (_VIPSReader): Slide reader.
+        coord (np.ndarray): Top-left (x, y) tile coordinates, in base layer
+            pixels, with shape (n_tiles, 2).
+        level (int): Downsample level at which to calculate fractions.
+        extract_px (int): Width/height of each tile at the given level.
+        whitespace_threshold (float): Threshold above which a pixel
+            (RGB average) is whitespace.
+        grayspace_threshold (float): Pixels with an HSV saturation below
+            this threshold (range 0-1) are grayspace.
+
+    Returns:
+        np.ndarray: Whitespace fraction for each tile, with shape (n_tiles,).
+
+        np.ndarray: Grayspace fraction for each tile, with shape (n_tiles,).
+    """
+    downsample_factor = slide.level_downsamples[level]
+    level_xy = (np.asarray(coord)[:, 0:2] / downsample_factor).astype(int)
+    image = slide.get_downsampled_image(level)
+
+    # Pad with white background, as done by vips_padded_crop()
+    width = max(image.width, int(level_xy[:, 0].max()) + extract_px)
+    height = max(image.height, int(level_xy[:, 1].max()) + extract_px)
+    image = image.embed(0, 0, width, height, extend='background',
+                        background=[255])
+
+    # Masks are calculated one strip of tiles at a time, to bound memory.
+    n_px = extract_px * extract_px
+    ws = np.zeros(len(level_xy))
+    gs = np.zeros(len(level_xy))
+    for y0, y1, idx in window_strips(level_xy, extract_px, width):
+        strip = image.crop(0, y0, width, y1 - y0)
+        ws_mask = strip.bandmean().relational_const('more', whitespace_threshold)
+        gs_mask = strip.sRGB2HSV()[1].relational_const(
+            'less',
+            grayspace_threshold*255
+        )
+        strip_xy = level_xy[idx] - np.array([0, y0])
+        for out, mask in ((ws, ws_mask), (gs, gs_mask)):
+            mask = vips2numpy(mask)[:, :, 0]
+            # Mirror the libvips arithmetic of .avg() / 255
+            sums = window_sums(mask, strip_xy, extract_px)
+            out[idx] = (sums / n_px) / 255
+    return ws, gs
+
+
+def _process_tile(
+    c: Any,
+    grid_coord: Tuple[int, int, int, int],
+    args: SimpleNamespace,
+    *,
+    read_region: Callable,
+    read_filter_region: Callable,
+    read_jpeg: Optional[Callable] = None,
+    tile_mask: Optional[np.ndarray] = None,
+) -> Optional[Dict]:
+    """Filter and convert a single tile, as read by the given callables.
+
+    If ``read_jpeg`` is provided and returns a stored JPEG tile, the tile is
+    returned as-is, without being decoded and re-encoded.
+    """
+
+    x, y, grid_x, grid_y = grid_coord
+    x_coord = int(x + args.full_extract_px / 2)
+    y_coord = int(y + args.full_extract_px / 2)
+
+    if args.whitespace_fraction < 1 or args.grayspace_fraction < 1:
+        filter_region = read_filter_region()
+
         # Perform whitespace filtering [Libvips]
         if args.whitespace_fraction < 1:
             ws_fraction = filter_region.bandmean().relational_const(
@@ -302,13 +551,19 @@ def tile_worker(
             (args.tile_px, args.tile_px),
             interpolation=cv2.INTER_NEAREST)
 
+    # Copy the stored JPEG tile, if aligned with the slide's tile grid
+    if read_jpeg is not None and tile_mask is None:
+        image = read_jpeg()
+        if image is not None:
+            if args.yolo:
+                _, _, yolo_anns = roi_coords_from_image(c, args)
+                return_dict.update({'yolo': yolo_anns})
+            return_dict.update({'image': image})
+            return return_dict
+
     # Read the target downsample region now, if we were
     # filtering at a different level
-    region = slide.read_region(
-        (x, y),
-        args.downsample_level,
-        (args.extract_px, args.extract_px)
-    )
+    region = read_region()
     if region.bands == 4:
         region = region.flatten()  # removes alpha
     if int(args.tile_px) != int(args.extract_px):
@@ -373,6 +628,7 @@ def tile_worker(
 class _VIPSReader:
 
     has_levels = True
+    _jpeg_levels = None  # type: Optional[List[TiledJPEGLevel]]
 
     def __init__(
         self,
@@ -616,6 +872,57 @@ class _VIPSReader:
         else:
             return region
 
+    def jpeg_tile_level(self, level: int) -> Optional[TiledJPEGLevel]:
+        """Return the stored JPEG tiles of a downsample level, if available.
+
+        Args:
+            level (int): Downsample level.
+
+        Returns:
+            TiledJPEGLevel, or None if the level is not stored as JPEG tiles.
+        """
+        if self._jpeg_levels is None:
+            self._jpeg_levels = read_jpeg_levels(self.path)
+        dimensions = tuple(self.level_dimensions[level])
+        for jpeg_level in self._jpeg_levels:
+            if jpeg_level.dimensions == dimensions:
+                return jpeg_level
+        return None
+
+    def read_jpeg_tile(
+        self,
+        base_level_dim: Tuple[int, int],
+        downsample_level: int,
+        extract_size: Tuple[int, int],
+    ) -> Optional[bytes]:
+        """Read a region as a stored JPEG tile, without decoding.
+
+        Args:
+            base_level_dim (Tuple[int, int]): Top-left location of the region
+                to extract, using base layer coordinates (x, y)
+            downsample_level (int): Downsample level to read.
+            extract_size (Tuple[int, int]): Size of the region to read
+                (width, height) using downsample layer coordinates.
+
+        Returns:
+            bytes: JPEG-encoded region, or None if the region does not match
+            a stored JPEG tile.
+        """
+        jpeg_level = self.jpeg_tile_level(downsample_level)
+        if jpeg_level is None:
+            return None
+        width, height = extract_size
+        if (width, height) != (jpeg_level.tile_width, jpeg_level.tile_height):
+            return None
+        downsample_factor = self.level_downsamples[downsample_level]
+        x = int(base_level_dim[0] / downsample_factor)
+        y = int(base_level_dim[1] / downsample_factor)
+        if (x % width or y % height
+           or x + width > jpeg_level.width
+           or y + height > jpeg_level.height):
+            return None
+        return jpeg_level.read_tile(int(x // width), int(y // height))
+
     def read_from_pyramid(
         self,
         top_left: Tuple[int, int],
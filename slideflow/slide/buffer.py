@@ -0,0 +1,357 @@
+"""Prefetching buffer of slides copied to fast local storage.
+
+Slides stored on network-mounted or otherwise slow storage are copied to a
+local cache directory ahead of use, several at a time, while earlier slides
+are being processed. Cached slides persist across runs and are evicted in
+least-recently-used order when the cache exceeds its size limit.
+
+Each cached slide is stored in its own subdirectory, named according to the
+slide name and a hash of its source path, size, and modification time, so
+that slides which change at the source are copied again.
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from os.path import basename, dirname, exists, isdir, join
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from slideflow.util import log, path_to_name
+
+# Cache entries are named '<slide>-<12 hex digits>', and copies in progress
+# '<entry>.tmp-<thread id>'. Other directories are never indexed or removed.
+_ENTRY_RE = re.compile(r'.+-[0-9a-f]{12}')
+_TMP_RE = re.compile(r'.+-[0-9a-f]{12}\.tmp-[0-9]+')
+
+# -----------------------------------------------------------------------------
+
+
+def _mrxs_folder(path: str) -> Optional[str]:
+    """Return the data folder associated with an MRXS slide, if any."""
+    if not path.lower().endswith('mrxs'):
+        return None
+    folder = join(dirname(path), path_to_name(path))
+    if exists(folder):
+        return folder
+    log.debug(f"Could not find associated MRXS folder for {path}")
+    return None
+
+
+def _disk_usage(path: str) -> int:
+    """Total size of files in a directory, in bytes."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for f in files:
+            try:
+                total += os.path.getsize(join(root, f))
+            except OSError:
+                continue
+    return total
+
+
+class SlideBuffer:
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        max_size: Optional[int] = None,
+        prefetch: int = 2,
+        num_workers: int = 2,
+        persistent: bool = True,
+    ) -> None:
+        """Prefetching buffer of slides, cached in a local directory.
+
+        Slides are copied into the buffer directory concurrently, up to
+        ``prefetch`` slides ahead of the slide in use. With
+        ``persistent=True``, copied slides remain in the directory after
+        use and are reused by later runs, with the least-recently-used
+        slides removed when the cache exceeds ``max_size``.
+
+        Examples
+            Extract tiles using a persistent 500 GB slide cache.
+
+                .. code-block:: python
+
+                    from slideflow.slide import SlideBuffer
+
+                    buffer = SlideBuffer('/mnt/ssd/cache', max_size=500e9)
+                    dataset.extract_tiles(buffer=buffer)
+                    print(buffer.stats)
+
+        Args:
+            path (str): Cache directory. Created if it does not exist.
+
+        Keyword args:
+            max_size (int, optional): Maximum total size of cached slides,
+                in bytes. Slides in use or being prefetched are never
+                evicted, so the limit may be exceeded while they are.
+                Defaults to None (no limit).
+            prefetch (int): Number of slides copied ahead of the slide
+                currently in use. Defaults to 2.
+            num_workers (int): Number of slides copied concurrently.
+                Defaults to 2.
+            persistent (bool): Keep slides in the cache after use. If False,
+                slides are removed as soon as they have been used.
+                Defaults to True.
+        """
+        if prefetch < 1:
+            raise ValueError("prefetch must be at least 1")
+        self.path = path
+        self.max_size = max_size
+        self.prefetch_depth = prefetch
+        self.num_workers = num_workers
+        self.persistent = persistent
+        self.bytes_copied = 0
+        self.hits = 0
+        self.misses = 0
+        self.stall_time = 0.
+        self._lock = threading.Lock()
+        self._sizes = dict()  # type: Dict[str, int]
+        self._pinned = dict()  # type: Dict[str, int]
+        os.makedirs(path, exist_ok=True)
+        self._scan()
+
+    def __repr__(self):
+        return (f"SlideBuffer(path={self.path!r}, max_size={self.max_size}, "
+                f"prefetch={self.prefetch_depth})")
+
+    @property
+    def size(self) -> int:
+        """Total size of cached slides, in bytes."""
+        with self._lock:
+            return sum(self._sizes.values())
+
+    @property
+    def hit_rate(self) -> Optional[float]:
+        """Fraction of requested slides which were already cached."""
+        n = self.hits + self.misses
+        return None if not n else self.hits / n
+
+    @property
+    def stats(self) -> Dict:
+        """Cache and I/O statistics."""
+        return {
+            'bytes_copied': self.bytes_copied,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+            'stall_time': self.stall_time,
+            'cache_size': self.size,
+        }
+
+    def _scan(self) -> None:
+        """Index slides cached by previous runs."""
+        for entry in os.listdir(self.path):
+            entry_path = join(self.path, entry)
+            if not isdir(entry_path):
+                continue
+            if _TMP_RE.fullmatch(entry):
+                # Incomplete copy from an interrupted run.
+                shutil.rmtree(entry_path, ignore_errors=True)
+            elif _ENTRY_RE.fullmatch(entry):
+                self._sizes[entry] = _disk_usage(entry_path)
+
+    def _key(self, slide: str) -> str:
+        """Cache entry name for a slide."""
+        stat = os.stat(slide)
+        source = f'{os.path.abspath(slide)}:{stat.st_size}:{stat.st_mtime_ns}'
+        digest = hashlib.sha1(source.encode()).hexdigest()[:12]
+        return f'{path_to_name(slide)}-{digest}'
+
+    def _local_path(self, slide: str, key: str) -> str:
+        return join(self.path, key, basename(slide))
+
+    def _evict(self, needed: int) -> None:
+        """Remove least-recently-used slides to make room for a new slide.
+
+        Must be called with the lock held.
+        """
+        if self.max_size is None:
+            return
+        total = sum(self._sizes.values())
+        if total + needed <= self.max_size:
+            return
+        unpinned = [k for k in self._sizes if not self._pinned.get(k)]
+        unpinned.sort(key=lambda k: os.path.getmtime(join(self.path, k)))
+        for key in unpinned:
+            if total + needed <= self.max_size:
+                break
+            log.debug(f"Evicting {key} from slide buffer")
+            shutil.rmtree(join(self.path, key), ignore_errors=True)
+            total -= self._sizes.pop(key)
+
+    def _copy(self, slide: str, key: str) -> str:
+        """Copy a slide (and MRXS folder) into the cache."""
+        folder = _mrxs_folder(slide)
+        needed = os.path.getsize(slide)
+        if folder is not None:
+            needed += _disk_usage(folder)
+        with self._lock:
+            self._evict(needed)
+        tmp = join(self.path, f'{key}.tmp-{threading.get_ident()}')
+        os.makedirs(tmp, exist_ok=True)
+        try:
+            shutil.copyfile(slide, join(tmp, basename(slide)))
+            if folder is not None:
+                shutil.copytree(folder, join(tmp, basename(folder)))
+            os.replace(tmp, join(self.path, key))
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            if exists(self._local_path(slide, key)):
+                # Copied concurrently by another worker.
+                return self._local_path(slide, key)
+            raise
+        with self._lock:
+            self._sizes[key] = needed
+            self.bytes_copied += needed
+        return self._local_path(slide, key)
+
+    def _acquire(self, slide: str) -> str:
+        """Return the cached path of a slide, copying it if needed.
+
+        The slide is pinned in the cache until released.
+        """
+        key = self._key(slide)
+        with self._lock:
+            self._pinned[key] = self._pinned.get(key, 0) + 1
+            cached = key in self._sizes
+            if cached:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if cached:
+            # Update the modification time, used for LRU ordering.
+            os.utime(join(self.path, key))
+            return self._local_path(slide, key)
+        try:
+            return self._copy(slide, key)
+        except BaseException:
+            self._release(key)
+            raise
+
+    def _release(self, key: str) -> None:
+        with self._lock:
+            self._pinned[key] -= 1
+            if self._pinned[key]:
+                return
+            del self._pinned[key]
+            if not self.persistent and key in self._sizes:
+                shutil.rmtree(join(self.path, key), ignore_errors=True)
+                del self._sizes[key]
+
+    def release(self, local_path: str) -> None:
+        """Release a slide returned by :meth:`fetch`, allowing it to be
+        evicted (or removed, if the buffer is not persistent)."""
+        self._release(basename(dirname(local_path)))
+
+    def release_many(self, local_paths: Iterable[str]) -> None:
+        """Release slides returned by :meth:`fetch_many`."""
+        for local_path in local_paths:
+            self.release(local_path)
+
+    def fetch(self, slide: str) -> str:
+        """Copy a slide into the buffer, if not already cached.
+
+        The slide should be released with :meth:`release` when no longer
+        needed.
+
+        Args:
+            slide (str): Path to slide.
+
+        Returns:
+            str: Path to the cached slide.
+        """
+        start = time.perf_counter()
+        local = self._acquire(slide)
+        self.stall_time += time.perf_counter() - start
+        return local
+
+    def fetch_many(self, slides: Iterable[str]) -> List[str]:
+        """Copy slides into the buffer concurrently, if not already cached.
+
+        Slides should be released with :meth:`release` when no longer
+        needed.
+
+        Args:
+            slides (Iterable[str]): Paths to slides.
+
+        Returns:
+            List[str]: Paths to the cached slides.
+        """
+        start = time.perf_counter()
+        with ThreadPoolExecutor(self.num_workers) as executor:
+            local = list(executor.map(self._acquire, slides))
+        self.stall_time += time.perf_counter() - start
+        return local
+
+    def prefetch(self, slides: Iterable[str]) -> Iterator[Tuple[str, str]]:
+        """Iterate over slides, copying upcoming slides in the background.
+
+        Each slide is released when iteration moves on to the next slide.
+        Slides which cannot be copied (e.g. because the buffer directory is
+        full) are yielded with their original path.
+
+        Args:
+            slides (Iterable[str]): Paths to slides.
+
+        Yields:
+            Tuple of the original and buffered path to each slide.
+        """
+        slides = iter(slides)
+        queued = deque()  # type: deque
+        with ThreadPoolExecutor(self.num_workers) as executor:
+
+            def submit_next() -> None:
+                slide = next(slides, None)
+                if slide is not None:
+                    queued.append((slide, executor.submit(self._acquire, slide)))
+
+            for _ in range(self.prefetch_depth):
+                submit_next()
+            try:
+                while queued:
+                    slide, future = queued.popleft()
+                    submit_next()
+                    start = time.perf_counter()
+                    try:
+                        local = future.result()
+                    except OSError as e:
+                        log.warning(f"Unable to buffer {slide} ({e}); "
+                                    "reading from source.")
+                        local = None
+                    self.stall_time += time.perf_counter() - start
+                    if local is None:
+                        yield slide, slide
+                        continue
+                    try:
+                        yield slide, local
+                    finally:
+                        self.release(local)
+            finally:
+                # Release slides prefetched but not used.
+                for slide, future in queued:
+                    future.cancel()
+                    if not future.cancelled() and future.exception() is None:
+                        self.release(future.result())
+
+    def log_stats(self) -> None:
+        """Log cache and I/O statistics."""
+        hit_rate = self.hit_rate
+        log.info(
+            f"Slide buffer: {self.bytes_copied / 1e9:.2f} GB copied, "
+            f"hit rate {'n/a' if hit_rate is None else f'{hit_rate:.0%}'}, "
+            f"{self.stall_time:.1f} s waiting for I/O"
+        )
+
+    def clear(self) -> None:
+        """Remove all slides from the cache which are not in use."""
+        with self._lock:
+            for key in [k for k in self._sizes if not self._pinned.get(k)]:
+                shutil.rmtree(join(self.path, key), ignore_errors=True)
+                del self._sizes[key]
@@ -0,0 +1,189 @@
+"""Checkpoints for resumable tile extraction.
+
+During checkpointed extraction, the TFRecord being written is periodically
+flushed, and the grid indices of tiles written so far are saved to a
+sidecar file, ``{slide}.checkpoint.npz``. If extraction is interrupted, it
+can be resumed from the last checkpoint: the TFRecord is truncated to its
+size at the checkpoint, and only tiles which are missing are extracted.
+
+TFRecords are framed record by record, so records extracted after resuming
+are written to a separate file (``{slide}.tfrecords.part``) and appended
+byte-for-byte to the TFRecord when extraction finishes. This works with
+the TFRecord writers of both the Tensorflow and PyTorch backends, neither
+of which can open an existing file for appending.
+"""
+
+import os
+import shutil
+from os.path import exists, join
+from typing import List, Optional, Union
+
+import numpy as np
+
+from slideflow.util import log
+
+# -----------------------------------------------------------------------------
+
+DEFAULT_CHECKPOINT_EVERY = 1000
+
+# -----------------------------------------------------------------------------
+
+
+class ExtractionCheckpoint:
+
+    def __init__(
+        self,
+        directory: str,
+        name: str,
+        *,
+        tfrecord: bool = True,
+        tile_px: int,
+        tile_um: Union[int, str],
+        stride_div: int
+    ) -> None:
+        """Checkpoint of an interrupted tile extraction for a slide.
+
+        Args:
+            directory (str): Directory in which the slide's TFRecord (or
+                loose tile subdirectory) is written.
+            name (str): Slide name.
+
+        Keyword args:
+            tfrecord (bool): Tiles are being written to a TFRecord.
+                Defaults to True.
+            tile_px (int): Tile size, in pixels.
+            tile_um (int or str): Tile size, in microns or magnification.
+            stride_div (int): Stride divisor.
+        """
+        self.path = join(directory, f'{name}.checkpoint.npz')
+        self.tfrecord = join(directory, f'{name}.tfrecords') if tfrecord else None
+        self.part = f'{self.tfrecord}.part' if tfrecord else None
+        self.settings = np.array([str(tile_px), str(tile_um), str(stride_div)])
+        self.grid = np.zeros((0, 2), dtype=np.int64)
+        self.locations = np.zeros((0, 2), dtype=np.int64)
+        self.ws_fractions = np.zeros(0, dtype=float)
+        self.gs_fractions = np.zeros(0, dtype=float)
+        self.size = 0
+        self.part_size = 0
+
+        # Path to which records are written. Records are written directly
+        # to the TFRecord, unless it contains records from before the
+        # checkpoint being resumed.
+        self.writer_path = self.tfrecord
+
+    def __len__(self) -> int:
+        return len(self.grid)
+
+    def load(self) -> bool:
+        """Load a saved checkpoint.
+
+        Returns:
+            bool: Whether a checkpoint compatible with the current
+            extraction settings was found.
+        """
+        if not exists(self.path):
+            return False
+        try:
+            with np.load(self.path) as data:
+                if not np.array_equal(data['settings'], self.settings):
+                    log.warning(f"Ignoring checkpoint {self.path}; saved with "
+                                "different tile size or stride.")
+                    return False
+                self.grid = data['grid']
+                self.locations = data['locations']
+                self.ws_fractions = data['ws_fractions']
+                self.gs_fractions = data['gs_fractions']
+                self.size = int(data['size'])
+                self.part_size = int(data['part_size'])
+        except (OSError, KeyError, ValueError) as e:
+            log.warning(f"Unable to read checkpoint {self.path}: {e}")
+            return False
+        if self.tfrecord is not None and not exists(self.tfrecord):
+            if self.size:
+                log.warning(f"Ignoring checkpoint {self.path}; TFRecord "
+                            "is missing.")
+                return False
+            # Interrupted before the TFRecord was created.
+            open(self.tfrecord, 'wb').close()
+        return True
+
+    def recover(self) -> None:
+        """Restore the TFRecord to its state at the checkpoint.
+
+        Records written after the checkpoint are discarded, and records in
+        the partial file from a previously resumed extraction are merged
+        into the TFRecord.
+        """
+        if self.tfrecord is None:
+            return
+        with open(self.tfrecord, 'r+b') as f:
+            f.truncate(self.size)
+        if self.part_size:
+            self._append_part(self.part_size)
+            self.save()
+        if exists(self.part):
+            os.remove(self.part)
+        if self.size:
+            self.writer_path = self.part
+
+    def update(
+        self,
+        grid: List,
+        locations: List,
+        ws_fractions: List,
+        gs_fractions: List
+    ) -> None:
+        """Record the tiles written so far, including those restored from
+        the checkpoint. The writer must be flushed before updating."""
+        self.grid = np.array(grid, dtype=np.int64).reshape(-1, 2)
+        self.locations = np.array(locations, dtype=np.int64).reshape(-1, 2)
+        self.ws_fractions = np.array(ws_fractions, dtype=float)
+        self.gs_fractions = np.array(gs_fractions, dtype=float)
+        if self.writer_path is not None:
+            written = os.path.getsize(self.writer_path)
+            if self.writer_path == self.part:
+                self.part_size = written
+            else:
+                self.size = written
+
+    def save(self) -> None:
+        """Atomically write the checkpoint to disk."""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                settings=self.settings,
+                grid=self.grid,
+                locations=self.locations,
+                ws_fractions=self.ws_fractions,
+                gs_fractions=self.gs_fractions,
+                size=self.size,
+                part_size=self.part_size
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def finish(self) -> None:
+        """Merge records written after resuming and remove the checkpoint."""
+        if self.tfrecord is not None and self.writer_path == self.part:
+            self._append_part()
+        self.remove()
+
+    def remove(self) -> None:
+        """Remove the checkpoint and any partial TFRecord."""
+        for path in (self.path, self.part):
+            if path is not None and exists(path):
+                os.remove(path)
+
+    def _append_part(self, nbytes: Optional[int] = None) -> None:
+        """Append records from the partial file to the TFRecord."""
+        with open(self.part, 'rb') as src, open(self.tfrecord, 'ab') as dest:
+            if nbytes is None:
+                shutil.copyfileobj(src, dest)
+            else:
+                dest.write(src.read(nbytes))
+            dest.flush()
+            os.fsync(dest.fileno())
+        self.size = os.path.getsize(self.tfrecord)
+        self.part_size = 0
@@ -0,0 +1,191 @@
+"""Shared-memory transport for tiles extracted by worker processes.
+
+Tiles returned from a multiprocessing pool are normally pickled and sent
+through the pool's result pipe. With a :class:`SharedTileBuffer`, workers
+instead write each tile into a preallocated slot of a shared memory block
+and return only the slot index and tile metadata. The consumer receives a
+view into the shared memory, without copying, and the slot is recycled once
+the consumer has moved on.
+"""
+
+import queue
+import threading
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+
+# -----------------------------------------------------------------------------
+
+# Shared memory block attached by this (worker) process.
+_attached = {}  # type: Dict[str, shared_memory.SharedMemory]
+
+# Unlinked shared memory blocks which are still mapped by views.
+_pending_close = []  # type: list
+
+# -----------------------------------------------------------------------------
+
+
+class SharedTileBuffer:
+
+    def __init__(self, n_slots: int, slot_bytes: int) -> None:
+        """Ring buffer of tile slots in shared memory.
+
+        Slots are handed out to tasks as they are submitted to a pool, and
+        are returned to the buffer with :meth:`release`. Submission blocks
+        while all slots are in use, bounding the memory used for tiles
+        in flight.
+
+        Args:
+            n_slots (int): Number of tile slots.
+            slot_bytes (int): Size of each slot, in bytes.
+        """
+        self.n_slots = n_slots
+        self.slot_bytes = slot_bytes
+        self.shm = shared_memory.SharedMemory(
+            create=True,
+            size=n_slots * slot_bytes
+        )
+        self._free = queue.Queue()  # type: queue.Queue
+        for slot in range(n_slots):
+            self._free.put(slot)
+        self._closed = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def acquire(self) -> Optional[int]:
+        """Wait for a free slot. Returns None if the buffer was closed."""
+        while not self._closed.is_set():
+            try:
+                return self._free.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
+
+    def release(self, slot: int) -> None:
+        """Return a slot to the buffer."""
+        self._free.put(slot)
+
+    def tasks(self, items: Iterable) -> Iterator[Tuple[int, Any]]:
+        """Pair each item with a free slot, waiting for slots as needed.
+
+        Iteration stops early if the buffer is closed.
+        """
+        for item in items:
+            slot = self.acquire()
+            if slot is None:
+                return
+            yield slot, item
+
+    def view(self, slot: int, info: Tuple) -> Any:
+        """Return a zero-copy view of a tile written to a slot.
+
+        Args:
+            slot (int): Slot index.
+            info (tuple): Tile information returned by
+                :func:`shared_tile_worker`, either ('numpy', shape) or
+                ('bytes', length).
+
+        Returns:
+            np.ndarray for numpy images, or a memoryview of encoded images.
+        """
+        offset = slot * self.slot_bytes
+        kind, shape = info
+        if kind == 'numpy':
+            # Views hold a buffer export of the shared memory, which
+            # prevents it from being unmapped while the view is alive.
+            nbytes = int(np.prod(shape))
+            view = self.shm.buf[offset:offset + nbytes]
+            return np.frombuffer(view, dtype=np.uint8).reshape(shape)
+        else:
+            return self.shm.buf[offset:offset + shape]
+
+    def close(self) -> None:
+        """Stop handing out slots and release the shared memory."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self.shm.unlink()
+        _pending_close.append(self.shm)
+        _close_pending()
+
+
+def _close_pending() -> None:
+    """Unmap shared memory blocks no longer referenced by any views."""
+    for shm in list(_pending_close):
+        try:
+            shm.close()
+        except BufferError:
+            # Views held by the consumer are still alive; the block stays
+            # mapped and closing is retried later.
+            continue
+        _pending_close.remove(shm)
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach to a shared memory block, detaching from previous blocks."""
+    if name not in _attached:
+        for old in list(_attached):
+            try:
+                _attached.pop(old).close()
+            except BufferError:
+                pass
+        _attached[name] = shared_memory.SharedMemory(name=name)
+    return _attached[name]
+
+
+def shared_tile_worker(
+    task: Tuple[int, Any],
+    *,
+    fn: Callable,
+    shm_name: str,
+    slot_bytes: int
+) -> Tuple[int, Optional[Dict]]:
+    """Run a tile worker, writing the tile image to shared memory.
+
+    Args:
+        task (tuple(int, Any)): Slot index and tile coordinates.
+
+    Keyword args:
+        fn (Callable): Tile worker, called with the tile coordinates.
+        shm_name (str): Name of the shared memory block.
+        slot_bytes (int): Size of each slot, in bytes.
+
+    Returns:
+        Slot index, and the tile worker result. If the image was written to
+        shared memory, the result's 'image' is replaced with the key
+        'shm', containing the information needed by
+        :meth:`SharedTileBuffer.view`.
+    """
+    slot, c = task
+    result = fn(c)
+    if result is None or result.get('image') is None:
+        return slot, result
+    image = result['image']
+    if isinstance(image, np.ndarray):
+        data = np.ascontiguousarray(image, dtype=np.uint8)
+        info = ('numpy', data.shape)  # type: Tuple
+    else:
+        data = np.frombuffer(image, dtype=np.uint8)
+        info = ('bytes', data.size)
+    if data.nbytes > slot_bytes:
+        # Tile does not fit in a slot; return it through the pipe.
+        return slot, result
+    shm = _attach(shm_name)
+    offset = slot * slot_bytes
+    dest = np.ndarray((data.nbytes,), dtype=np.uint8, buffer=shm.buf,
+                      offset=offset)
+    dest[:] = data.reshape(-1)
+    del dest
+    result['image'] = None
+    result['shm'] = info
+    return slot, result
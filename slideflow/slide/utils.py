@@ -9,7 +9,7 @@ import xml.etree.ElementTree as ET
 from PIL import Image, ImageDraw
 from slideflow import errors
 from types import SimpleNamespace
-from typing import Union, List, Tuple
+from typing import Iterator, Union, List, Tuple
 
 DEFAULT_JPG_MPP = 1
 OPS_LEVEL_COUNT = 'openslide.level-count'
@@ -38,6 +38,68 @@ def OPS_LEVEL_DOWNSAMPLE(level: int) -> str:
     return f'openslide.level[{level}].downsample'
 
 
+def window_sums(
+    mask: np.ndarray,
+    top_left: np.ndarray,
+    size: int
+) -> np.ndarray:
+    """Sum a 2D array over square windows, using a summed-area table.
+
+    Args:
+        mask (np.ndarray): 2D array, shape (height, width).
+        top_left (np.ndarray): Top-left (x, y) window coordinates, in pixels,
+            with shape (N, 2).
+        size (int): Width/height of each window, in pixels. Windows are
+            clipped to the bounds of the array.
+
+    Returns:
+        np.ndarray: Sum of each window, with shape (N,).
+    """
+    height, width = mask.shape
+    sat = np.zeros((height + 1, width + 1), dtype=np.int64)
+    np.cumsum(mask, axis=0, out=sat[1:, 1:])
+    np.cumsum(sat[1:, 1:], axis=1, out=sat[1:, 1:])
+    x0 = np.clip(top_left[:, 0], 0, width)
+    y0 = np.clip(top_left[:, 1], 0, height)
+    x1 = np.clip(top_left[:, 0] + size, 0, width)
+    y1 = np.clip(top_left[:, 1] + size, 0, height)
+    return sat[y1, x1] - sat[y0, x1] - sat[y1, x0] + sat[y0, x0]
+
+
+def window_strips(
+    top_left: np.ndarray,
+    size: int,
+    width: int,
+    max_pixels: int = 2 ** 24
+) -> Iterator[Tuple[int, int, np.ndarray]]:
+    """Group square windows into horizontal strips of bounded area.
+
+    Used to calculate per-window statistics one strip at a time, rather than
+    for an entire image. Each strip spans at least one window in height.
+
+    Args:
+        top_left (np.ndarray): Top-left (x, y) window coordinates, in pixels,
+            with shape (N, 2).
+        size (int): Width/height of each window, in pixels.
+        width (int): Width of each strip, in pixels.
+        max_pixels (int): Approximate maximum number of pixels in a strip.
+            Defaults to 2**24.
+
+    Yields:
+        Tuple of the first row, last row (exclusive), and indices of the
+        windows contained in each strip.
+    """
+    order = np.argsort(top_left[:, 1], kind='stable')
+    ys = top_left[order, 1]
+    max_rows = max(max_pixels // max(width, 1), size)
+    start = 0
+    while start < len(order):
+        y0 = int(ys[start])
+        end = int(np.searchsorted(ys, y0 + max_rows - size, side='right'))
+        yield y0, int(ys[end - 1]) + size, order[start:end]
+        start = end
+
+
 def draw_roi(
     img: Union[np.ndarray, str],
     coords: List[List[int]],
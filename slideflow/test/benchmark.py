@@ -0,0 +1,500 @@
+"""Throughput benchmarks for slide processing and data loading.
+
+Benchmarks are not run as part of the unit or functional test suites, and
+are intended to be run manually when evaluating performance changes, e.g.:
+
+    >>> from slideflow.test import benchmark
+    >>> benchmark.block_extraction()
+    >>> benchmark.wsi_construction()
+    >>> benchmark.tfrecord_reading()
+    >>> benchmark.random_sampler()
+    >>> benchmark.interleave_decoding()
+
+"""
+
+import csv
+import os
+import struct
+import tempfile
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import slideflow as sf
+from rich import print
+
+
+def _timed(fn, *args, **kwargs) -> Tuple[Any, float]:
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def synthetic_slide(
+    path: str,
+    width: int = 16384,
+    height: int = 16384,
+    mpp: float = 0.25,
+    tile_size: int = 256,
+    seed: int = 0,
+) -> str:
+    """Write a synthetic, JPEG-compressed pyramidal TIFF.
+
+    The image contains a blob-like "tissue" pattern on a white background,
+    so that whitespace/grayspace filtering behaves similarly to a real slide.
+
+    Args:
+        path (str): Destination path (*.tiff).
+        width (int): Width of the base layer, in pixels. Defaults to 16384.
+        height (int): Height of the base layer, in pixels. Defaults to 16384.
+        mpp (float): Microns-per-pixel stored in the TIFF resolution tags.
+            Defaults to 0.25.
+        tile_size (int): Size of the stored TIFF tiles. Defaults to 256.
+        seed (int): Random seed. Defaults to 0.
+
+    Returns:
+        str: Path to the written slide.
+    """
+    import pyvips
+
+    rng = np.random.default_rng(seed)
+    scale = 16
+    h, w = height // scale, width // scale
+    yy, xx = np.mgrid[0:h, 0:w]
+    tissue = np.sin(xx / 23 + rng.random() * 6) * np.cos(yy / 17) > 0.1
+    small = np.full((h, w, 3), 240, dtype=np.uint8)
+    small[tissue] = (170, 90, 165)
+    small = (small.astype(np.int16)
+             + rng.integers(-12, 12, small.shape)).clip(0, 255).astype(np.uint8)
+    image = pyvips.Image.new_from_array(small).resize(scale, kernel='linear')
+    image = image.copy(interpretation='srgb')
+    # TIFF resolution is stored in pixels per millimeter; the libvips backend
+    # reads MPP from 'xres' when the resolution unit is centimeters.
+    image.tiffsave(
+        path,
+        tile=True,
+        pyramid=True,
+        compression='jpeg',
+        Q=90,
+        tile_width=tile_size,
+        tile_height=tile_size,
+        xres=1000 / mpp,
+        yres=1000 / mpp,
+        resunit='cm'
+    )
+    return path
+
+
+def synthetic_rois(
+    path: str,
+    width: int = 16384,
+    height: int = 16384,
+    n_rois: int = 8,
+    n_vertices: int = 200,
+    seed: int = 0,
+) -> str:
+    """Write a CSV file of random elliptical ROIs.
+
+    Args:
+        path (str): Destination path (*.csv).
+        width (int): Width of the slide base layer, in pixels.
+            Defaults to 16384.
+        height (int): Height of the slide base layer, in pixels.
+            Defaults to 16384.
+        n_rois (int): Number of ROIs. Defaults to 8.
+        n_vertices (int): Vertices per ROI. Defaults to 200.
+        seed (int): Random seed. Defaults to 0.
+
+    Returns:
+        str: Path to the written CSV file.
+    """
+    rng = np.random.default_rng(seed)
+    theta = np.linspace(0, 2 * np.pi, n_vertices, endpoint=False)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['ROI_name', 'X_base', 'Y_base'])
+        for i in range(n_rois):
+            cx, cy = rng.random(2) * (width, height)
+            rx, ry = (rng.random(2) * 0.2 + 0.05) * (width, height)
+            for t in theta:
+                writer.writerow([f'ROI_{i}', cx + rx * np.cos(t),
+                                 cy + ry * np.sin(t)])
+    return path
+
+
+def block_extraction(
+    path: Optional[str] = None,
+    *,
+    tile_px: int = 256,
+    tile_um: int = 128,
+    stride_div: int = 2,
+    block_size: int = 8,
+    num_processes: Optional[int] = None,
+    grayspace_fraction: float = 0.6,
+    **kwargs
+) -> Dict[str, float]:
+    """Compare per-tile and block extraction throughput.
+
+    Args:
+        path (str, optional): Path to a slide. If not provided, a synthetic
+            pyramidal TIFF is created in a temporary directory.
+
+    Keyword args:
+        tile_px (int): Tile size, in pixels. Defaults to 256.
+        tile_um (int): Tile size, in microns. Defaults to 128.
+        stride_div (int): Stride divisor. Defaults to 2.
+        block_size (int): Grid cells per block side. Defaults to 8.
+        num_processes (int, optional): Processes for tile extraction.
+            Defaults to None (backend default).
+        grayspace_fraction (float): Grayspace filtering fraction.
+            Defaults to 0.6.
+        **kwargs: Additional keyword arguments for
+            :meth:`slideflow.WSI.build_generator`.
+
+    Returns:
+        Dict[str, float]: Tiles/sec for the 'tile' and 'block' modes.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        if path is None:
+            path = synthetic_slide(os.path.join(tmp, 'synthetic.tiff'))
+        wsi = sf.WSI(path, tile_px, tile_um, stride_div=stride_div,
+                     roi_method='ignore', verbose=False)
+        gen_kw = dict(
+            img_format='jpg',
+            shuffle=False,
+            num_processes=num_processes,
+            grayspace_fraction=grayspace_fraction,
+            **kwargs
+        )
+        results = {}
+        for mode, bs in (('tile', None), ('block', block_size)):
+            generator = wsi.build_generator(block_size=bs, **gen_kw)
+            n, duration = _timed(lambda: sum(1 for _ in generator()))
+            results[mode] = n / duration
+            print(f"[cyan]{mode:>5}[/]: {n} tiles in {duration:.2f}s "
+                  f"({results[mode]:.1f} tiles/s)")
+    return results
+
+
+def wsi_construction(
+    path: Optional[str] = None,
+    *,
+    tile_px: int = 64,
+    tile_um: int = 8,
+    stride_div: int = 2,
+    repeats: int = 3,
+) -> Dict[str, float]:
+    """Time construction of a WSI with a very large tile grid.
+
+    Args:
+        path (str, optional): Path to a slide. If not provided, a synthetic
+            pyramidal TIFF is created in a temporary directory.
+
+    Keyword args:
+        tile_px (int): Tile size, in pixels. Defaults to 64.
+        tile_um (int): Tile size, in microns. Small values produce large
+            grids. Defaults to 8.
+        stride_div (int): Stride divisor. Defaults to 2.
+        repeats (int): Number of WSIs constructed per configuration.
+            Defaults to 3.
+
+    Returns:
+        Dict[str, float]: Mean construction time in seconds, without
+        ROIs ('no_roi') and with ROIs, filtering by tile center ('roi').
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        if path is None:
+            path = synthetic_slide(os.path.join(tmp, 'synthetic.tiff'))
+        width, height = sf.WSI(path, tile_px, tile_um).dimensions
+        rois = synthetic_rois(os.path.join(tmp, 'rois.csv'), width, height)
+        configs = {
+            'no_roi': dict(roi_method='ignore'),
+            'roi': dict(rois=rois, roi_method='inside'),
+        }
+        results = {}
+        for name, kw in configs.items():
+            durations = []
+            for _ in range(repeats):
+                wsi, duration = _timed(
+                    sf.WSI, path, tile_px, tile_um, stride_div=stride_div,
+                    verbose=False, **kw
+                )
+                durations.append(duration)
+            results[name] = float(np.mean(durations))
+            print(f"[cyan]{name:>6}[/]: grid {wsi.shape[0]}x{wsi.shape[1]} "
+                  f"({wsi.grid.size} cells) in {results[name]:.3f}s")
+    return results
+
+
+def synthetic_tfrecord(
+    path: str,
+    n_records: int = 10000,
+    record_bytes: int = 30000,
+    seed: int = 0,
+) -> np.ndarray:
+    """Write a TFRecord of random payloads and return its index.
+
+    Records are framed as TFRecords, but checksums are not computed and
+    payloads are not serialized Examples; the file is only suitable for
+    measuring raw record throughput with
+    :class:`slideflow.tfrecord.reader.TFRecordIterator`.
+
+    Args:
+        path (str): Destination path (*.tfrecords).
+        n_records (int): Number of records. Defaults to 10000.
+        record_bytes (int): Size of each record payload, in bytes.
+            Defaults to 30000 (roughly a 299 px JPEG tile).
+        seed (int): Random seed. Defaults to 0.
+
+    Returns:
+        np.ndarray: Index of (offset, length) for each record.
+    """
+    rng = np.random.default_rng(seed)
+    payload = rng.bytes(record_bytes)
+    header = struct.pack("<Q", record_bytes) + bytes(4)
+    index = np.zeros((n_records, 2), dtype=np.int64)
+    with open(path, 'wb') as f:
+        for i in range(n_records):
+            index[i] = (f.tell(), record_bytes + 16)
+            f.write(header)
+            f.write(payload)
+            f.write(bytes(4))
+    return index
+
+
+def tfrecord_reading(
+    path: Optional[str] = None,
+    *,
+    directory: Optional[str] = None,
+    n_records: int = 10000,
+    record_bytes: int = 30000,
+    shards: int = 1,
+    repeats: int = 3,
+) -> Dict[str, float]:
+    """Compare buffered and memory-mapped TFRecord reading throughput.
+
+    Reading is timed for the raw record iterator, without parsing, so
+    that differences reflect I/O alone. Benchmarks on local NVMe and
+    network filesystems should be run by pointing ``directory`` (or
+    ``path``) at the storage in question. Results from repeated reads
+    include the effect of the OS page cache; drop caches between runs
+    for cold-read numbers.
+
+    Args:
+        path (str, optional): Path to a TFRecord with an index. If not
+            provided, a synthetic TFRecord is created.
+
+    Keyword args:
+        directory (str, optional): Directory in which the synthetic
+            TFRecord is created. Defaults to a temporary directory.
+        n_records (int): Records in the synthetic TFRecord.
+            Defaults to 10000.
+        record_bytes (int): Payload size of synthetic records, in bytes.
+            Defaults to 30000.
+        shards (int): Read the TFRecord as this many shards, one after
+            another, as done by dataloader workers. Defaults to 1.
+        repeats (int): Number of reads per mode. Defaults to 3.
+
+    Returns:
+        Dict[str, float]: Mean throughput in MB/s for the 'buffered' and
+        'mmap' modes.
+    """
+    from slideflow.tfrecord.reader import TFRecordIterator
+    from slideflow.util import tfrecord2idx
+
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        if path is None:
+            path = os.path.join(tmp, 'synthetic.tfrecords')
+            index = synthetic_tfrecord(path, n_records, record_bytes)
+        else:
+            index = tfrecord2idx.load_index(path)
+        size = os.path.getsize(path)
+
+        def read(use_mmap):
+            n = 0
+            for shard in range(shards):
+                it = TFRecordIterator(
+                    path,
+                    index=index,
+                    shard=(None if shards == 1 else (shard, shards)),
+                    use_mmap=use_mmap
+                )
+                for record in it:
+                    n += record.nbytes
+                it.close()
+            return n
+
+        results = {}
+        for mode, use_mmap in (('buffered', False), ('mmap', True)):
+            durations = []
+            for _ in range(repeats):
+                n, duration = _timed(read, use_mmap)
+                durations.append(duration)
+            results[mode] = size / 1e6 / float(np.mean(durations))
+            print(f"[cyan]{mode:>8}[/]: {len(index)} records ({n / 1e6:.1f} MB) "
+                  f"in {np.mean(durations):.3f}s ({results[mode]:.1f} MB/s)")
+    return results
+
+
+def random_sampler(
+    n_loaders: int = 10000,
+    n_samples: int = 1000000,
+    *,
+    shards: int = 8,
+    finite_size: int = 100,
+    seed: int = 0,
+) -> Dict[str, float]:
+    """Measure the throughput of interleaving many sources with
+    :class:`slideflow.tfrecord.iterator_utils.RandomSampler`.
+
+    Sources are trivial in-memory iterators, so that timings reflect the
+    cost of choosing sources alone. Three cases are timed: infinite
+    sources, infinite sources read as one of ``shards`` shards, and finite
+    sources which are exhausted and removed as sampling proceeds.
+
+    Args:
+        n_loaders (int): Number of interleaved sources. Defaults to 10000.
+        n_samples (int): Number of items to draw in each case.
+            Defaults to 1000000.
+
+    Keyword args:
+        shards (int): Shard count for the sharded case. Defaults to 8.
+        finite_size (int): Items in each finite source. Defaults to 100.
+        seed (int): Random seed. Defaults to 0.
+
+    Returns:
+        Dict[str, float]: Items per second for the 'infinite', 'sharded'
+        and 'finite' cases.
+    """
+    from itertools import islice
+    from slideflow.tfrecord.iterator_utils import RandomSampler
+
+    class Source:
+        def __init__(self, i, n=None):
+            self.i, self.n = i, n
+
+        def __iter__(self):
+            return iter(range(self.n)) if self.n else iter([self.i])
+
+        def close(self):
+            pass
+
+    np.random.seed(seed)
+    ratios = np.random.random(n_loaders)
+    cases = {
+        'infinite': (RandomSampler([Source(i) for i in range(n_loaders)], ratios), n_samples),
+        'sharded': (RandomSampler([Source(i) for i in range(n_loaders)], ratios,
+                                  shard=(0, shards)), n_samples),
+        'finite': (RandomSampler([Source(i, finite_size) for i in range(n_loaders)],
+                                 ratios, infinite=False), min(n_samples, n_loaders * finite_size)),
+    }
+    results = {}
+    for name, (sampler, n) in cases.items():
+        n_drawn, duration = _timed(lambda: sum(1 for _ in islice(sampler, n)))
+        results[name] = n_drawn / duration
+        print(f"[cyan]{name:>8}[/]: {n_drawn} items from {n_loaders} sources "
+              f"in {duration:.3f}s ({results[name]:,.0f} items/s)")
+    return results
+
+
+def synthetic_jpeg_tfrecord(
+    path: str,
+    n_tiles: int = 2000,
+    tile_px: int = 256,
+    seed: int = 0,
+) -> str:
+    """Write an indexed TFRecord of JPEG-compressed synthetic tiles.
+
+    Args:
+        path (str): Destination path (*.tfrecords).
+        n_tiles (int): Number of tiles. Defaults to 2000.
+        tile_px (int): Tile size, in pixels. Defaults to 256.
+        seed (int): Random seed. Defaults to 0.
+
+    Returns:
+        str: Path to the written TFRecord.
+    """
+    import cv2
+    from slideflow.tfrecord.writer import TFRecordWriter
+
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:tile_px, 0:tile_px]
+    writer = TFRecordWriter(path, index_path=path[:-len('.tfrecords')] + '.index')
+    for i in range(n_tiles):
+        base = (np.sin(xx / (9 + i % 7)) * np.cos(yy / 13) * 60 + 170)[..., None]
+        image = (base + rng.integers(-20, 20, (tile_px, tile_px, 3))).clip(0, 255)
+        _, encoded = cv2.imencode('.jpg', image.astype(np.uint8))
+        writer.write(sf.io.serialized_record(
+            b'synthetic', encoded.tobytes(), i % 100, i // 100
+        ))
+    writer.close()
+    return path
+
+
+def interleave_decoding(
+    path: Optional[str] = None,
+    *,
+    directory: Optional[str] = None,
+    n_tiles: int = 2000,
+    tile_px: int = 256,
+    workers: Tuple[int, ...] = (1, 2, 4, 8),
+    augment: str = 'xyrj',
+    chunk_size: int = 8,
+) -> Dict[str, Dict[int, float]]:
+    """Compare thread- and process-based image decoding in
+    :func:`slideflow.io.torch.interleave`.
+
+    Tiles are decoded, augmented and standardized, as during training.
+    Scaling with the number of workers depends on the number of available
+    CPU cores.
+
+    Args:
+        path (str, optional): Path to an indexed TFRecord. If not provided,
+            a synthetic TFRecord of JPEG tiles is created.
+
+    Keyword args:
+        directory (str, optional): Directory in which the synthetic
+            TFRecord is created. Defaults to a temporary directory.
+        n_tiles (int): Tiles in the synthetic TFRecord. Defaults to 2000.
+        tile_px (int): Tile size, in pixels. Defaults to 256.
+        workers (tuple(int)): Numbers of decode threads or processes to
+            time. Defaults to (1, 2, 4, 8).
+        augment (str): Augmentations to perform. Defaults to 'xyrj'.
+        chunk_size (int): Records decoded per chunk. Defaults to 8.
+
+    Returns:
+        Dict[str, Dict[int, float]]: Tiles per second for the 'threads' and
+        'processes' backends, for each number of workers.
+    """
+    from slideflow.io.torch import interleave
+
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        if path is None:
+            path = synthetic_jpeg_tfrecord(
+                os.path.join(tmp, 'synthetic.tfrecords'), n_tiles, tile_px
+            )
+
+        def read(backend, n_workers):
+            dataset = interleave(
+                [path.encode('utf-8')],
+                infinite=False,
+                augment=augment,
+                standardize=True,
+                num_threads=n_workers,
+                chunk_size=chunk_size,
+                tile_px=tile_px,
+                decode_backend=backend
+            )
+            n = sum(1 for _ in dataset)
+            dataset.close()
+            return n
+
+        results = {}  # type: Dict[str, Dict[int, float]]
+        for backend in ('threads', 'processes'):
+            results[backend] = {}
+            for n_workers in workers:
+                n, duration = _timed(read, backend, n_workers)
+                results[backend][n_workers] = n / duration
+                print(f"[cyan]{backend:>9}[/] ({n_workers} workers): {n} tiles "
+                      f"in {duration:.3f}s ({n / duration:,.0f} tiles/s)")
+    return results
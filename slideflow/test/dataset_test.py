@@ -1,8 +1,11 @@
 import logging
+import os
 import random
 import shutil
+import tempfile
 import unittest
 
+import numpy as np
 import pandas as pd
 import slideflow as sf
 from slideflow.test.utils import TestConfig
@@ -299,6 +302,189 @@ class TestLabels(unittest.TestCase):
             self.assertTrue(all([isinstance(lbl[cat_idx], str) for lbl in labels.values()]))
             self.assertTrue(all([isinstance(lbl, str) for lbl in unique['category1']]))
 
+
+class TestLocationIndex(unittest.TestCase):
+
+    def test_lookup(self):
+        from slideflow.util.tfrecord2idx import LocationIndex
+        locations = np.array([[30, 0], [0, 10], [0, 0], [10, 10], [0, 10]])
+        table = LocationIndex.from_locations(locations)
+        found = table.lookup(np.array([[0, 10], [10, 10], [0, 0], [5, 5],
+                                       [30, 0], [-1, 0]]))
+        self.assertEqual(found.tolist(), [1, 3, 2, -1, 0, -1])
+
+
+class TestCatalog(unittest.TestCase):
+
+    def test_update_catalog(self):
+        from slideflow.util import catalog, tfrecord2idx
+
+        def write(path, n):
+            # Records with empty payloads (Examples without features).
+            with open(path, 'wb') as f:
+                f.write(bytes(16) * n)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [os.path.join(tmp, f'{i}.tfrecords') for i in range(3)]
+            for i, path in enumerate(paths):
+                write(path, i + 1)
+            cat, failed = catalog.update_catalog(tmp)
+            self.assertEqual(failed, {})
+            self.assertEqual([cat.total(p) for p in paths], [1, 2, 3])
+            write(paths[0], 5)
+            os.utime(paths[0], ns=(0, 0))
+            indices = catalog.load_indices(paths)
+            self.assertEqual(len(indices[0]), 1)  # Stale index file.
+            cat, _ = catalog.update_catalog(tmp)
+            self.assertEqual(cat.total(paths[0]), 5)
+            self.assertEqual(cat.index(paths[0]).tolist(),
+                             tfrecord2idx.load_index(paths[0]).tolist())
+
+    def test_unindexed_tfrecord(self):
+        from slideflow.tfrecord.torch.dataset import MultiTFRecordDataset
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'unindexed.tfrecords')
+            with open(path, 'wb') as f:
+                f.write(bytes(16) * 4)
+            dts = MultiTFRecordDataset([path.encode()], None, None,
+                                       infinite=False)
+            self.assertEqual(len(list(dts)), 4)
+            dts.close()
+
+
+class TestChunkedTFRecord(unittest.TestCase):
+
+    def test_random_access(self):
+        import struct
+        from slideflow.tfrecord.reader import TFRecordIterator
+        from slideflow.util import chunked_tfrecord, tfrecord2idx
+
+        records = [str(i).encode() * (i % 7) for i in range(50)]
+        framed = [struct.pack('<Q', len(r)) + bytes(4) + r + bytes(4)
+                  for r in records]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'chunked.tfrecords')
+            with open(path, 'wb') as f:
+                for i in range(0, 50, 16):
+                    f.write(chunked_tfrecord.compress_chunk(
+                        b''.join(framed[i:i+16]), len(framed[i:i+16]), 'zlib'
+                    ))
+            self.assertEqual(tfrecord2idx.read_tfrecord_length(path), 50)
+            self.assertEqual([bytes(r) for r in TFRecordIterator(path)], records)
+            shards = [[bytes(r) for r in TFRecordIterator(path, shard=(i, 3))]
+                      for i in range(3)]
+            self.assertEqual(sum(shards, []), records)
+            with tfrecord2idx.TFRecordRandomAccessReader() as reader:
+                ids = [49, 0, 17, 16, 33]
+                self.assertEqual([bytes(r) for r in reader.read_records(path, ids)],
+                                 [records[i] for i in ids])
+
+
+class TestTileStore(unittest.TestCase):
+
+    def test_iterate_and_lookup(self):
+        from slideflow.io import tilestore
+
+        tiles = np.arange(5 * 4 * 4 * 3, dtype=np.uint8).reshape(5, 4, 4, 3)
+        locations = np.array([[i * 10, i] for i in range(5)])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'slide' + tilestore.TILESTORE_EXT)
+            np.save(path, tiles)
+            np.savez(tilestore.sidecar_path(path), slide=np.array('slide'),
+                     locations=locations, offsets=np.zeros(5, dtype=np.int64))
+            with tilestore.TileStore(path) as store:
+                self.assertEqual(len(store), 5)
+                self.assertTrue((store.get_many([3, 1]) == tiles[[3, 1]]).all())
+                self.assertTrue((store.get_by_location((20, 2)) == tiles[2]).all())
+                self.assertIsNone(store.get_by_location((1, 1)))
+            shards = [
+                [t['loc_y'] for t in tilestore.TileStoreIterator(path, shard=(i, 2), clip=4)]
+                for i in range(2)
+            ]
+            self.assertEqual(shards, [[0, 1], [2, 3]])
+
+
+class TestGlobalShuffle(unittest.TestCase):
+
+    def test_epoch_plan(self):
+        from slideflow.tfrecord.reader import GlobalShuffleSampler
+
+        indices = [np.zeros((n, 2), dtype=np.int64) for n in (5, 0, 8)]
+        expected = [(0, i) for i in range(5)] + [(2, i) for i in range(8)]
+
+        def plan(**kwargs):
+            sampler = GlobalShuffleSampler(['a', 'b', 'c'], indices, seed=0, **kwargs)
+            return list(zip(*[p.tolist() for p in sampler.epoch_plan(0)]))
+
+        self.assertEqual(sorted(plan()), expected)
+        shards = [plan(shard=(i, 3)) for i in range(3)]
+        self.assertEqual(sorted(sum(shards, [])), expected)
+        self.assertEqual(plan(), plan())
+
+
+class TestRandomSampler(unittest.TestCase):
+
+    def test_sampling(self):
+        from slideflow.tfrecord.iterator_utils import RandomSampler
+
+        np.random.seed(0)
+        finite = RandomSampler([range(i * 10, i * 10 + i) for i in range(6)],
+                               [1, 1, 1, 5, 1, 0.1], infinite=False)
+        self.assertEqual(sorted(finite), [i * 10 + j for i in range(6) for j in range(i)])
+        infinite = RandomSampler([[0], [1], [2]], [1, 2, 7], block_size=64)
+        it = iter(infinite)
+        counts = np.bincount([next(it) for _ in range(20000)], minlength=3)
+        self.assertTrue(np.allclose(counts / 20000, [0.1, 0.2, 0.7], atol=0.02))
+
+
+class TestBatchAugmenter(unittest.TestCase):
+
+    def test_orientations(self):
+        try:
+            import torch
+            from slideflow.io.torch import BatchAugmenter
+        except ImportError:
+            self.skipTest("PyTorch not installed")
+
+        image = torch.randint(0, 255, (3, 8, 8), dtype=torch.uint8)
+        expected = [torch.rot90(image, k, dims=(-2, -1)) for k in range(4)]
+        expected += [img.flip(-1) for img in expected]
+        batch = BatchAugmenter('xyr')(image.repeat(400, 1, 1, 1))
+        found = [
+            next(i for i, e in enumerate(expected) if torch.equal(img, e))
+            for img in batch
+        ]
+        self.assertEqual(set(found), set(range(8)))
+        standardized = BatchAugmenter(False, standardize=True)(image[None])
+        self.assertTrue(torch.equal(standardized[0], image / (255/2) - 1))
+
+
+class TestLoaderProfiler(unittest.TestCase):
+
+    def test_summary(self):
+        from slideflow.io.profiling import LoaderProfiler
+
+        profiler = LoaderProfiler()
+        for _ in range(90):
+            profiler.record('decode', 0.001)
+        for _ in range(10):
+            profiler.record('decode', 0.1)
+        profiler.record_depth('proc_q', 3)
+        profiler.record_depth('proc_q', 5)
+        summary = profiler.summary()
+        decode = summary['stages']['decode']
+        self.assertEqual(decode['count'], 100)
+        self.assertAlmostEqual(decode['mean_ms'], 10.9)
+        self.assertLess(decode['p50_ms'], 2)
+        self.assertGreater(decode['p99_ms'], 50)
+        self.assertNotIn('read', summary['stages'])
+        self.assertEqual(summary['queues']['proc_q'],
+                         {'mean_depth': 4.0, 'max_depth': 5})
+        self.assertIn('loader/decode/p90_ms', profiler.scalars())
+        profiler.reset()
+        self.assertEqual(sum(profiler.counts().values()), 0)
+
 # -----------------------------------------------------------------------------
 
 if __name__ == '__main__':
@@ -220,6 +220,40 @@ class TestSlide(unittest.TestCase):
         self._test_reinhard_fit_to_path(norm)
         self._test_reinhard_set_fit(norm)
 
+    def test_reinhard_fast_lut(self):
+        norm = sf.norm.StainNormalizer('reinhard_fast')
+        norm.set_lut(16)
+        self.assertIsNone(norm.get_lut())
+        with norm.context(self.img):
+            expected = norm.n.transform(self.img)
+            self.assertIsNotNone(norm.get_lut())
+            result = norm.rgb_to_rgb(self.img)
+            self._assert_valid_numpy(result)
+            self.assertLessEqual(
+                np.abs(result.astype(int) - expected).max(), 2
+            )
+        self.assertIsNone(norm.get_lut())
+
+    def test_transform_batch(self):
+        batch = np.stack([self.img, self.img[::-1], self.img[:, ::-1]])
+        for method in ('reinhard_fast', 'reinhard', 'macenko'):
+            norm = sf.norm.StainNormalizer(method)
+            result = norm.rgb_to_rgb(batch)
+            self.assertEqual(result.shape, batch.shape)
+            for img, normalized in zip(batch, result):
+                expected = norm.rgb_to_rgb(img)
+                self.assertLessEqual(
+                    np.abs(normalized.astype(int) - expected).max(), 1
+                )
+
+        # Blank images raise, unless errors are ignored.
+        batch[1] = 255
+        norm = sf.norm.StainNormalizer('macenko')
+        with self.assertRaises(sf.errors.NormalizerError):
+            norm.rgb_to_rgb(batch)
+        result = norm.n.transform_batch(batch, ignore_errors=True)
+        self.assertTrue(np.array_equal(result[1], batch[1]))
+
     def test_reinhard_mask_numpy(self):
         norm = sf.norm.StainNormalizer('reinhard_mask')
         self._test_transforms(norm)
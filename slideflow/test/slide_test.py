@@ -1,4 +1,7 @@
+import io
 import multiprocessing as mp
+import os
+import tempfile
 import unittest
 
 import numpy as np
@@ -68,6 +71,162 @@ class TestSlide(unittest.TestCase):
         self._assert_is_pil(self.wsi.preview(show_progress=False, pool=pool))
         pool.close()
 
+    def test_block_extraction(self):
+        if sf.slide_backend() != 'libvips':
+            self.skipTest("Block extraction requires libvips")
+        wsi = sf.WSI(self.wsi_path, roi_method='ignore', stride_div=2, **self.kw)
+        kw = dict(shuffle=False, num_threads=1, max_tiles=50,
+                  grayspace_fraction=1)
+        by_tile = {tuple(t['grid']): t['image']
+                   for t in wsi.build_generator(**kw)()}
+        by_block = {tuple(t['grid']): t['image']
+                    for t in wsi.build_generator(block_size=4, **kw)()}
+        shared = set(by_tile) & set(by_block)
+        self.assertTrue(len(shared))
+        for grid in shared:
+            self.assertTrue(np.array_equal(by_tile[grid], by_block[grid]))
+
+    def test_reader_cache(self):
+        from slideflow.slide import backends
+        backends.clear_reader_cache()
+        first = backends.wsi_reader(self.wsi_path)
+        self.assertIs(backends.wsi_reader(self.wsi_path), first)
+        info = backends.reader_cache_info()
+        self.assertEqual((info['hits'], info['misses']), (1, 1))
+        backends.set_reader_cache_size(0)
+        try:
+            self.assertIsNot(backends.wsi_reader(self.wsi_path), first)
+            self.assertEqual(backends.reader_cache_info()['size'], 0)
+        finally:
+            backends.set_reader_cache_size(backends.cache.DEFAULT_READER_CACHE_SIZE)
+
+    def test_register_state(self):
+        pool = mp.dummy.Pool(2)
+        kw = dict(shuffle=False, pool=pool, max_tiles=20,
+                  grayspace_fraction=1)
+        by_task = {tuple(t['grid']): t['image']
+                   for t in self.wsi.build_generator(**kw)()}
+        registered = {tuple(t['grid']): t['image']
+                      for t in self.wsi.build_generator(register_state=True, **kw)()}
+        pool.close()
+        self.assertEqual(set(by_task), set(registered))
+        for grid in by_task:
+            self.assertTrue(np.array_equal(by_task[grid], registered[grid]))
+
+    def test_prefilter(self):
+        wsi = sf.WSI(self.wsi_path, roi_method='ignore', **self.kw)
+        ws, gs = wsi.compute_filter_fractions(exact=True)
+        self.assertEqual(ws.shape, wsi.grid.shape)
+        self.assertEqual(gs.shape, wsi.grid.shape)
+        kw = dict(shuffle=False, num_threads=1, dry_run=True,
+                  whitespace_fraction=0.9, grayspace_fraction=0.6)
+        unfiltered = {tuple(t['grid']): t['gs_fraction']
+                      for t in wsi.build_generator(**kw)()}
+        prefiltered = {tuple(t['grid']): t['gs_fraction']
+                       for t in wsi.build_generator(prefilter='exact', **kw)()}
+        self.assertEqual(unfiltered, prefiltered)
+        for grid, gs_fraction in unfiltered.items():
+            self.assertEqual(gs[grid], gs_fraction)
+
+    def test_jpeg_passthrough(self):
+        if sf.slide_backend() != 'libvips':
+            self.skipTest("JPEG passthrough requires libvips")
+        level = self.wsi.slide.jpeg_tile_level(0)
+        if level is None or (level.tile_width * self.wsi.mpp) % 1:
+            self.skipTest("Slide is not stored as aligned JPEG tiles")
+        tile_px = level.tile_width
+        wsi = sf.WSI(self.wsi_path, tile_px=tile_px,
+                     tile_um=int(tile_px * self.wsi.mpp), roi_method='ignore')
+        kw = dict(shuffle=False, num_threads=1, max_tiles=10, img_format='jpg',
+                  grayspace_fraction=1, jpeg_passthrough=True)
+        for tile in wsi.build_generator(**kw)():
+            image = np.array(Image.open(io.BytesIO(tile['image'])))
+            self.assertTrue(np.array_equal(image, wsi[tile['grid']]))
+
+    def test_with_tile_size(self):
+        wsi = sf.WSI(self.wsi_path, roi_method='ignore', **self.kw)
+        wsi.qc('otsu')
+        resized = wsi.with_tile_size(self.tile_px * 2, 2416)
+        fresh = sf.WSI(self.wsi_path, roi_method='ignore',
+                       tile_px=self.tile_px * 2, tile_um=2416)
+        fresh.qc('otsu')
+        self.assertEqual(resized.shape, fresh.shape)
+        self.assertTrue(np.array_equal(resized.grid, fresh.grid))
+        self.assertIs(resized.qc_mask, wsi.qc_mask)
+        self.assertIs(resized.slide, wsi.slide)
+
+    def test_multiscale_shared_reads(self):
+        sizes = [(self.tile_px, 256), (self.tile_px, 512)]
+        wsi = sf.WSI(self.wsi_path, roi_method='ignore', tile_px=self.tile_px,
+                     tile_um=256)
+        wsis = [wsi, wsi.with_tile_size(*sizes[1])]
+        if wsi._shared_read_level(wsis, {}) is None:
+            self.skipTest("Tile grids are not aligned for this slide")
+        kw = dict(shuffle=False, num_threads=1, grayspace_fraction=1,
+                  img_format='png', report=False)
+        with tempfile.TemporaryDirectory() as tmp:
+            dirs = [os.path.join(tmp, 'shared', str(i)) for i in range(2)]
+            wsi.extract_tiles_multiscale(sizes, tiles_dirs=dirs, **kw)
+            separate = os.path.join(tmp, 'separate')
+            wsi.extract_tiles(tiles_dir=separate, **kw)
+
+            def images(d):
+                d = os.path.join(d, wsi.name)
+                return sorted(open(os.path.join(d, f), 'rb').read()
+                              for f in os.listdir(d))
+
+            # Tiles of the finest size are cropped without resampling.
+            self.assertEqual(images(dirs[0]), images(separate))
+            self.assertEqual(len(images(dirs[1])), wsis[1].estimated_num_tiles)
+
+    def test_resume_extraction(self):
+        from slideflow.slide.checkpoint import ExtractionCheckpoint
+        kw = dict(shuffle=False, num_threads=1, grayspace_fraction=1)
+        tiles = [t['grid'] for t in self.wsi.build_generator(
+            dry_run=True, **kw)()]
+        with tempfile.TemporaryDirectory() as tmp:
+            # Checkpoint of an extraction interrupted after two tiles.
+            tiles_dir = os.path.join(tmp, self.wsi.name)
+            os.makedirs(tiles_dir)
+            checkpoint = ExtractionCheckpoint(
+                tiles_dir, self.wsi.name, tfrecord=False,
+                tile_px=self.wsi.tile_px, tile_um=self.wsi.tile_um,
+                stride_div=self.wsi.stride_div)
+            checkpoint.update(tiles[:2], [(0, 0), (0, 0)], [], [])
+            checkpoint.save()
+            self.wsi.extract_tiles(tiles_dir=tmp, resume=True, report=False,
+                                   **kw)
+            self.assertEqual(sorted(os.listdir(tiles_dir)), sorted(
+                f'{self.wsi.shortname}_{i}.jpg' for i in range(2, len(tiles))))
+
+    def test_slide_buffer(self):
+        from slideflow.slide import SlideBuffer
+        with tempfile.TemporaryDirectory() as tmp:
+            buffer = SlideBuffer(tmp)
+            for slide, local in buffer.prefetch([self.wsi_path]):
+                self.assertEqual(slide, self.wsi_path)
+                wsi = sf.WSI(local, roi_method='ignore', **self.kw)
+                self.assertEqual(wsi.shape, self.wsi.shape)
+            # Cached slides are reused by later buffers.
+            buffer = SlideBuffer(tmp, max_size=os.path.getsize(self.wsi_path))
+            buffer.release(buffer.fetch(self.wsi_path))
+            self.assertEqual((buffer.hits, buffer.bytes_copied), (1, 0))
+
+    def test_shared_tile_buffer(self):
+        from slideflow.slide.shm import SharedTileBuffer, shared_tile_worker
+        tiles = [{'image': np.full((self.tile_px, self.tile_px, 3), i, dtype=np.uint8)}
+                 for i in range(3)]
+        with SharedTileBuffer(2, self.tile_px * self.tile_px * 3) as buffer:
+            for slot, i in buffer.tasks(range(3)):
+                _, result = shared_tile_worker(
+                    (slot, i), fn=lambda c: dict(tiles[c]),
+                    shm_name=buffer.name, slot_bytes=buffer.slot_bytes)
+                self.assertIsNone(result['image'])
+                image = buffer.view(slot, result['shm'])
+                self.assertTrue(np.array_equal(image, tiles[i]['image']))
+                buffer.release(slot)
+        self.assertTrue(np.array_equal(image, tiles[2]['image']))
+
 # -----------------------------------------------------------------------------
 
 if __name__ == '__main__':
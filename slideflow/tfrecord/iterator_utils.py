@@ -26,39 +26,67 @@ def cycle(iterator):
 
 
 class RandomSampler:
-    def __init__(self, loaders, ratios, infinite=True, shard=None):
+    """Interleave iterators, choosing a source at random for each item.
+
+    Sources are chosen in proportion to ``ratios``. When a finite source
+    is exhausted it is removed, and the remaining sources are chosen in
+    proportion to their ratios. If ``shard`` is ``(index, count)``, only
+    every ``count``-th choice (starting at ``index``) is used, so that
+    identically seeded samplers take disjoint positions of one stream.
+
+    Choices are drawn in blocks. Exhausted sources are marked dead rather
+    than deleted, and choices of dead sources are discarded, which leaves
+    the remaining sources in the same proportions; blocks are redrawn over
+    the live sources once most of the probability mass is dead. Choosing
+    a source is therefore O(1) amortized, regardless of the number of
+    sources.
+    """
+
+    def __init__(self, loaders, ratios, infinite=True, shard=None,
+                 block_size=4096):
 
         self.ratios = ratios
         self.loaders = loaders
         self.infinite = infinite
         self.shard = shard
+        self.block_size = block_size
 
     def __iter__(self):
         if self.infinite:
             iterators = [cycle(loader) for loader in self.loaders]
         else:
             iterators = [iter(loader) for loader in self.loaders]
-        self.ratios = np.array(self.ratios)
-        self.ratios = self.ratios / self.ratios.sum()
-        ratio_indices = np.array(range(len(self.ratios)))
-        global_idx = -1
-        while iterators:
-            global_idx += 1
-            choice = np.random.choice(
-                ratio_indices[:self.ratios.shape[0]],
-                p=self.ratios
-            )
-            if (self.shard is not None
-               and (global_idx % self.shard[1] != self.shard[0])):
+        ratios = np.asarray(self.ratios, dtype=np.float64)
+        ratios = ratios / ratios.sum()
+        alive = ratios > 0
+        alive_mass = ratios[alive].sum()
+        if self.shard is not None:
+            shard_idx, shard_count = self.shard
+        else:
+            shard_idx, shard_count = 0, 1
+        # Draw size is a multiple of the shard count, so shard positions
+        # stay aligned across blocks.
+        draw_size = max(self.block_size // shard_count, 1) * shard_count
+        sources, drawn_mass, block = None, 0., []
+        while True:
+            if not block:
+                if alive_mass <= 1e-12 or not alive.any():
+                    return
+                if sources is None or alive_mass < 0.5 * drawn_mass:
+                    sources = np.flatnonzero(alive)
+                    probs = ratios[sources] / ratios[sources].sum()
+                    drawn_mass = alive_mass
+                choices = np.random.choice(len(sources), size=draw_size, p=probs)
+                block = sources[choices[shard_idx::shard_count]].tolist()
+                block.reverse()
+            choice = block.pop()
+            if not alive[choice]:
                 continue
             try:
                 yield next(iterators[choice])
             except (StopIteration, EmptyIterator):
-                if iterators:
-                    del iterators[choice]
-                    del self.loaders[choice]
-                    self.ratios = np.delete(self.ratios, choice)
-                    self.ratios = self.ratios / self.ratios.sum()
+                alive[choice] = False
+                alive_mass -= ratios[choice]
 
     def close(self):
         for loader in self.loaders:
@@ -4,6 +4,7 @@ from __future__ import absolute_import
 
 import gzip
 import io
+import mmap
 import os
 import struct
 from typing import Dict, Iterable, List, Optional, Tuple, Union
@@ -11,7 +12,8 @@ from typing import Dict, Iterable, List, Optional, Tuple, Union
 import numpy as np
 
 from slideflow.tfrecord import iterator_utils
-from slideflow.util import example_pb2, extract_feature_dict, log
+from slideflow.util import (chunked_tfrecord, example_pb2,
+                            extract_feature_dict, log)
 
 
 class TFRecordIterator:
@@ -30,6 +32,7 @@ class TFRecordIterator:
         compression_type: Optional[str] = None,
         random_start: bool = False,
         datum_bytes: Optional[bytearray] = None,
+        use_mmap: bool = False,
     ) -> None:
         """Create an iterator over the tfrecord dataset.
 
@@ -53,6 +56,14 @@ class TFRecordIterator:
         random_start: randomize starting location of reading.
             Requires an index file. Only works if shard is None.
 
+        use_mmap: bool, optional, default=False
+            Memory-map the file and yield views into the mapping, rather
+            than reading each record into a buffer. Records are located
+            with the index, if provided, without any read syscalls.
+            Yielded views are only valid until the iterator is closed.
+            Not supported with compression. Ignored for chunk-compressed
+            TFRecords.
+
         Yields:
         -------
         datum_bytes_view: memoryview
@@ -61,11 +72,18 @@ class TFRecordIterator:
         """
 
         if compression_type == "gzip":
+            if use_mmap:
+                raise ValueError("use_mmap is not supported with compression")
             self.file = gzip.open(data_path, 'rb')
         elif compression_type is None:
             self.file = io.open(data_path, 'rb')  # type: ignore
         else:
             raise ValueError("compression_type should be 'gzip' or None")
+        self.use_mmap = use_mmap
+        self.mmap = None  # type: Optional[mmap.mmap]
+        self.chunked = (compression_type is None
+                        and bool(os.path.getsize(data_path))
+                        and chunked_tfrecord.is_chunked(data_path))
 
         self.data_path = data_path
         self.shard = shard
@@ -84,9 +102,83 @@ class TFRecordIterator:
                 self.index = np.expand_dims(self.index, axis=0)
             self.index = self.index[:, 0]  # type: ignore
 
+    def _mmap_records(self, start_offset=None, end_offset=None):
+        """Yield views of records in a byte range of the mapped file."""
+        if self.mmap is None:
+            if not os.path.getsize(self.data_path):
+                return
+            self.mmap = mmap.mmap(
+                self.file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        view = memoryview(self.mmap)
+        start = 0 if start_offset is None else int(start_offset)
+        end = len(view) if end_offset is None else int(end_offset)
+        if self.index is not None:
+            offsets = self.index[(self.index >= start) & (self.index < end)]
+        else:
+            offsets = None
+        try:
+            if offsets is not None:
+                for offset in offsets.tolist():
+                    length, = struct.unpack_from("<Q", view, offset)
+                    yield self.process(view[offset + 12:offset + 12 + length])
+            else:
+                offset = start
+                while offset < end:
+                    length, = struct.unpack_from("<Q", view, offset)
+                    if offset + 16 + length > len(view):
+                        raise RuntimeError("Failed to read the record.")
+                    yield self.process(view[offset + 12:offset + 12 + length])
+                    offset += 16 + length
+        finally:
+            view.release()
+
+    def _chunked_records(self):
+        """Yield records from a chunk-compressed TFRecord.
+
+        Records are located with the chunk headers, so sharding, clipping
+        and random starts do not require an index.
+        """
+        chunks = chunked_tfrecord.chunk_table(self.data_path)
+        starts = np.concatenate([[0], np.cumsum(chunks[:, 2])])
+        n_records = int(starts[-1])
+        end = min(self.clip, n_records) if self.clip else n_records
+        if self.shard is None and self.random_start and end:
+            first = np.random.randint(end)
+            ranges = [(first, end), (0, first)]
+        elif self.shard is None:
+            ranges = [(0, end)]
+        else:
+            shard_idx, shard_count = self.shard
+            if shard_count >= end:
+                # There are fewer records than shards, so
+                # only the first shard will read
+                ranges = [(0, end)] if shard_idx == 0 else []
+            else:
+                split = np.array_split(np.arange(end), shard_count)[shard_idx]
+                ranges = [(int(split[0]), int(split[-1]) + 1)]
+        for start, stop in ranges:
+            for c in np.flatnonzero((starts[:-1] < stop) & (starts[1:] > start)):
+                offset, length, _ = (int(v) for v in chunks[c])
+                self.file.seek(offset)
+                records = chunked_tfrecord.split_records(
+                    chunked_tfrecord.decompress_chunk(self.file.read(length))
+                )
+                lo = max(start - int(starts[c]), 0)
+                hi = min(stop - int(starts[c]), len(records))
+                for record in records[lo:hi]:
+                    yield self.process(record)
+
     def __iter__(self) -> Iterable[memoryview]:
         """Create the iterator."""
+        if self.chunked:
+            yield from self._chunked_records()
+            return
+
         def read_records(start_offset=None, end_offset=None):
+            if self.use_mmap:
+                yield from self._mmap_records(start_offset, end_offset)
+                return
             if start_offset is not None:
                 self.file.seek(start_offset)
             if end_offset is None:
@@ -152,6 +244,14 @@ class TFRecordIterator:
         return record
 
     def close(self):
+        if self.mmap is not None:
+            try:
+                self.mmap.close()
+            except BufferError:
+                # Views of records are still referenced; the mapping is
+                # released when they are garbage collected.
+                pass
+            self.mmap = None
         self.file.close()
 
 
@@ -166,6 +266,7 @@ class ExampleIterator(TFRecordIterator):
         random_start: bool = False,
         datum_bytes: Optional[bytearray] = None,
         description: Union[List[str], Dict[str, str], None] = None,
+        use_mmap: bool = False,
     ):
         """
         description: list or dict of str, optional, default=None
@@ -183,7 +284,8 @@ class ExampleIterator(TFRecordIterator):
             clip,
             compression_type,
             random_start,
-            datum_bytes
+            datum_bytes,
+            use_mmap
         )
         self.description = description
 
@@ -209,6 +311,7 @@ class SequenceIterator(TFRecordIterator):
         datum_bytes: Optional[bytearray] = None,
         context_description: Union[List[str], Dict[str, str], None] = None,
         features_description: Union[List[str], Dict[str, str], None] = None,
+        use_mmap: bool = False,
     ):
         """
         description: list or dict of str, optional, default=None
@@ -226,7 +329,8 @@ class SequenceIterator(TFRecordIterator):
             clip,
             compression_type,
             random_start,
-            datum_bytes
+            datum_bytes,
+            use_mmap
         )
         self.context_description = context_description
         self.features_description = features_description
@@ -247,6 +351,205 @@ class SequenceIterator(TFRecordIterator):
         yield context, features
 
 
+def _permute(x: np.ndarray, n: int, seed: List[int]) -> np.ndarray:
+    """Map positions through a seeded pseudorandom permutation of range(n).
+
+    Uses a balanced Feistel network over the smallest even power of two
+    that is at least ``n``, with cycle walking, so that the permutation can
+    be evaluated at any subset of positions without being materialized.
+
+    Params:
+    -------
+    x: np.ndarray
+        Positions to permute, in [0, n).
+
+    n: int
+        Size of the permutation.
+
+    seed: list of int
+        Seed of the permutation.
+    """
+    x = np.asarray(x, dtype=np.uint64)
+    if n <= 1:
+        return x.astype(np.int64)
+    half = np.uint64((int(n - 1).bit_length() + 1) // 2)
+    mask = np.uint64((1 << int(half)) - 1)
+    keys = np.random.default_rng(seed).integers(
+        0, 2**63, size=4, dtype=np.uint64
+    )
+
+    def encrypt(v):
+        left, right = v >> half, v & mask
+        for key in keys:
+            f = (right ^ key) * np.uint64(0x9E3779B97F4A7C15)
+            f ^= f >> np.uint64(32)
+            left, right = right, (left ^ f) & mask
+        return (left << half) | right
+
+    out = encrypt(x)
+    outside = np.flatnonzero(out >= n)
+    while len(outside):
+        out[outside] = encrypt(out[outside])
+        outside = outside[out[outside] >= n]
+    return out.astype(np.int64)
+
+
+class GlobalShuffleSampler:
+    """Read records from multiple TFRecords in a globally shuffled order.
+
+    Each epoch draws a plan of ``(tfrecord, record)`` pairs from the
+    record indices: a permutation of every record or, if ``splits`` are
+    given, a weighted sample in which each TFRecord is chosen in proportion
+    to its weight and its records are drawn without replacement (cycling
+    once exhausted). Permutations are derived from ``seed`` and the epoch
+    number, and each shard computes only its own interleaved,
+    non-overlapping slice of them, without materializing the full plan.
+    Records are read in blocks, sorted by file offset and coalesced, so a
+    shuffle buffer is not needed.
+
+    Params:
+    -------
+    paths: list of str
+        Paths to TFRecords.
+
+    indices: list of np.ndarray
+        Index of each TFRecord, with (offset, length) rows.
+
+    splits: list of float, optional, default=None
+        Weight of each TFRecord. If None, every record is read once
+        per epoch.
+
+    description: list or dict of str, optional, default=None
+        Features to extract from each record (see `ExampleIterator`).
+
+    shard: tuple of ints, optional, default=None
+        A tuple (index, count) of the shard to read.
+
+    clip: list of int, optional, default=None
+        Maximum number of records to read from each TFRecord.
+
+    infinite: bool, optional, default=True
+        Repeat with a new plan for each epoch.
+
+    seed: int, optional, default=None
+        Seed from which plans are drawn. Must be the same for all shards.
+        If None, a random seed is used.
+
+    block_size: int, optional, default=256
+        Number of records read at a time.
+
+    compression_type: str, optional, default=None
+        The type of compression used for the tfrecord. Choose either
+        'gzip' or None.
+    """
+
+    def __init__(
+        self,
+        paths: List[str],
+        indices: List[np.ndarray],
+        splits: Optional[List[float]] = None,
+        description: Union[List[str], Dict[str, str], None] = None,
+        shard: Optional[Tuple[int, int]] = None,
+        clip: Optional[List[int]] = None,
+        infinite: bool = True,
+        seed: Optional[int] = None,
+        block_size: int = 256,
+        compression_type: Optional[str] = None,
+    ) -> None:
+        from slideflow.util.tfrecord2idx import TFRecordRandomAccessReader
+
+        self.paths = [p if isinstance(p, str) else p.decode('utf-8')
+                      for p in paths]
+        self.indices = [np.asarray(i, dtype=np.int64).reshape(-1, 2)
+                        for i in indices]
+        sizes = np.array([len(i) for i in self.indices], dtype=np.int64)
+        if clip:
+            sizes = np.minimum(sizes, [c if c else s for c, s in zip(clip, sizes)])
+        self.sizes = sizes
+        self.starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        self.splits = None if splits is None else np.asarray(splits, dtype=float)
+        self.description = description
+        self.shard = shard
+        self.infinite = infinite
+        self.seed = seed if seed is not None else np.random.randint(2**31)
+        self.block_size = block_size
+        self.reader = TFRecordRandomAccessReader(
+            compression_type=compression_type
+        )
+
+    def epoch_plan(self, epoch: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the TFRecord and record index of each sample in an epoch,
+        for this shard."""
+        shard_idx, shard_count = self.shard if self.shard else (0, 1)
+        total = int(self.sizes.sum())
+        positions = np.arange(shard_idx, total, shard_count, dtype=np.int64)
+        if self.splits is None:
+            order = _permute(positions, total, [self.seed, epoch])
+            file_ids = np.searchsorted(self.starts, order, side='right') - 1
+            return file_ids, order - self.starts[file_ids]
+
+        weights = np.where(self.sizes > 0, self.splits, 0)
+        if not total or not weights.sum():
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        rng = np.random.default_rng([self.seed, epoch, shard_idx])
+        file_ids = rng.choice(len(self.sizes), size=len(positions),
+                              p=weights / weights.sum())
+        record_ids = np.empty(len(positions), dtype=np.int64)
+        for f in np.unique(file_ids):
+            # The k-th draw from a file in this shard takes position
+            # (k * shard_count + shard_idx) of the file's permutations,
+            # with a new permutation each time the file is exhausted.
+            draws = np.flatnonzero(file_ids == f)
+            size = int(self.sizes[f])
+            cycle, pos = np.divmod(
+                np.arange(len(draws)) * shard_count + shard_idx, size
+            )
+            for c in np.unique(cycle):
+                in_cycle = cycle == c
+                record_ids[draws[in_cycle]] = _permute(
+                    pos[in_cycle], size, [self.seed, epoch, int(f), int(c)]
+                )
+        return file_ids, record_ids
+
+    def process(self, record):
+        example = example_pb2.Example()
+        example.ParseFromString(record)
+        return extract_feature_dict(
+            example.features,
+            self.description,
+            TFRecordIterator.typename_mapping
+        )
+
+    def _read_block(self, file_ids, record_ids):
+        records = [None] * len(file_ids)  # type: List
+        for f in np.unique(file_ids):
+            positions = np.flatnonzero(file_ids == f)
+            block = self.reader.read_records(
+                self.paths[f], record_ids[positions], index=self.indices[f]
+            )
+            for pos, record in zip(positions, block):
+                records[pos] = record
+        return records
+
+    def __iter__(self):
+        epoch = 0
+        while True:
+            file_ids, record_ids = self.epoch_plan(epoch)
+            if not len(file_ids):
+                return
+            for start in range(0, len(file_ids), self.block_size):
+                end = start + self.block_size
+                for record in self._read_block(file_ids[start:end],
+                                               record_ids[start:end]):
+                    yield self.process(record)
+            if not self.infinite:
+                return
+            epoch += 1
+
+    def close(self):
+        self.reader.close()
+
+
 def tfrecord_loader(
     data_path: str,
     index: None,
@@ -256,6 +559,7 @@ def tfrecord_loader(
     sequence_description: Union[List[str], Dict[str, str], None] = None,
     compression_type: Optional[str] = None,
     datum_bytes: Optional[bytearray] = None,
+    use_mmap: bool = False,
 ) -> Iterable[Union[
         Dict[str, np.ndarray],
         Tuple[Dict[str, np.ndarray], Dict[str, List[np.ndarray]]]]]:
@@ -298,6 +602,9 @@ def tfrecord_loader(
         The type of compression used for the tfrecord. Choose either
         'gzip' or None.
 
+    use_mmap: bool, optional, default=False
+        Read records from a memory-mapped file, located with the index.
+
     Yields:
     -------
     features: dict of {str, value}
@@ -314,7 +621,8 @@ def tfrecord_loader(
             features_description=sequence_description,
             shard=shard,
             clip=clip,
-            compression_type=compression_type
+            compression_type=compression_type,
+            use_mmap=use_mmap
         )
     return ExampleIterator(  # type: ignore
         data_path=data_path,
@@ -323,7 +631,8 @@ def tfrecord_loader(
         shard=shard,
         clip=clip,
         compression_type=compression_type,
-        datum_bytes=datum_bytes
+        datum_bytes=datum_bytes,
+        use_mmap=use_mmap
     )
 
 
@@ -337,6 +646,9 @@ def multi_tfrecord_loader(
     shard: Optional[Tuple[int, int]] = None,
     clip: List[int] = None,
     infinite: bool = True,
+    use_mmap: bool = False,
+    global_shuffle: bool = False,
+    seed: Optional[int] = None,
 ) -> Iterable[Union[Dict[str, np.ndarray],
                     Tuple[Dict[str, np.ndarray],
                     Dict[str, List[np.ndarray]]]]]:
@@ -377,11 +689,39 @@ def multi_tfrecord_loader(
     infinite: bool, optional, default=True
         Whether the returned iterator should be infinite or not
 
+    use_mmap: bool, optional, default=False
+        Read records from memory-mapped files, located with the indices.
+
+    global_shuffle: bool, optional, default=False
+        Read records in a globally shuffled order drawn from the indices,
+        rather than streaming each TFRecord sequentially
+        (see `GlobalShuffleSampler`). Requires indices.
+
+    seed: int, optional, default=None
+        Seed for the global shuffle. Must be the same for all shards.
+
     Returns:
     --------
     it: iterator
         A repeating iterator that generates batches of data.
     """
+    if global_shuffle:
+        if indices is None:
+            raise ValueError("Indices are required for global shuffling.")
+        if sequence_description is not None:
+            raise ValueError("Global shuffling is not supported for "
+                             "SequenceExamples.")
+        return GlobalShuffleSampler(
+            paths,
+            indices,
+            splits=splits,
+            description=description,
+            shard=shard,
+            clip=clip,
+            infinite=infinite,
+            seed=seed,
+            compression_type=compression_type
+        )
 
     if indices is None and (shard is not None or clip is not None):
         log.debug("Index files not found for tfrecord; unable to perform "
@@ -397,7 +737,8 @@ def multi_tfrecord_loader(
             clip=(None if not clip else clip[i]),
             sequence_description=sequence_description,
             compression_type=compression_type,
-            datum_bytes=datum_bytes)
+            datum_bytes=datum_bytes,
+            use_mmap=use_mmap)
         for i, tfr_path in enumerate(paths)
     ]
     if splits is not None:
@@ -6,6 +6,7 @@ import numpy as np
 import torch.utils.data
 
 from slideflow.tfrecord import iterator_utils, reader
+from slideflow.util import catalog
 
 
 class TFRecordDataset(torch.utils.data.IterableDataset):
@@ -50,6 +51,9 @@ class TFRecordDataset(torch.utils.data.IterableDataset):
         The type of compression used for the tfrecord. Choose either
         'gzip' or None.
 
+    use_mmap: bool, optional, default=False
+        Read records from a memory-mapped file, located with the index.
+
     """
 
     def __init__(
@@ -63,6 +67,7 @@ class TFRecordDataset(torch.utils.data.IterableDataset):
         compression_type: Optional[str] = None,
         autoshard: bool = False,
         clip: Optional[int] = None,
+        use_mmap: bool = False,
     ) -> None:
         super(TFRecordDataset, self).__init__()
         self.data_path = data_path
@@ -74,6 +79,7 @@ class TFRecordDataset(torch.utils.data.IterableDataset):
         self.compression_type = compression_type
         self.autoshard = autoshard
         self.clip = clip
+        self.use_mmap = use_mmap
 
     def __iter__(self):
         worker_info = torch.utils.data.get_worker_info()
@@ -89,7 +95,8 @@ class TFRecordDataset(torch.utils.data.IterableDataset):
             shard=shard,
             clip=self.clip,
             sequence_description=self.sequence_description,
-            compression_type=self.compression_type)
+            compression_type=self.compression_type,
+            use_mmap=self.use_mmap)
         )
         if self.shuffle_queue_size:
             it = iterator_utils.shuffle_iterator(it, self.shuffle_queue_size)
@@ -104,11 +111,14 @@ class MultiTFRecordDataset(torch.utils.data.IterableDataset):
 
     Params:
     -------
-    data_pattern: str
-        Input data path pattern.
+    paths: list of str
+        Paths to TFRecords.
 
-    index_pattern: str or None
-        Input index path pattern.
+    indices: list of np.ndarray or None
+        Index of each TFRecord. If None, indices are read from the TFRecord
+        catalog of each TFRecord's directory, or from per-TFRecord index
+        files for TFRecords not in a catalog. TFRecords with neither are
+        read sequentially, without sharding or clipping.
 
     splits: dict
         Dictionary of (key, value) pairs, where the key is used to
@@ -150,12 +160,23 @@ class MultiTFRecordDataset(torch.utils.data.IterableDataset):
 
     infinite: bool, optional, default=True
         Whether the Dataset should be infinite or not
+
+    use_mmap: bool, optional, default=False
+        Read records from memory-mapped files, located with the indices.
+
+    global_shuffle: bool, optional, default=False
+        Read records in a globally shuffled order drawn from the indices,
+        rather than streaming each TFRecord sequentially. A shuffle queue
+        is not needed.
+
+    seed: int, optional, default=None
+        Seed for the global shuffle. Must be the same for all shards.
     """
 
     def __init__(
         self,
         paths: List[str],
-        indices: List[str],
+        indices: Optional[List[np.ndarray]],
         splits: Optional[Dict[str, float]],
         description: Union[List[str], Dict[str, str], None] = None,
         shuffle_queue_size: Optional[int] = None,
@@ -164,7 +185,10 @@ class MultiTFRecordDataset(torch.utils.data.IterableDataset):
         clip: Optional[List[int]] = None,
         sequence_description: Union[List[str], Dict[str, str], None] = None,
         compression_type: Optional[str] = None,
-        infinite: bool = True
+        infinite: bool = True,
+        use_mmap: bool = False,
+        global_shuffle: bool = False,
+        seed: Optional[int] = None
     ) -> None:
         super(MultiTFRecordDataset, self).__init__()
         self.paths = paths
@@ -178,9 +202,19 @@ class MultiTFRecordDataset(torch.utils.data.IterableDataset):
         self.infinite = infinite
         self.shard = shard
         self.clip = clip
+        self.use_mmap = use_mmap
+        self.global_shuffle = global_shuffle
+        self.seed = seed
         self.loader = None
 
     def __iter__(self):
+        if self.indices is None:
+            # TFRecords without an index are read sequentially, unless
+            # indices are required for global shuffling or mmap reads.
+            self.indices = catalog.load_indices(
+                self.paths,
+                missing_ok=not (self.global_shuffle or self.use_mmap)
+            )
         self.loader = reader.multi_tfrecord_loader(
             paths=self.paths,
             indices=self.indices,
@@ -190,7 +224,10 @@ class MultiTFRecordDataset(torch.utils.data.IterableDataset):
             compression_type=self.compression_type,
             shard=self.shard,
             clip=self.clip,
-            infinite=self.infinite
+            infinite=self.infinite,
+            use_mmap=self.use_mmap,
+            global_shuffle=self.global_shuffle,
+            seed=self.seed
         )
         it = iter(self.loader)
         if self.shuffle_queue_size:
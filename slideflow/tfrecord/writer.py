@@ -3,8 +3,10 @@
 from __future__ import absolute_import
 
 import io
+import queue
 import struct
-from typing import Any, Dict, List, Tuple, Union
+import threading
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 
@@ -13,24 +15,108 @@ try:
 except ImportError:
     crc32c = None
 
-from slideflow.util import example_pb2
+from slideflow.util import chunked_tfrecord, example_pb2
+
+
+def _first_value(value: Any) -> int:
+    if isinstance(value, (list, tuple, np.ndarray)):
+        value = value[0]
+    return int(value)
+
+
+DEFAULT_BUFFER_SIZE = 8 * 1024 * 1024
 
 
 class TFRecordWriter:
     """Opens a TFRecord file for writing.
 
+    Records are serialized as they are written, and collected into large
+    buffers. Each buffer is framed, checksummed and written to the file in
+    a single call, on a background thread unless ``threaded=False``.
+
+    If ``index_path`` is given, the offset, length and ``loc_x``/``loc_y``
+    of each record are tracked while writing, and an index is saved when
+    the writer is closed, so that the TFRecord does not need to be read
+    again to index it.
+
     Params:
     -------
     data_path: str
         Path to the tfrecord file.
+
+    index_path: str, optional, default=None
+        Path at which to save the index (e.g. ``{name}.index``). If None,
+        an index is not written.
+
+    buffer_size: int, optional, default=8 MB
+        Size of the write buffer, in bytes.
+
+    threaded: bool, optional, default=True
+        Write buffers on a background thread.
+
+    compression: str, optional, default=None
+        Write a chunk-compressed TFRecord, compressing every
+        ``chunk_records`` records with 'zlib' or 'zstd'
+        (see :mod:`slideflow.util.chunked_tfrecord`). Chunk-compressed
+        TFRecords can be read with the PyTorch backend, but not with
+        TensorFlow.
+
+    chunk_records: int, optional, default=256
+        Number of records in each compressed chunk.
     """
 
-    def __init__(self, data_path: str) -> None:
+    def __init__(
+        self,
+        data_path: str,
+        index_path: Optional[str] = None,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        threaded: bool = True,
+        compression: Optional[str] = None,
+        chunk_records: int = chunked_tfrecord.DEFAULT_CHUNK_RECORDS,
+    ) -> None:
+        if compression is not None and compression not in chunked_tfrecord.CODECS:
+            raise ValueError(f"Unrecognized compression '{compression}'; "
+                             f"expected one of {list(chunked_tfrecord.CODECS)}")
         self.file = io.open(data_path, "wb")
+        self.index_path = index_path
+        self.buffer_size = buffer_size
+        self.threaded = threaded
+        self.compression = compression
+        self.chunk_records = chunk_records
+        self._chunks = []  # type: List[Tuple[int, int, int]]
+        self._file_offset = 0
+        self._pending = []  # type: List[bytes]
+        self._pending_bytes = 0
+        self._offset = 0
+        self._index = []  # type: List[Tuple[int, int]]
+        self._locations = []  # type: List[Tuple]
+        self._queue = None  # type: Optional[queue.Queue]
+        self._thread = None  # type: Optional[threading.Thread]
+        self._error = None  # type: Optional[BaseException]
 
     def close(self) -> None:
-        """Close the tfrecord file."""
-        self.file.close()
+        """Close the tfrecord file, writing the index if requested."""
+        if self.file.closed:
+            return
+        try:
+            self._submit()
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join()
+                self._thread = None
+            self._raise_error()
+        finally:
+            self.file.close()
+        if self.index_path is not None:
+            self._save_index()
+
+    def flush(self) -> None:
+        """Flush written records to the tfrecord file."""
+        self._submit()
+        if self._queue is not None:
+            self._queue.join()
+        self._raise_error()
+        self.file.flush()
 
     def write(
         self,
@@ -54,18 +140,103 @@ class TFRecordWriter:
             Dictionary of tuples of the form (value, dtype). dtype can be
             "byte", "float" or "int". value should be the sequential features.
         """
+        self._raise_error()
         if sequence_datum is None:
             record = TFRecordWriter.serialize_tf_example(datum)
         else:
             record = TFRecordWriter.serialize_tf_sequence_example(
                 datum, sequence_datum
             )
-        length = len(record)
-        length_bytes = struct.pack("<Q", length)
-        self.file.write(length_bytes)
-        self.file.write(TFRecordWriter.masked_crc(length_bytes))
-        self.file.write(record)
-        self.file.write(TFRecordWriter.masked_crc(record))
+        length = len(record) + 16
+        if self.index_path is not None:
+            if self.compression is None:
+                self._index.append((self._offset, length))
+            self._locations.append(tuple(
+                _first_value(datum[k][0]) for k in ('loc_x', 'loc_y')
+                if k in datum
+            ))
+        self._offset += length
+        self._pending.append(record)
+        self._pending_bytes += length
+        if (self._pending_bytes >= self.buffer_size
+           or (self.compression and len(self._pending) >= self.chunk_records)):
+            self._submit()
+
+    def _submit(self) -> None:
+        """Hand pending records to the writer thread (or write them)."""
+        if not self._pending:
+            return
+        records = self._pending
+        self._pending = []
+        self._pending_bytes = 0
+        if not self.threaded:
+            self._write_records(records)
+            return
+        if self._thread is None:
+            self._queue = queue.Queue(maxsize=2)
+            self._thread = threading.Thread(target=self._writer_thread,
+                                            daemon=True)
+            self._thread.start()
+        self._queue.put(records)
+
+    def _writer_thread(self) -> None:
+        while True:
+            records = self._queue.get()
+            try:
+                if records is None:
+                    return
+                if self._error is None:
+                    self._write_records(records)
+            except BaseException as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _write_records(self, records: List[bytes]) -> None:
+        """Frame a batch of records and write them with a single call."""
+        lengths = np.array([len(r) for r in records], dtype='<u8').tobytes()
+        length_headers = [lengths[i*8:(i+1)*8] for i in range(len(records))]
+        length_crcs = TFRecordWriter.masked_crcs(length_headers)
+        record_crcs = TFRecordWriter.masked_crcs(records)
+        parts = []
+        for i, record in enumerate(records):
+            parts += [
+                length_headers[i],
+                length_crcs[i*4:(i+1)*4],
+                record,
+                record_crcs[i*4:(i+1)*4]
+            ]
+        data = b''.join(parts)
+        if self.compression is not None:
+            data = chunked_tfrecord.compress_chunk(
+                data, len(records), self.compression
+            )
+            self._chunks.append((self._file_offset, len(data), len(records)))
+            self._file_offset += len(data)
+        self.file.write(data)
+
+    def _save_index(self) -> None:
+        from slideflow.util.tfrecord2idx import save_index
+
+        n_cols = {len(loc) for loc in self._locations}
+        if len(n_cols) == 1 and n_cols != {0}:
+            locations = np.array(self._locations, dtype=np.int64)
+        else:
+            locations = np.array([])
+        if self.compression is None:
+            index = np.array(self._index, dtype=np.int64).reshape(-1, 2)
+        else:
+            index = chunked_tfrecord.index_from_chunks(self._chunks)
+        save_index(
+            index,
+            self.index_path,
+            locations=locations
+        )
 
     @staticmethod
     def masked_crc(data: bytes) -> bytes:
@@ -77,6 +248,13 @@ class TFRecordWriter:
         masked_bytes = struct.pack("<I", masked)
         return masked_bytes
 
+    @staticmethod
+    def masked_crcs(data: List[bytes]) -> bytes:
+        """Masked CRC checksums of several byte strings, concatenated."""
+        crc = np.array([crc32c.crc32(d) for d in data], dtype=np.uint64)
+        masked = (((crc >> 15) | (crc << 17)) + 0xa282ead8) & 0xFFFFFFFF
+        return masked.astype('<u4').tobytes()
+
     @staticmethod
     def serialize_tf_example(datum: Dict[str, Tuple[Any, str]]) -> bytes:
         """Serialize example into tfrecord.Example proto.
@@ -0,0 +1,456 @@
+"""Consolidated catalog of TFRecord indices for a directory.
+
+Each TFRecord directory may hold a single catalog file,
+``catalog.sfcat``, with the record offsets, lengths and tile locations
+of every TFRecord in the directory (and subdirectories), along with the
+size and modification time of each TFRecord when it was indexed.
+Reading one catalog replaces opening an ``.index.npz`` file per
+TFRecord, which is slow on network filesystems when datasets contain
+thousands of TFRecords.
+
+The catalog is a JSON header followed by two int64 arrays (record
+offsets/lengths and tile locations, concatenated across TFRecords),
+which are memory-mapped when the catalog is loaded. The catalog is
+updated incrementally: TFRecords whose size and modification time are
+unchanged are not read again.
+"""
+
+import json
+import mmap
+import multiprocessing as mp
+import os
+import struct
+from multiprocessing.dummy import Pool as DPool
+from os.path import exists, getmtime, join
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import slideflow as sf
+from slideflow import errors
+from slideflow.util import log, tfrecord2idx
+
+# -----------------------------------------------------------------------------
+
+CATALOG_NAME = 'catalog.sfcat'
+MAGIC = b'SFCAT001'
+ALIGN = 64
+
+# Per-process cache of loaded catalogs, keyed by path.
+_loaded = dict()  # type: Dict[str, Tuple[Tuple[int, int], "TFRecordCatalog"]]
+
+# -----------------------------------------------------------------------------
+
+
+def _aligned(n: int) -> int:
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _fingerprint(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _index_tfrecord(tfr: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the index and locations of a TFRecord.
+
+    Uses the TFRecord's index file if it is up to date, covers the whole
+    TFRecord, and has location information. Otherwise, the TFRecord is
+    scanned, and its index file rewritten.
+    """
+    index_path = tfrecord2idx.find_index(tfr)
+    if (index_path is not None
+       and index_path.endswith('npz')
+       and getmtime(index_path) >= getmtime(tfr)):
+        with np.load(index_path) as data:
+            index = data['arr_0'].reshape(-1, 2)
+            end = int(index[-1].sum()) if len(index) else 0
+            if 'locations' in data.files and end == os.path.getsize(tfr):
+                return data['arr_0'], data['locations']
+    index, locations = tfrecord2idx.scan_tfrecord(tfr)
+    if index_path is None or index_path.endswith('npz'):
+        tfrecord2idx.save_index(
+            index,
+            join(os.path.dirname(tfr), sf.util.path_to_name(tfr) + '.index'),
+            locations=locations
+        )
+    return index, locations
+
+
+def _index_worker(tfr: str):
+    try:
+        return (*_index_tfrecord(tfr), None)
+    except (errors.TFRecordsError, RuntimeError, OSError) as e:
+        return None, None, str(e)
+
+
+class TFRecordCatalog:
+
+    def __init__(self, directory: str) -> None:
+        """Catalog of the TFRecord indices in a directory.
+
+        Use :meth:`load` to read a saved catalog, and :meth:`refresh`
+        followed by :meth:`save` to create or update one.
+
+        Examples
+            Update a catalog and look up the index of a TFRecord.
+
+                .. code-block:: python
+
+                    from slideflow.util.catalog import TFRecordCatalog
+
+                    catalog = TFRecordCatalog.load('/path/to/tfrecords')
+                    catalog.refresh()
+                    catalog.save()
+                    index = catalog.index('/path/to/tfrecords/slide.tfrecords')
+
+        Args:
+            directory (str): Directory containing TFRecords.
+        """
+        self.directory = directory
+        self.path = join(directory, CATALOG_NAME)
+        # Relative path -> (size, mtime_ns, index, locations, location cols)
+        self._entries = dict()  # type: Dict[str, Tuple]
+        self._mmap = None  # type: Optional[mmap.mmap]
+        self._modified = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, tfrecord: str) -> bool:
+        return self._key(tfrecord) in self._entries
+
+    def __repr__(self):
+        return f"TFRecordCatalog({self.directory!r}, n_tfrecords={len(self)})"
+
+    @classmethod
+    def load(cls, directory: str) -> "TFRecordCatalog":
+        """Load the catalog for a directory.
+
+        Returns an empty catalog if the directory has no catalog, or if the
+        catalog cannot be read.
+
+        Args:
+            directory (str): Directory containing TFRecords.
+
+        Returns:
+            :class:`TFRecordCatalog`
+        """
+        catalog = cls(directory)
+        if exists(catalog.path):
+            try:
+                catalog._read()
+            except (OSError, ValueError, KeyError, struct.error) as e:
+                log.warning(f"Unable to read TFRecord catalog {catalog.path} "
+                            f"({e}); ignoring")
+                catalog._entries.clear()
+        return catalog
+
+    def _key(self, tfrecord: str) -> str:
+        return os.path.relpath(tfrecord, self.directory)
+
+    def _read(self) -> None:
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:8] != MAGIC:
+            raise ValueError("not a TFRecord catalog")
+        header_len, = struct.unpack_from('<Q', self._mmap, 8)
+        header = json.loads(self._mmap[16:16 + header_len].decode('utf-8'))
+        n_rows = header['n_rows']
+        offset = _aligned(16 + header_len)
+        index = np.frombuffer(
+            self._mmap, dtype=np.int64, count=n_rows * 2, offset=offset
+        ).reshape(n_rows, 2)
+        offset += _aligned(index.nbytes)
+        locations = np.frombuffer(
+            self._mmap, dtype=np.int64, count=n_rows * 2, offset=offset
+        ).reshape(n_rows, 2)
+        for rel, size, mtime_ns, start, n, loc_cols in header['tfrecords']:
+            self._entries[rel] = (
+                size,
+                mtime_ns,
+                index[start:start + n],
+                locations[start:start + n, :loc_cols],
+                loc_cols
+            )
+
+    def is_current(self, tfrecord: str) -> bool:
+        """Check if the catalog entry for a TFRecord is up to date.
+
+        Args:
+            tfrecord (str): Path to TFRecord.
+
+        Returns:
+            bool: True if the TFRecord is in the catalog, and its size and
+            modification time match the cataloged values.
+        """
+        entry = self._entries.get(self._key(tfrecord))
+        if entry is None:
+            return False
+        try:
+            return _fingerprint(tfrecord) == entry[:2]
+        except OSError:
+            return False
+
+    def index(self, tfrecord: str) -> np.ndarray:
+        """Return the (offset, length) of each record in a TFRecord.
+
+        Args:
+            tfrecord (str): Path to TFRecord.
+
+        Returns:
+            np.ndarray: Array of shape (num_records, 2).
+
+        Raises:
+            KeyError: If the TFRecord is not in the catalog.
+        """
+        return self._entries[self._key(tfrecord)][2]
+
+    def locations(self, tfrecord: str) -> Optional[np.ndarray]:
+        """Return the tile locations stored in a TFRecord.
+
+        Args:
+            tfrecord (str): Path to TFRecord.
+
+        Returns:
+            np.ndarray: Array of shape (num_records, 2), or None if the
+            TFRecord does not store tile locations.
+
+        Raises:
+            KeyError: If the TFRecord is not in the catalog.
+        """
+        *_, locations, loc_cols = self._entries[self._key(tfrecord)]
+        return None if not loc_cols else locations
+
+    def total(self, tfrecord: str) -> int:
+        """Return the number of records in a TFRecord.
+
+        Raises:
+            KeyError: If the TFRecord is not in the catalog.
+        """
+        return len(self.index(tfrecord))
+
+    def manifest(self) -> Dict[str, Dict[str, int]]:
+        """Return the number of records in each TFRecord.
+
+        Returns:
+            Dict mapping relative TFRecord paths to ``{'total': n}``.
+        """
+        return {rel: {'total': len(e[2])} for rel, e in self._entries.items()}
+
+    def remove(self, tfrecord: str) -> None:
+        """Remove a TFRecord from the catalog."""
+        if self._entries.pop(self._key(tfrecord), None) is not None:
+            self._modified = True
+
+    def refresh(self, force: bool = False) -> Dict[str, str]:
+        """Update the catalog with the TFRecords in the directory.
+
+        TFRecords which have been removed are dropped from the catalog.
+        New or modified TFRecords are added, using their index files if up
+        to date, or otherwise by scanning the TFRecords in a process pool
+        (in which case their index files are also rewritten).
+
+        Args:
+            force (bool): Re-index all TFRecords. Defaults to False.
+
+        Returns:
+            Dict[str, str]: Relative paths of TFRecords which could not be
+            read, mapped to the error message.
+        """
+        try:
+            rel_paths = sf.util.get_relative_tfrecord_paths(self.directory)
+        except FileNotFoundError:
+            rel_paths = []
+        for rel in set(self._entries) - set(rel_paths):
+            del self._entries[rel]
+            self._modified = True
+
+        to_index = []
+        fingerprints = dict()
+        for rel in rel_paths:
+            tfr = join(self.directory, rel)
+            try:
+                fingerprints[rel] = _fingerprint(tfr)
+            except OSError:
+                continue
+            entry = self._entries.get(rel)
+            if force or entry is None or entry[:2] != fingerprints[rel]:
+                to_index.append(rel)
+        if not to_index:
+            return {}
+
+        log.debug(f"Indexing {len(to_index)} TFRecords for catalog "
+                  f"{self.path}")
+        paths = [join(self.directory, rel) for rel in to_index]
+        n_proc = min(len(paths), sf.util.num_cpu(default=8))
+        if n_proc > 1 and mp.current_process().daemon:
+            # Daemonic processes (e.g. DataLoader workers) cannot have
+            # children, so index with threads instead.
+            pool = DPool(n_proc)
+            results = pool.imap(_index_worker, paths)
+        elif n_proc > 1:
+            pool = mp.Pool(n_proc, initializer=sf.util.set_ignore_sigint)
+            results = pool.imap(_index_worker, paths, chunksize=8)
+        else:
+            pool = None
+            results = map(_index_worker, paths)
+        failed = dict()
+        self._modified = True
+        try:
+            for rel, (index, locations, error) in zip(to_index, results):
+                self._entries.pop(rel, None)
+                if error is not None:
+                    failed[rel] = error
+                    continue
+                self._add(rel, fingerprints[rel], index, locations)
+        finally:
+            if pool is not None:
+                pool.close()
+        return failed
+
+    def _add(
+        self,
+        rel: str,
+        fingerprint: Tuple[int, int],
+        index: np.ndarray,
+        locations: np.ndarray
+    ) -> None:
+        index = np.asarray(index, dtype=np.int64).reshape(-1, 2)
+        locations = np.asarray(locations)
+        if (locations.ndim == 2 and len(locations) == len(index)
+           and locations.shape[1] in (1, 2)):
+            loc_cols = locations.shape[1]
+            padded = np.zeros((len(index), 2), dtype=np.int64)
+            padded[:, :loc_cols] = locations
+        else:
+            loc_cols = 0
+            padded = np.zeros((len(index), 2), dtype=np.int64)
+        self._entries[rel] = (*fingerprint, index, padded[:, :loc_cols], loc_cols)
+
+    def save(self) -> None:
+        """Atomically write the catalog to disk."""
+        rows = []
+        start = 0
+        for rel, (size, mtime_ns, index, _, loc_cols) in self._entries.items():
+            rows.append([rel, size, mtime_ns, start, len(index), loc_cols])
+            start += len(index)
+        index = np.zeros((start, 2), dtype=np.int64)
+        locations = np.zeros((start, 2), dtype=np.int64)
+        for (rel, *_, row_start, n, loc_cols) in rows:
+            entry = self._entries[rel]
+            index[row_start:row_start + n] = entry[2]
+            locations[row_start:row_start + n, :loc_cols] = entry[3]
+        header = json.dumps({'n_rows': start, 'tfrecords': rows}).encode('utf-8')
+
+        tmp_path = f'{self.path}.tmp-{os.getpid()}'
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<Q', len(header)))
+            f.write(header)
+            for array in (index, locations):
+                f.write(bytes(_aligned(f.tell()) - f.tell()))
+                f.write(array.tobytes())
+            f.write(bytes(_aligned(f.tell()) - f.tell()))
+        os.replace(tmp_path, self.path)
+        self._modified = False
+
+
+def load_catalog(directory: str) -> Optional[TFRecordCatalog]:
+    """Load the catalog for a directory, reusing previously loaded catalogs.
+
+    Args:
+        directory (str): Directory containing TFRecords.
+
+    Returns:
+        :class:`TFRecordCatalog`, or None if the directory has no catalog.
+    """
+    path = join(directory, CATALOG_NAME)
+    try:
+        fingerprint = _fingerprint(path)
+    except OSError:
+        return None
+    cached = _loaded.get(path)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+    catalog = TFRecordCatalog.load(directory)
+    _loaded[path] = (fingerprint, catalog)
+    return catalog
+
+
+def update_catalog(directory: str, force: bool = False) -> Tuple[TFRecordCatalog, Dict[str, str]]:
+    """Create or update the catalog for a directory.
+
+    Args:
+        directory (str): Directory containing TFRecords.
+        force (bool): Re-index all TFRecords. Defaults to False.
+
+    Returns:
+        A tuple containing
+
+            :class:`TFRecordCatalog`: The updated catalog.
+
+            Dict[str, str]: Relative paths of TFRecords which could not be
+            read, mapped to the error message.
+    """
+    catalog = TFRecordCatalog.load(directory)
+    failed = catalog.refresh(force=force)
+    if catalog._modified or not exists(catalog.path):
+        catalog.save()
+    return catalog, failed
+
+
+def load_indices(
+    tfrecords: List[str],
+    directories: Optional[List[str]] = None,
+    *,
+    missing_ok: bool = False
+) -> List[Optional[np.ndarray]]:
+    """Load the indices for a list of TFRecords.
+
+    Indices are read from the catalog of each TFRecord's directory, if
+    the catalog is up to date for that TFRecord, and otherwise from the
+    TFRecord's index file.
+
+    Args:
+        tfrecords (list(str)): Paths to TFRecords.
+        directories (list(str), optional): Directories in which to look for
+            catalogs. If not provided, the parent directory of each TFRecord
+            is used.
+
+    Keyword args:
+        missing_ok (bool): Return None for TFRecords which are neither in an
+            up-to-date catalog nor have an index file, rather than raising
+            an error. Defaults to False.
+
+    Returns:
+        List of indices (np.ndarray, or None), one for each TFRecord.
+
+    Raises:
+        slideflow.errors.TFRecordsError: If a TFRecord is neither in an
+            up-to-date catalog nor has an index file, and ``missing_ok``
+            is False.
+    """
+    tfrecords = [(t if isinstance(t, str) else t.decode('utf-8'))
+                 for t in tfrecords]
+    if directories is None:
+        directories = sorted({os.path.dirname(t) for t in tfrecords})
+    catalogs = [c for c in map(load_catalog, directories) if c is not None]
+
+    def _load(tfr):
+        for catalog in catalogs:
+            if tfr in catalog and catalog.is_current(tfr):
+                return catalog.index(tfr)
+        try:
+            return tfrecord2idx.load_index(tfr)
+        except OSError:
+            if missing_ok:
+                return None
+            raise errors.TFRecordsError(
+                f"Could not find index path for TFRecord {tfr}"
+            )
+
+    pool = DPool(8)
+    indices = list(pool.imap(_load, tfrecords))
+    pool.close()
+    return indices
@@ -0,0 +1,155 @@
+"""Chunk-compressed TFRecords.
+
+A chunk-compressed TFRecord is a sequence of compressed chunks, each holding
+a run of standard TFRecord-framed records (length, CRC, record, CRC). Each
+chunk starts with a fixed-size header::
+
+    magic (4 bytes, b'SFCK') | codec (1) | padding (3) | number of records (4)
+    | compressed size (8) | uncompressed size (8)
+
+Chunks can be located from their headers without decompressing them, so
+chunk-compressed TFRecords keep random access, sharding and random starts.
+Indices of chunk-compressed TFRecords have the same format as for standard
+TFRecords, but each row holds the offset and size of the chunk containing
+the record; records in the same chunk share a row, and the position of a
+record within its chunk is its rank among the rows for that chunk.
+
+Files are recognized by the magic bytes at the start of the file, so readers
+need no configuration. Chunks are compressed with ``'zlib'`` or, if the
+``zstandard`` package is installed, ``'zstd'``.
+"""
+
+import io
+import os
+import struct
+import zlib
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+MAGIC = b'SFCK'
+HEADER = struct.Struct('<4sB3xIQQ')
+CODECS = {'zlib': 1, 'zstd': 2}
+DEFAULT_CHUNK_RECORDS = 256
+
+# -----------------------------------------------------------------------------
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            "The package 'zstandard' has not been installed, but is required "
+            "for zstd-compressed TFRecords. Install with 'pip install "
+            "zstandard'"
+        )
+    return zstandard
+
+
+def compress_chunk(data: bytes, n_records: int, compression: str) -> bytes:
+    """Compress framed records into a chunk, including its header.
+
+    Args:
+        data (bytes): Concatenated, framed records.
+        n_records (int): Number of records in ``data``.
+        compression (str): 'zlib' or 'zstd'.
+
+    Returns:
+        bytes: Chunk header and compressed payload.
+    """
+    if compression == 'zlib':
+        payload = zlib.compress(data, 6)
+    elif compression == 'zstd':
+        payload = _zstd().ZstdCompressor(level=3).compress(data)
+    else:
+        raise ValueError(f"Unrecognized compression '{compression}'; "
+                         f"expected one of {list(CODECS)}")
+    header = HEADER.pack(MAGIC, CODECS[compression], n_records,
+                         len(payload), len(data))
+    return header + payload
+
+
+def decompress_chunk(chunk) -> bytes:
+    """Decompress a chunk (header and payload) into framed records."""
+    magic, codec, _, size, usize = HEADER.unpack_from(chunk, 0)
+    if magic != MAGIC:
+        raise RuntimeError("Invalid chunk header.")
+    payload = memoryview(chunk)[HEADER.size:HEADER.size + size]
+    if codec == CODECS['zlib']:
+        data = zlib.decompress(payload)
+    elif codec == CODECS['zstd']:
+        data = _zstd().ZstdDecompressor().decompress(payload, max_output_size=usize)
+    else:
+        raise RuntimeError(f"Unrecognized chunk codec {codec}.")
+    if len(data) != usize:
+        raise RuntimeError("Chunk is corrupt.")
+    return data
+
+
+def split_records(data) -> List[memoryview]:
+    """Split framed records into views of each serialized record."""
+    view = memoryview(data)
+    records = []
+    pos = 0
+    while pos < len(view):
+        length, = struct.unpack_from('<Q', view, pos)
+        if pos + 16 + length > len(view):
+            raise RuntimeError("Chunk is corrupt.")
+        records.append(view[pos + 12:pos + 12 + length])
+        pos += 16 + length
+    return records
+
+
+def is_chunked(path: str) -> bool:
+    """Check if a TFRecord is chunk-compressed."""
+    with io.open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def iter_chunks(f, size: int) -> Iterator[Tuple[int, int, int]]:
+    """Walk the chunk headers of an open chunk-compressed TFRecord.
+
+    Args:
+        f: File opened in binary mode.
+        size (int): Size of the file, in bytes.
+
+    Yields:
+        Tuple of (offset, length, n_records) for each chunk, where ``length``
+        includes the header.
+    """
+    offset = 0
+    while offset < size:
+        f.seek(offset)
+        header = f.read(HEADER.size)
+        if len(header) != HEADER.size:
+            raise RuntimeError(f"Truncated chunk at byte {offset}.")
+        magic, _, n_records, csize, _ = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise RuntimeError(f"Invalid chunk header at byte {offset}.")
+        length = HEADER.size + csize
+        if offset + length > size:
+            raise RuntimeError(f"Truncated chunk at byte {offset}.")
+        yield offset, length, n_records
+        offset += length
+
+
+def chunk_table(path: str) -> np.ndarray:
+    """Return the (offset, length, n_records) of each chunk in a TFRecord."""
+    with io.open(path, 'rb', buffering=0) as f:
+        rows = list(iter_chunks(f, os.path.getsize(path)))
+    return np.array(rows, dtype=np.int64).reshape(-1, 3)
+
+
+def index_from_chunks(chunks: np.ndarray) -> np.ndarray:
+    """Expand a chunk table into an index with one row per record."""
+    chunks = np.asarray(chunks, dtype=np.int64).reshape(-1, 3)
+    return np.repeat(chunks[:, :2], chunks[:, 2], axis=0)
+
+
+def record_positions(index: np.ndarray, record_ids: np.ndarray) -> np.ndarray:
+    """Return the position of records within their chunks, given an index
+    with one (chunk offset, chunk length) row per record."""
+    offsets = np.asarray(index)[:, 0]
+    first = np.searchsorted(offsets, offsets[record_ids], side='left')
+    return np.asarray(record_ids) - first
@@ -5,11 +5,14 @@ import gzip
 import os
 import struct
 import sys
+import threading
 import numpy as np
 import slideflow as sf
-from typing import Optional, Dict
+from collections import OrderedDict
+from typing import Optional, Dict, Iterable, List, Tuple
 from os.path import dirname, join, exists
 from slideflow import errors
+from slideflow.util import chunked_tfrecord
 
 
 TYPENAME_MAPPING = {
@@ -27,11 +30,219 @@ FEATURE_DESCRIPTION = {
 
 # -----------------------------------------------------------------------------
 
+def _read_varint(buf, pos: int) -> Tuple[int, int]:
+    """Decode a protobuf varint, returning the value and next position."""
+    result = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return result, pos
+        shift += 7
+        if shift >= 64:
+            raise errors.TFRecordsError("Malformed varint in record.")
+
+
+def _iter_fields(buf, start: int, end: int):
+    """Iterate over the protobuf fields in a byte range.
+
+    Yields (field number, wire type, start, end) for length-delimited
+    fields, and (field number, wire type, value, None) for varints. Fixed
+    width fields are skipped.
+    """
+    pos = start
+    while pos < end:
+        tag, pos = _read_varint(buf, pos)
+        wire_type = tag & 7
+        if wire_type == 0:
+            value, pos = _read_varint(buf, pos)
+            yield tag >> 3, 0, value, None
+        elif wire_type == 2:
+            length, pos = _read_varint(buf, pos)
+            yield tag >> 3, 2, pos, pos + length
+            pos += length
+        elif wire_type == 1:
+            pos += 8
+        elif wire_type == 5:
+            pos += 4
+        else:
+            raise errors.TFRecordsError(f"Unsupported wire type {wire_type}.")
+    if pos != end:
+        raise errors.TFRecordsError("Malformed record.")
+
+
+def scan_int64_features(
+    record: memoryview,
+    keys: Tuple[str, ...] = ('loc_x', 'loc_y')
+) -> Dict[str, int]:
+    """Read int64 features from a serialized tf.train.Example.
+
+    Walks the protobuf wire format directly, skipping over the contents of
+    all other features (e.g. ``image_raw``) without decoding or copying
+    them. This is much faster than parsing the full Example.
+
+    Args:
+        record (memoryview): Serialized Example.
+        keys (tuple(str)): Names of the int64 features to read.
+            Defaults to ``('loc_x', 'loc_y')``.
+
+    Returns:
+        Dict[str, int]: First value of each feature found.
+
+    Raises:
+        slideflow.errors.TFRecordsError: If the record is not a valid
+            serialized Example.
+    """
+    wanted = {k.encode('utf-8'): k for k in keys}
+    found = dict()  # type: Dict[str, int]
+    try:
+        for field, wire, start, end in _iter_fields(record, 0, len(record)):
+            if field != 1 or wire != 2:
+                continue
+            # Features: map<string, Feature>, stored as repeated entries.
+            for e_field, e_wire, e_start, e_end in _iter_fields(record, start, end):
+                if e_field != 1 or e_wire != 2:
+                    continue
+                name, value = None, None
+                for k_field, k_wire, k_start, k_end in _iter_fields(record, e_start, e_end):
+                    if k_field == 1 and k_wire == 2:
+                        name = bytes(record[k_start:k_end])
+                    elif k_field == 2 and k_wire == 2:
+                        value = (k_start, k_end)
+                if name not in wanted or value is None:
+                    continue
+                # Feature: oneof bytes_list (1), float_list (2), int64_list (3)
+                for f_field, f_wire, f_start, f_end in _iter_fields(record, *value):
+                    if f_field != 3 or f_wire != 2:
+                        continue
+                    for v_field, v_wire, v_start, _ in _iter_fields(record, f_start, f_end):
+                        if v_field != 1:
+                            continue
+                        if v_wire == 0:
+                            v = v_start
+                        else:
+                            # Packed repeated values.
+                            v, _ = _read_varint(record, v_start)
+                        if v >= 1 << 63:
+                            v -= 1 << 64
+                        found[wanted[name]] = v
+                        break
+    except IndexError:
+        raise errors.TFRecordsError("Malformed record.")
+    return found
+
+
+def iter_record_spans(
+    tfrecord_file: str,
+    chunk_size: int = 16 * 1024 * 1024
+):
+    """Iterate over the records in a TFRecord using large sequential reads.
+
+    Args:
+        tfrecord_file (str): Path to the TFRecord file.
+        chunk_size (int): Size of each read, in bytes. Defaults to 16 MB.
+
+    Yields:
+        Tuple of (offset, length, record), where ``offset`` and ``length``
+        are the position and size of the framed record in the file (or of
+        its chunk, for chunk-compressed TFRecords), and ``record`` is a
+        memoryview of the serialized record.
+    """
+    if chunked_tfrecord.is_chunked(tfrecord_file):
+        yield from _iter_chunked_spans(tfrecord_file)
+        return
+    with io.open(tfrecord_file, 'rb', buffering=0) as f:
+        buf = b''
+        buf_offset = 0
+        pos = 0
+        while True:
+            available = len(buf) - pos
+            if available >= 12:
+                length, = struct.unpack_from("<Q", buf, pos)
+                total = length + 16
+                if available >= total:
+                    view = memoryview(buf)
+                    yield buf_offset + pos, total, view[pos+12:pos+12+length]
+                    pos += total
+                    continue
+            else:
+                total = 12
+            more = f.read(max(chunk_size, total - available))
+            if not more:
+                if available:
+                    raise RuntimeError(
+                        f"Truncated record at byte {buf_offset + pos} of "
+                        f"{tfrecord_file}"
+                    )
+                return
+            buf = buf[pos:] + more
+            buf_offset += pos
+            pos = 0
+
+
+def _iter_chunked_spans(tfrecord_file: str):
+    """Iterate over the records in a chunk-compressed TFRecord."""
+    with io.open(tfrecord_file, 'rb') as f:
+        size = os.path.getsize(tfrecord_file)
+        for offset, length, n_records in chunked_tfrecord.iter_chunks(f, size):
+            f.seek(offset)
+            records = chunked_tfrecord.split_records(
+                chunked_tfrecord.decompress_chunk(f.read(length))
+            )
+            if len(records) != n_records:
+                raise RuntimeError(
+                    f"Corrupt chunk at byte {offset} of {tfrecord_file}"
+                )
+            for record in records:
+                yield offset, length, record
+
+
+def scan_tfrecord(tfrecord_file: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Find the offset, length and tile location of each record.
+
+    Records are read with large sequential reads, and tile locations are
+    read without parsing the full protobuf (see :func:`scan_int64_features`).
+
+    Args:
+        tfrecord_file (str): Path to the TFRecord file.
+
+    Returns:
+        A tuple containing
+
+            np.ndarray: Starting location (byte) and length (in bytes) of
+            each record, with shape (num_records, 2).
+
+            np.ndarray: Tile locations, with shape (num_records, 2) if
+            records have ``loc_x`` and ``loc_y``, (num_records, 1) if they
+            only have ``loc_x``, and an empty array otherwise.
+
+    Raises:
+        slideflow.errors.TFRecordsError: If records cannot be parsed.
+    """
+    start_bytes_array = []
+    loc_array = []
+    for offset, length, record in iter_record_spans(tfrecord_file):
+        start_bytes_array.append([offset, length])
+        try:
+            locations = scan_int64_features(record)
+        except errors.TFRecordsError:
+            raise errors.TFRecordsError(
+                f'Unable to detect TFRecord format: {tfrecord_file}'
+            )
+        if 'loc_x' in locations and 'loc_y' in locations:
+            loc_array.append([locations['loc_x'], locations['loc_y']])
+        elif 'loc_x' in locations:
+            loc_array.append([locations['loc_x']])
+    return np.array(start_bytes_array), np.array(loc_array)
+
+
 def create_index(tfrecord_file: str, index_file: str) -> None:
     """Create index from the tfrecords file.
 
     Stores starting location (byte) and length (in bytes) of each
-    serialized record.
+    serialized record, and tile locations, if present
+    (see :func:`scan_tfrecord`).
 
     Params:
     -------
@@ -41,53 +252,72 @@ def create_index(tfrecord_file: str, index_file: str) -> None:
     index_file: str
         Path where to store the index file.
     """
-    infile = open(tfrecord_file, "rb")
-    start_bytes_array = []
-    loc_array = []
-    idx = 0
-    datum_bytes = bytearray(1024 * 1024)
+    index, locations = scan_tfrecord(tfrecord_file)
+    save_index(index, index_file, locations=locations)
 
-    while True:
-        cur = infile.tell()
-        byte_len = infile.read(8)
-        if len(byte_len) == 0:
-            break
-        infile.read(4)
-        proto_len = struct.unpack("q", byte_len)[0]
-
-        if proto_len > len(datum_bytes):
-            try:
-                _fill = int(proto_len * 1.5)
-                datum_bytes = datum_bytes.zfill(_fill)
-            except OverflowError:
-                raise OverflowError(
-                    f'Error reading tfrecord {tfrecord_file}'
-                )
-        datum_bytes_view = memoryview(datum_bytes)[:proto_len]
-        if infile.readinto(datum_bytes_view) != proto_len:
-            raise RuntimeError(
-                f"Failed to read record {idx} of file {tfrecord_file}"
-            )
-        infile.read(4)
-        start_bytes_array += [[cur, infile.tell() - cur]]
 
-        # Process record bytes, to read location information.
-        try:
-            record = process_record_from_bytes(datum_bytes_view)
-        except errors.TFRecordsError:
-            raise errors.TFRecordsError(
-                f'Unable to detect TFRecord format: {tfrecord_file}'
-            )
-        if 'loc_x' in record and 'loc_y' in record:
-            loc_array += [[record['loc_x'], record['loc_y']]]
-        elif 'loc_x' in record:
-            loc_array += [[record['loc_x']]]
-        idx += 1
+def pack_locations(locations: np.ndarray) -> np.ndarray:
+    """Pack ``(x, y)`` tile locations into int64 keys.
 
-    infile.close()
-    if loc_array:
-        loc_array = np.array(loc_array)
-    save_index(np.array(start_bytes_array), index_file, locations=loc_array)
+    The x-coordinate is stored in the upper 32 bits and the y-coordinate in
+    the lower 32 bits, so that each location maps to a single integer which
+    can be sorted and searched.
+
+    Args:
+        locations (np.ndarray): Array of shape (N, 2).
+
+    Returns:
+        np.ndarray: int64 array of shape (N,).
+    """
+    locations = np.asarray(locations, dtype=np.int64)
+    if locations.size and (locations.ndim != 2 or locations.shape[1] != 2):
+        raise ValueError("locations must have shape (N, 2)")
+    locations = locations.reshape(-1, 2)
+    return (locations[:, 0] << 32) | (locations[:, 1] & 0xFFFFFFFF)
+
+
+class LocationIndex:
+
+    def __init__(self, keys: np.ndarray, order: np.ndarray) -> None:
+        """Sorted table of packed tile locations, for fast record lookup.
+
+        Args:
+            keys (np.ndarray): Sorted location keys, from
+                :func:`pack_locations`.
+            order (np.ndarray): Record index corresponding to each key.
+        """
+        self.keys = keys
+        self.order = order
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def from_locations(cls, locations: np.ndarray) -> "LocationIndex":
+        """Build a location table from an (N, 2) array of locations."""
+        keys = pack_locations(locations)
+        order = np.argsort(keys, kind='stable')
+        return cls(keys[order], order.astype(np.int64))
+
+    def lookup(self, locations: np.ndarray) -> np.ndarray:
+        """Find the record index of each tile location.
+
+        Args:
+            locations (np.ndarray): Array of ``(x, y)`` locations, of
+                shape (N, 2).
+
+        Returns:
+            np.ndarray: Record index for each location, or -1 for locations
+            without a record. If a location occurs more than once in the
+            TFRecord, the first record is returned.
+        """
+        keys = pack_locations(locations)
+        if not len(self.keys):
+            return np.full(len(keys), -1, dtype=np.int64)
+        pos = np.searchsorted(self.keys, keys)
+        pos_clipped = np.minimum(pos, len(self.keys) - 1)
+        found = (pos < len(self.keys)) & (self.keys[pos_clipped] == keys)
+        return np.where(found, self.order[pos_clipped], -1)
 
 
 def save_index(
@@ -95,13 +325,22 @@ def save_index(
     index_file: str,
     locations: Optional[np.ndarray] = None
 ) -> None:
-    """Save an array as an index file."""
+    """Save an array as an index file.
+
+    If ``(x, y)`` locations are provided, a sorted table of packed
+    locations (see :class:`LocationIndex`) is saved alongside them.
+    """
     if 'SF_ALLOW_ZIP' in os.environ and os.environ['SF_ALLOW_ZIP'] == '0':
         np.save(index_file + '.npy', index_array)
     else:
         loc_kw = dict()
         if locations is not None:
             loc_kw['locations'] = locations
+            locations = np.asarray(locations)
+            if locations.ndim == 2 and locations.shape[1] == 2:
+                table = LocationIndex.from_locations(locations)
+                loc_kw['location_keys'] = table.keys
+                loc_kw['location_order'] = table.order
         np.savez(
             index_file,
             arr_0=index_array,
@@ -157,6 +396,33 @@ def get_locations_from_index(index: str):
     return [tuple(l) for l in loaded['locations']]
 
 
+def load_location_index(index: str) -> LocationIndex:
+    """Load the table of tile locations from an index file.
+
+    Index files created before location tables were stored have the table
+    built from their locations.
+
+    Args:
+        index (str): Path to index file.
+
+    Returns:
+        :class:`LocationIndex`
+    """
+    if index.endswith('npy'):
+        raise errors.TFRecordsIndexError(
+            f"Index file {index} does not contain location information."
+        )
+    with np.load(index) as loaded:
+        if 'location_keys' in loaded:
+            return LocationIndex(loaded['location_keys'],
+                                 loaded['location_order'])
+        if 'locations' not in loaded:
+            raise errors.TFRecordsIndexError(
+                f"Index file {index} does not contain location information."
+            )
+        return LocationIndex.from_locations(loaded['locations'])
+
+
 def get_tfrecord_length(tfrecord: str) -> int:
     """Return the number of records in a TFRecord file.
 
@@ -185,6 +451,8 @@ def get_tfrecord_length(tfrecord: str) -> int:
 
 def read_tfrecord_length(tfrecord: str) -> int:
     """Returns number of records stored in the given tfrecord file."""
+    if chunked_tfrecord.is_chunked(tfrecord):
+        return int(chunked_tfrecord.chunk_table(tfrecord)[:, 2].sum())
     infile = open(tfrecord, "rb")
     num_records = 0
     while True:
@@ -231,6 +499,10 @@ def get_tfrecord_by_index(
         slideflow.error.InvalidTFRecordIndex: If the given index cannot be found.
     """
 
+    if compression_type is None and chunked_tfrecord.is_chunked(tfrecord):
+        with TFRecordRandomAccessReader(max_open_files=1) as reader:
+            return reader.get(tfrecord, index)
+
     # Load the TFRecord file.
     if compression_type == "gzip":
         file = gzip.open(tfrecord, 'rb')
@@ -288,6 +560,473 @@ def get_tfrecord_by_index(
     return record
 
 
+class TFRecordRandomAccessReader:
+
+    def __init__(
+        self,
+        max_open_files: int = 64,
+        compression_type: Optional[str] = None,
+        coalesce_gap: int = 64 * 1024,
+        max_read_size: int = 16 * 1024 * 1024,
+        max_cached_chunks: int = 16,
+    ) -> None:
+        """Random-access reader for records in a collection of TFRecords.
+
+        File handles are kept open in a least-recently-used cache, and the
+        index and tile locations of each TFRecord are loaded once and kept
+        in memory. Cached indices are invalidated if a TFRecord is modified.
+        TFRecords without an index are scanned once to find record offsets.
+        Chunk-compressed TFRecords (see
+        :mod:`slideflow.util.chunked_tfrecord`) are detected automatically,
+        and recently decompressed chunks are cached.
+
+        Reads use ``os.pread`` where available, so a reader can be shared
+        between threads.
+
+        Examples
+            Read tiles from several TFRecords in a single batch.
+
+                .. code-block:: python
+
+                    from slideflow.io import TFRecordRandomAccessReader
+
+                    with TFRecordRandomAccessReader() as reader:
+                        records = reader.get_many([
+                            ('/path/slide1.tfrecords', 10),
+                            ('/path/slide2.tfrecords', 4),
+                            ('/path/slide1.tfrecords', 11),
+                        ])
+                        image = records[0]['image_raw']
+
+        Args:
+            max_open_files (int): Maximum number of file handles kept open.
+                Defaults to 64.
+            compression_type (str): Type of compression in the TFRecord
+                files. Either 'gzip' or None. Defaults to None.
+            coalesce_gap (int): In :meth:`get_many`, records separated by
+                at most this many bytes are fetched with a single read.
+                Defaults to 64 KB.
+            max_read_size (int): Maximum size of a single coalesced read,
+                in bytes. Defaults to 16 MB.
+            max_cached_chunks (int): Number of decompressed chunks of
+                chunk-compressed TFRecords to keep in memory. Defaults to 16.
+        """
+        if compression_type not in ('gzip', None):
+            raise ValueError("compression_type should be 'gzip' or None")
+        self.max_open_files = max_open_files
+        self.compression_type = compression_type
+        self.coalesce_gap = coalesce_gap
+        self.max_read_size = max_read_size
+        self.max_cached_chunks = max_cached_chunks
+        self._files = OrderedDict()  # type: OrderedDict
+        self._in_use = dict()  # type: Dict[str, int]
+        self._file_locks = dict()  # type: Dict[str, threading.Lock]
+        self._indices = dict()  # type: Dict[str, Tuple]
+        self._locations = dict()  # type: Dict[str, LocationIndex]
+        self._chunks = OrderedDict()  # type: OrderedDict
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        """Close all open file handles and clear cached indices."""
+        with self._lock:
+            for f in self._files.values():
+                f.close()
+            self._files.clear()
+            self._in_use.clear()
+            self._indices.clear()
+            self._locations.clear()
+            self._chunks.clear()
+
+    # --- File handles and indices --------------------------------------------
+
+    def _open(self, tfrecord: str):
+        """Return an open handle to a TFRecord, marked as in use."""
+        with self._lock:
+            if tfrecord in self._files:
+                self._files.move_to_end(tfrecord)
+                f = self._files[tfrecord]
+            else:
+                if self.compression_type == 'gzip':
+                    f = gzip.open(tfrecord, 'rb')
+                    self._file_locks[tfrecord] = threading.Lock()
+                else:
+                    f = io.open(tfrecord, 'rb', buffering=0)
+                self._files[tfrecord] = f
+            self._in_use[tfrecord] = self._in_use.get(tfrecord, 0) + 1
+            self._evict()
+        return f
+
+    def _release(self, tfrecord: str) -> None:
+        with self._lock:
+            self._in_use[tfrecord] -= 1
+            if not self._in_use[tfrecord]:
+                del self._in_use[tfrecord]
+            self._evict()
+
+    def _evict(self) -> None:
+        """Close least-recently-used handles which are not in use.
+
+        Must be called with the lock held.
+        """
+        for path in list(self._files):
+            if len(self._files) <= self.max_open_files:
+                break
+            if not self._in_use.get(path):
+                self._files.pop(path).close()
+                self._file_locks.pop(path, None)
+
+    def _read(self, tfrecord: str, f, offset: int, size: int) -> bytes:
+        """Read bytes from an open TFRecord."""
+        if self.compression_type is None and hasattr(os, 'pread'):
+            data = os.pread(f.fileno(), size, offset)
+        else:
+            lock = self._file_locks.get(tfrecord)
+            if lock is None:
+                with self._lock:
+                    lock = self._file_locks.setdefault(tfrecord, threading.Lock())
+            with lock:
+                f.seek(offset)
+                data = f.read(size)
+        if len(data) != size:
+            raise RuntimeError(f"Failed to read record from {tfrecord}.")
+        return data
+
+    def _scan(self, tfrecord: str, chunked: bool = False) -> np.ndarray:
+        """Find the offset and length of each record by walking the file."""
+        if chunked:
+            return chunked_tfrecord.index_from_chunks(
+                chunked_tfrecord.chunk_table(tfrecord)
+            )
+        rows = []
+        f = self._open(tfrecord)
+        try:
+            offset = 0
+            size = os.path.getsize(tfrecord) if self.compression_type is None else None
+            while size is None or offset < size:
+                try:
+                    header = self._read(tfrecord, f, offset, 8)
+                except RuntimeError:
+                    if size is None:
+                        break
+                    raise
+                length, = struct.unpack("<Q", header)
+                rows.append((offset, length + 16))
+                offset += length + 16
+        finally:
+            self._release(tfrecord)
+        return np.array(rows, dtype=np.int64).reshape(-1, 2)
+
+    def _stat(self, tfrecord: str) -> Tuple[int, int]:
+        stat = os.stat(tfrecord)
+        return stat.st_size, stat.st_mtime_ns
+
+    def index(self, tfrecord: str) -> np.ndarray:
+        """Return the (offset, length) of each record in a TFRecord.
+
+        Args:
+            tfrecord (str): Path to TFRecord.
+
+        Returns:
+            np.ndarray: Array of shape (num_records, 2).
+        """
+        stat = self._stat(tfrecord)
+        cached = self._indices.get(tfrecord)
+        if cached is not None and cached[0] == stat:
+            return cached[1]
+        with self._lock:
+            # The TFRecord has changed; reopen it.
+            if tfrecord in self._files and not self._in_use.get(tfrecord):
+                self._files.pop(tfrecord).close()
+            self._locations.pop(tfrecord, None)
+        chunked = (bool(stat[0]) and self.compression_type is None
+                   and chunked_tfrecord.is_chunked(tfrecord))
+        if not stat[0]:
+            index = np.zeros((0, 2), dtype=np.int64)
+        elif find_index(tfrecord) is None:
+            index = self._scan(tfrecord, chunked)
+        else:
+            index = load_index(tfrecord)
+            if index is None:
+                index = np.zeros((0, 2), dtype=np.int64)
+            elif len(index.shape) == 1:
+                index = np.expand_dims(index, axis=0)
+        self._indices[tfrecord] = (stat, index, chunked)
+        return index
+
+    def is_chunked(self, tfrecord: str) -> bool:
+        """Check if a TFRecord is chunk-compressed."""
+        self.index(tfrecord)
+        return self._indices[tfrecord][2]
+
+    def location_index(self, tfrecord: str) -> LocationIndex:
+        """Return the table of tile locations for a TFRecord.
+
+        The table is read from the index file if available, otherwise
+        built from the records.
+
+        Args:
+            tfrecord (str): Path to TFRecord.
+
+        Returns:
+            :class:`LocationIndex`
+        """
+        index = self.index(tfrecord)
+        cached = self._locations.get(tfrecord)
+        if cached is not None:
+            return cached
+        index_path = find_index(tfrecord)
+        if index_path and index_has_locations(index_path):
+            table = load_location_index(index_path)
+        else:
+            records = self.get_many([(tfrecord, i) for i in range(len(index))])
+            table = LocationIndex.from_locations(
+                [(r['loc_x'], r['loc_y']) for r in records]
+            )
+        self._locations[tfrecord] = table
+        return table
+
+    def lookup(self, tfrecord: str, locations: np.ndarray) -> np.ndarray:
+        """Find the record indices for an array of tile locations.
+
+        Args:
+            tfrecord (str): Path to TFRecord.
+            locations (np.ndarray): Array of ``(x, y)`` locations, of
+                shape (N, 2).
+
+        Returns:
+            np.ndarray: Record index for each location, or -1 for locations
+            not found in the TFRecord.
+        """
+        return self.location_index(tfrecord).lookup(locations)
+
+    def _check_index(self, tfrecord: str, index: np.ndarray, idx: int) -> None:
+        if not len(index):
+            raise errors.EmptyTFRecordsError(f"{tfrecord} is empty.")
+        if idx < 0 or idx >= len(index):
+            raise errors.InvalidTFRecordIndex(
+                f"Index {idx} is invalid for tfrecord {tfrecord} "
+                f"(size: {len(index)})"
+            )
+
+    # --- Reading records -----------------------------------------------------
+
+    def _process(self, tfrecord: str, record: memoryview) -> Dict:
+        try:
+            return process_record_from_bytes(record)
+        except errors.TFRecordsError:
+            raise errors.TFRecordsError(
+                f'Unable to detect TFRecord format: {tfrecord}'
+            )
+
+    def read_raw(self, tfrecord: str, index: int) -> bytes:
+        """Read the serialized bytes of a record.
+
+        Args:
+            tfrecord (str): Path to TFRecord.
+            index (int): Index of the record in the TFRecord.
+
+        Returns:
+            bytes: Serialized record.
+        """
+        idx = self.index(tfrecord)
+        self._check_index(tfrecord, idx, index)
+        return bytes(self.read_records(tfrecord, [index], index=idx)[0])
+
+    def get(self, tfrecord: str, index: int) -> Dict:
+        """Read a record by index.
+
+        Args:
+            tfrecord (str): Path to TFRecord.
+            index (int): Index of the record in the TFRecord.
+
+        Returns:
+            A dictionary mapping record names (e.g., ``'slide'``,
+            ``'image_raw'``, ``'loc_x'``, and ``'loc_y'``) to their values,
+            as returned by :func:`get_tfrecord_by_index`.
+
+        Raises:
+            slideflow.error.EmptyTFRecordsError: If the file is empty.
+
+            slideflow.error.InvalidTFRecordIndex: If the given index cannot
+                be found.
+        """
+        return self._process(tfrecord, memoryview(self.read_raw(tfrecord, index)))
+
+    def get_by_location(
+        self,
+        tfrecord: str,
+        location: Tuple[int, int]
+    ) -> Optional[Dict]:
+        """Read the record for a tile location.
+
+        Args:
+            tfrecord (str): Path to TFRecord.
+            location (tuple(int, int)): ``(x, y)`` tile location.
+
+        Returns:
+            Dictionary of record values, as returned by :meth:`get`, or None
+            if no record has the given location.
+        """
+        idx = self.lookup(tfrecord, np.array([location]))[0]
+        if idx < 0:
+            return None
+        return self.get(tfrecord, int(idx))
+
+    def _coalesce(self, rows: np.ndarray) -> List[Tuple[int, int, List[int]]]:
+        """Group sorted (offset, length) rows into contiguous reads.
+
+        Returns a list of (start, end, row_indices) for each read.
+        """
+        reads = []  # type: List[Tuple[int, int, List[int]]]
+        for i, (offset, length) in enumerate(rows.tolist()):
+            end = offset + length
+            if reads:
+                start, prev_end, members = reads[-1]
+                if (offset - prev_end <= self.coalesce_gap
+                   and end - start <= self.max_read_size):
+                    reads[-1] = (start, max(prev_end, end), members + [i])
+                    continue
+            reads.append((offset, end, [i]))
+        return reads
+
+    def get_many(
+        self,
+        indices: Iterable[Tuple[str, int]],
+        raw: bool = False
+    ) -> List:
+        """Read a batch of records.
+
+        Requests are grouped by TFRecord and sorted by file offset, and
+        records which are close together are fetched with a single read,
+        so that random access becomes near-sequential. Records are returned
+        in the order requested.
+
+        Args:
+            indices (Iterable[Tuple[str, int]]): ``(tfrecord, index)`` for
+                each record.
+            raw (bool): Return serialized records, rather than parsed
+                dictionaries. Defaults to False.
+
+        Returns:
+            List of records, as returned by :meth:`get` (or
+            :meth:`read_raw`, if ``raw=True``).
+        """
+        indices = list(indices)
+        by_file = OrderedDict()  # type: OrderedDict
+        for pos, (tfrecord, idx) in enumerate(indices):
+            by_file.setdefault(tfrecord, []).append((pos, int(idx)))
+        results = [None] * len(indices)  # type: List
+        for tfrecord, requests in by_file.items():
+            index = self.index(tfrecord)
+            for _, idx in requests:
+                self._check_index(tfrecord, index, idx)
+            records = self.read_records(
+                tfrecord, [idx for _, idx in requests], index=index
+            )
+            for (pos, _), record in zip(requests, records):
+                if raw:
+                    results[pos] = bytes(record)
+                else:
+                    results[pos] = self._process(tfrecord, record)
+        return results
+
+    def read_records(
+        self,
+        tfrecord: str,
+        record_ids: Iterable[int],
+        index: Optional[np.ndarray] = None
+    ) -> List[memoryview]:
+        """Read serialized records by index.
+
+        Records are read in file order, with nearby records coalesced into
+        a single read, and returned in the order given. For chunk-compressed
+        TFRecords, each chunk is read and decompressed once.
+
+        Args:
+            tfrecord (str): Path to TFRecord.
+            record_ids (Iterable[int]): Indices of the records to read.
+            index (np.ndarray, optional): Index of the TFRecord. Defaults
+                to None (use the cached index).
+
+        Returns:
+            List of memoryviews of the serialized records.
+        """
+        if index is None:
+            index = self.index(tfrecord)
+        record_ids = np.asarray(list(record_ids), dtype=np.int64)
+        rows = index[record_ids]
+        if not self.is_chunked(tfrecord):
+            return [span[12:-4] for span in self._read_spans(tfrecord, rows)]
+
+        positions = chunked_tfrecord.record_positions(index, record_ids)
+        chunk_records = dict()  # type: Dict[int, List[memoryview]]
+        stat = self._indices[tfrecord][0]
+        to_read = []
+        with self._lock:
+            for offset, length in np.unique(rows, axis=0).tolist():
+                cached = self._chunks.get((tfrecord, stat, offset))
+                if cached is not None:
+                    self._chunks.move_to_end((tfrecord, stat, offset))
+                    chunk_records[offset] = cached
+                else:
+                    to_read.append((offset, length))
+        if to_read:
+            spans = self._read_spans(tfrecord, np.array(to_read))
+            for (offset, _), span in zip(to_read, spans):
+                chunk_records[offset] = chunked_tfrecord.split_records(
+                    chunked_tfrecord.decompress_chunk(span)
+                )
+            with self._lock:
+                for offset, _ in to_read:
+                    self._chunks[(tfrecord, stat, offset)] = chunk_records[offset]
+                while len(self._chunks) > self.max_cached_chunks:
+                    self._chunks.popitem(last=False)
+        return [chunk_records[offset][pos]
+                for offset, pos in zip(rows[:, 0].tolist(), positions.tolist())]
+
+    def _read_spans(self, tfrecord: str, rows: np.ndarray) -> List[memoryview]:
+        """Read (offset, length) spans of a file, in the order given."""
+        rows = np.asarray(rows, dtype=np.int64).reshape(-1, 2)
+        order = np.argsort(rows[:, 0], kind='stable')
+        sorted_rows = rows[order]
+        results = [None] * len(rows)  # type: List
+        f = self._open(tfrecord)
+        try:
+            for start, end, members in self._coalesce(sorted_rows):
+                data = memoryview(self._read(tfrecord, f, start, end - start))
+                for m in members:
+                    offset, length = (int(v) for v in sorted_rows[m])
+                    results[order[m]] = data[offset - start:offset - start + length]
+        finally:
+            self._release(tfrecord)
+        return results
+
+
+_default_reader = None  # type: Optional[TFRecordRandomAccessReader]
+_default_reader_lock = threading.Lock()
+
+
+def default_reader() -> TFRecordRandomAccessReader:
+    """Return a process-wide shared :class:`TFRecordRandomAccessReader`."""
+    global _default_reader
+    with _default_reader_lock:
+        if _default_reader is None:
+            _default_reader = TFRecordRandomAccessReader()
+        return _default_reader
+
+
 def process_record_from_bytes(bytes_view):
     try:
         record = process_record(bytes_view)